@@ -0,0 +1,417 @@
+"""
+Локальный стенд вместо Binance Futures для нагрузочных тестов: REST и combined-stream WebSocket
+на синтетических или записанных данных.
+
+    python -m bench.fakebinance --symbols 500 --speed 60 --port 9100
+    python -m bench.fakebinance --recording bench_5m.jsonl.gz --update-ms 0
+    python -m bench.fakebinance ... --rest-latency-ms 50 --jitter-ms 100 --ws-latency-ms 200 --disconnect-every 120
+
+Бот направляется на стенд переменными окружения (сервер печатает их на старте):
+BINANCE_ENDPOINT — REST и WebSocket python-binance (engine/market.py use_endpoint),
+SIM_CLOCK — время стенда для движка (с --speed 60 часовая свеча закрывается раз в минуту),
+TELEGRAM_API — сообщения бота принимает и считает стенд.
+
+REST: /api/v3/ping|time, /fapi/v1/ping|time, /fapi/v1/klines, /fapi/v1/ticker/24hr.
+WebSocket: /stream и /market/stream?streams=<symbol>@kline_<interval>/.../!miniTicker@arr.
+Каждый поток получает незакрытые обновления свечи раз в --update-ms и закрытую свечу на границе
+интервала; "E" — реальное время отправки, так что движок видит задержку доставки (METRICS ws_lag).
+/_stats — счётчики стенда.
+
+Синтетический рынок без состояния: цена и объём свечи — функция (символ, интервал, номер свечи),
+поэтому 1000 символов не занимают памяти, а REST и поток всегда согласованы. Свечи разных
+интервалов одного символа между собой не согласованы — для нагрузки это неважно.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import zlib
+from collections import Counter
+from threading import Event, Thread
+
+import numpy as np
+
+from bench.recording import INTERVAL_MS
+
+GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _mix(x):
+    """splitmix64 по массиву uint64."""
+    with np.errstate(over="ignore"):
+        x = x + GOLDEN
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return x ^ (x >> np.uint64(31))
+
+
+def _uniform(key, idx):
+    return (_mix(idx.astype(np.uint64) ^ np.uint64(key)) >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+
+
+def _key(*parts):
+    return zlib.crc32("|".join(map(str, parts)).encode())
+
+
+# ================= ДАННЫЕ =================
+class SyntheticMarket:
+    """
+    symbols символов SYN0000USDT... и BTCUSDT. Лог-цена — две синусоиды и шум, у ~2% свечей
+    всплеск: тело x4 и объём x3..x12, чтобы сигналы ботов срабатывали.
+    """
+
+    def __init__(self, symbols=500, seed=1):
+        self.seed = seed
+        self.symbols = [f"SYN{i:04d}USDT" for i in range(symbols)] + ["BTCUSDT"]
+        rng = random.Random(seed)
+        self.params = {s: (rng.uniform(0.1, 100), rng.uniform(1e4, 1e6), rng.uniform(5e7, 5e8),
+                           rng.uniform(200, 2000), rng.uniform(0, 6.3)) for s in self.symbols}
+
+    def tickers(self):
+        return [{"symbol": s, "quoteVolume": f"{p[2]:.2f}", "lastPrice": f"{p[0]:.6f}"}
+                for s, p in self.params.items()]
+
+    def _log_price(self, symbol, interval, idx):
+        p0, _, _, period, phase = self.params[symbol]
+        noise = _uniform(_key(self.seed, symbol, interval, "n"), idx) - 0.5
+        return (np.log(p0) + 0.05 * np.sin(idx / period + phase) + 0.02 * np.sin(idx / (period / 7) + phase)
+                + 0.01 * noise)
+
+    def bars(self, symbol, interval, first, count):
+        """Свечи с номерами first..first+count-1 (номер = open_time // шаг): o, h, l, c, v."""
+        _, base_vol, _, _, _ = self.params[symbol]
+        idx = np.arange(first - 1, first + count, dtype=np.int64)
+        lp = self._log_price(symbol, interval, idx)
+        idx = idx[1:]
+        spike = _uniform(_key(self.seed, symbol, interval, "s"), idx) < 0.02
+        ret = np.diff(lp) * np.where(spike, 4.0, 1.0)
+        o = np.exp(lp[:-1])
+        c = o * np.exp(ret)
+        wick = _uniform(_key(self.seed, symbol, interval, "w"), idx) * 0.004
+        h = np.maximum(o, c) * (1 + wick)
+        l = np.minimum(o, c) * (1 - wick / 2)
+        vol_noise = _uniform(_key(self.seed, symbol, interval, "v"), idx)
+        v = base_vol * np.exp(0.7 * (vol_noise - 0.5)) * np.where(spike, 3 + 9 * vol_noise, 1.0)
+        return o, h, l, c, v
+
+    def klines(self, symbol, interval, limit=500, now_ms=None, start_time=None, end_time=None):
+        if symbol not in self.params:
+            return []
+        step = INTERVAL_MS[interval]
+        last = now_ms // step  # формирующаяся свеча
+        if end_time is not None:
+            last = min(last, end_time // step)
+        first = last - limit + 1 if start_time is None else -(-start_time // step)
+        count = min(limit, last - first + 1)
+        if count <= 0:
+            return []
+        o, h, l, c, v = self.bars(symbol, interval, first, count)
+        out = []
+        for i in range(count):
+            t = (first + i) * step
+            q = v[i] * (h[i] + l[i] + c[i]) / 3
+            out.append([t, f"{o[i]:.6f}", f"{h[i]:.6f}", f"{l[i]:.6f}", f"{c[i]:.6f}", f"{v[i]:.3f}",
+                        t + step - 1, f"{q:.3f}", int(v[i] / 10) + 1, f"{v[i] / 2:.3f}", f"{q / 2:.3f}", "0"])
+        return out
+
+
+class RecordedMarket:
+    """Запись bench.record_klines: история и поток из неё; после конца записи поток молчит."""
+
+    def __init__(self, path):
+        from bench.recording import load_recording
+        from bench.stubs import KlineHistory, closed_kline
+
+        meta, self.ticker, seeds, messages = load_recording(path)
+        self.history = KlineHistory(meta["interval"], seeds, messages)
+        self.symbols = list(meta["symbols"])
+        # время стенда начинается с открытия первой свечи потока
+        self.start_ms = min(k["t"] for k in map(closed_kline, (m for _, m in messages)) if k is not None)
+
+    def tickers(self):
+        return [dict(t) for t in self.ticker]
+
+    def klines(self, symbol, interval, limit=500, now_ms=None, start_time=None, end_time=None):
+        step = INTERVAL_MS[interval]
+        # KlineHistory отдаёт свечи с open_time <= as_of + базовый шаг - step
+        as_of = now_ms // step * step - self.history.interval_ms + step
+        return self.history.klines(symbol, interval, limit, as_of=as_of, start_time=start_time, end_time=end_time)
+
+
+def kline_message(symbol, interval, row, closed, event_ms):
+    return json.dumps({
+        "stream": f"{symbol.lower()}@kline_{interval}",
+        "data": {
+            "e": "kline", "E": event_ms, "s": symbol,
+            "k": {"t": row[0], "T": row[6], "s": symbol, "i": interval, "o": row[1], "c": row[4],
+                  "h": row[2], "l": row[3], "v": row[5], "n": row[8], "x": closed, "q": row[7],
+                  "V": row[9], "Q": row[10], "B": "0"},
+        },
+    }, separators=(",", ":"))
+
+
+# ================= СЕРВЕР =================
+class FakeBinance:
+    def __init__(self, market, host="127.0.0.1", port=9100, speed=1.0, update_ms=250,
+                 rest_latency_ms=0, jitter_ms=0, ws_latency_ms=0, disconnect_every=0, start_ms=None):
+        self.market = market
+        self.host, self.port = host, port
+        self.speed = speed
+        self.update_ms = update_ms
+        self.rest_latency_ms = rest_latency_ms
+        self.jitter_ms = jitter_ms
+        self.ws_latency_ms = ws_latency_ms
+        self.disconnect_every = disconnect_every
+        self.real0 = time.time()
+        self.sim0 = start_ms if start_ms is not None else getattr(market, "start_ms", self.real0 * 1000)
+        self.stats = Counter()
+        self.telegrams = []
+        self.updates = []  # входящие сообщения для getUpdates
+        self.paused = False  # поток молчит (нагрузочный тест дожидается, пока бот разберёт очередь)
+        self.loop = None
+        self.thread = None
+        self.stopped = None
+        self.ready = Event()
+
+    def command(self, text, chat_id=0):
+        """Сообщение боту в чат chat_id — уйдёт ближайшему getUpdates."""
+        self.updates.append({"update_id": len(self.updates) + 1,
+                             "message": {"chat": {"id": chat_id}, "text": text}})
+
+    def now_ms(self):
+        return int(self.sim0 + (time.time() - self.real0) * 1000 * self.speed)
+
+    def real_at(self, sim_ms):
+        return self.real0 + (sim_ms - self.sim0) / 1000 / self.speed
+
+    def env(self):
+        base = f"http://{self.host}:{self.port}"
+        return {"BINANCE_ENDPOINT": base, "TELEGRAM_API": base,
+                "SIM_CLOCK": f"{self.sim0:.0f}:{self.real0:.6f}:{self.speed}"}
+
+    # ----- REST -----
+    async def _latency(self):
+        delay = self.rest_latency_ms + random.random() * self.jitter_ms
+        if delay:
+            await asyncio.sleep(delay / 1000)
+
+    def app(self):
+        from aiohttp import web
+
+        @web.middleware
+        async def rest(request, handler):
+            if not request.path.endswith("stream"):
+                self.stats[f"rest {request.path}"] += 1
+                await self._latency()
+            return await handler(request)
+
+        async def ping(request):
+            return web.json_response({})
+
+        async def server_time(request):
+            return web.json_response({"serverTime": self.now_ms()})
+
+        async def klines(request):
+            q = request.query
+            rows = self.market.klines(
+                q["symbol"], q["interval"], min(int(q.get("limit", 500)), 1500), now_ms=self.now_ms(),
+                start_time=int(q["startTime"]) if "startTime" in q else None,
+                end_time=int(q["endTime"]) if "endTime" in q else None)
+            return web.json_response(rows)
+
+        async def ticker(request):
+            tickers = self.market.tickers()
+            symbol = request.query.get("symbol")
+            if symbol is None:
+                return web.json_response(tickers)
+            for t in tickers:
+                if t["symbol"] == symbol:
+                    return web.json_response(t)
+            return web.json_response({"code": -1121, "msg": "Invalid symbol."}, status=400)
+
+        async def telegram(request):
+            data = await request.post()
+            self.telegrams.append(data.get("text", ""))
+            self.stats["telegram"] += 1
+            return web.json_response({"ok": True})
+
+        async def updates(request):
+            # long polling getUpdates: команды, поставленные command()
+            offset = int(request.query.get("offset", 0))
+            deadline = time.time() + min(float(request.query.get("timeout", 0)), 5)
+            while True:
+                pending = self.updates[offset:] if offset < 0 else [u for u in self.updates if u["update_id"] >= offset]
+                if pending or time.time() >= deadline:
+                    return web.json_response({"ok": True, "result": pending})
+                await asyncio.sleep(0.1)
+
+        async def stats(request):
+            return web.json_response({**self.stats, "sim_ms": self.now_ms()})
+
+        app = web.Application(middlewares=[rest])
+        app.router.add_get("/api/v3/ping", ping)
+        app.router.add_get("/api/v3/time", server_time)
+        app.router.add_get("/fapi/v1/ping", ping)
+        app.router.add_get("/fapi/v1/time", server_time)
+        app.router.add_get("/fapi/v1/klines", klines)
+        app.router.add_get("/fapi/v1/ticker/24hr", ticker)
+        app.router.add_post("/bot{token}/sendMessage", telegram)
+        app.router.add_get("/bot{token}/getUpdates", updates)
+        app.router.add_get("/_stats", stats)
+        app.router.add_get("/stream", self.stream)
+        app.router.add_get("/market/stream", self.stream)
+        return app
+
+    # ----- WebSocket -----
+    async def stream(self, request):
+        from aiohttp import web
+
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        subs = {}  # interval -> [symbol, ...]
+        mini = False
+        for name in request.query.get("streams", "").split("/"):
+            if name == "!miniTicker@arr":
+                mini = True
+            elif "@kline_" in name:
+                symbol, interval = name.split("@kline_")
+                subs.setdefault(interval, []).append(symbol.upper())
+        self.stats["ws_connections"] += 1
+        self.stats["ws_open"] += 1
+        # чтение нужно, чтобы отвечать на ping клиента и заметить его close
+        reader = asyncio.ensure_future(self._drain(ws))
+        try:
+            await self._feed(ws, subs, mini)
+        except (ConnectionError, RuntimeError):
+            pass
+        finally:
+            reader.cancel()
+            self.stats["ws_open"] -= 1
+        return ws
+
+    async def _drain(self, ws):
+        async for _ in ws:
+            pass
+
+    async def _send(self, ws, text):
+        await ws.send_str(text)
+        self.stats["ws_messages"] += 1
+
+    async def _feed(self, ws, subs, mini):
+        started = time.time()
+        lifetime = self.disconnect_every * random.uniform(0.8, 1.2) if self.disconnect_every else None
+        now = self.now_ms()
+        next_close = {i: (now // INTERVAL_MS[i] + 1) * INTERVAL_MS[i] for i in subs}
+        next_update = time.time()
+        next_ticker = time.time() if mini else None
+        while not ws.closed:
+            if self.paused:
+                await asyncio.sleep(0.2)
+                continue
+            wake = [self.real_at(t) for t in next_close.values()]
+            if self.update_ms and subs:
+                wake.append(next_update)
+            if next_ticker is not None:
+                wake.append(next_ticker)
+            if lifetime is not None:
+                wake.append(started + lifetime)
+            if not wake:
+                await asyncio.sleep(1)  # подписки нет — ждём закрытия клиентом
+                continue
+            delay = min(wake) - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            real = time.time()
+            if lifetime is not None and real >= started + lifetime:
+                self.stats["ws_disconnects"] += 1
+                await ws.close()
+                return
+            now = self.now_ms()
+            for interval, t in next_close.items():
+                if now < t:
+                    continue
+                step = INTERVAL_MS[interval]
+                next_close[interval] = (now // step + 1) * step
+                event_ms = int(real * 1000)
+                if self.ws_latency_ms:
+                    await asyncio.sleep(self.ws_latency_ms / 1000)
+                for symbol in subs[interval]:
+                    rows = self.market.klines(symbol, interval, 1, t - 1)
+                    if rows and rows[-1][0] == t - step:
+                        await self._send(ws, kline_message(symbol, interval, rows[-1], True, event_ms))
+                        self.stats["closed_sent"] += 1
+            if self.update_ms and subs and real >= next_update:
+                next_update = real + self.update_ms / 1000
+                for interval, symbols in subs.items():
+                    for symbol in symbols:
+                        rows = self.market.klines(symbol, interval, 1, now)
+                        if rows:
+                            await self._send(ws, kline_message(symbol, interval, rows[-1], False, int(real * 1000)))
+            if next_ticker is not None and real >= next_ticker:
+                next_ticker = real + 1
+                data = [{"e": "24hrMiniTicker", "E": int(real * 1000), "s": t["symbol"],
+                         "c": t.get("lastPrice", "0"), "q": t["quoteVolume"]} for t in self.market.tickers()]
+                await self._send(ws, json.dumps({"stream": "!miniTicker@arr", "data": data}))
+
+    # ----- запуск -----
+    async def _serve(self):
+        from aiohttp import web
+
+        runner = web.AppRunner(self.app(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, self.host, self.port).start()
+        self.stopped = asyncio.Event()
+        self.ready.set()
+        await self.stopped.wait()
+        await runner.cleanup()
+
+    def start(self):
+        """Сервер в фоновом потоке со своим event loop."""
+        def run():
+            self.loop = asyncio.new_event_loop()
+            self.loop.run_until_complete(self._serve())
+
+        self.thread = Thread(target=run, daemon=True)
+        self.thread.start()
+        if not self.ready.wait(10):
+            raise RuntimeError(f"стенд не запустился на {self.host}:{self.port}")
+        return self
+
+    def stop(self):
+        """Закрывает соединения и освобождает порт."""
+        self.loop.call_soon_threadsafe(self.stopped.set)
+        self.thread.join(10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный стенд Binance Futures")
+    parser.add_argument("--symbols", type=int, default=500, help="символов синтетического рынка")
+    parser.add_argument("--recording", help="данные из записи bench.record_klines вместо синтетики")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--speed", type=float, default=1.0, help="во сколько раз время стенда быстрее реального")
+    parser.add_argument("--update-ms", type=int, default=250, help="незакрытые обновления свечи; 0 — только закрытия")
+    parser.add_argument("--rest-latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0, help="случайная добавка к задержке REST")
+    parser.add_argument("--ws-latency-ms", type=float, default=0, help="задержка закрытых свечей в потоке")
+    parser.add_argument("--disconnect-every", type=float, default=0, help="рвать каждое WebSocket-соединение через ~N секунд")
+    args = parser.parse_args()
+
+    market = RecordedMarket(args.recording) if args.recording else SyntheticMarket(args.symbols, args.seed)
+    server = FakeBinance(market, args.host, args.port, args.speed, args.update_ms, args.rest_latency_ms,
+                         args.jitter_ms, args.ws_latency_ms, args.disconnect_every).start()
+    print(f"🧪 Стенд: {len(market.symbols)} символов, x{args.speed}. Окружение бота:")
+    for k, v in server.env().items():
+        print(f"export {k}={v}")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"📊 {dict(server.stats)}")
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Ядра engine/kernels.py (numba и запасной NumPy) против кода без ядер на той же матрице
+символы × свечи.
+
+    python -m bench.kernels
+    python -m bench.kernels --symbols 500 --bars 1500 --repeat 5 --json kernels.json
+
+Эталон — код без ядер: pandas (ewm, calculate_atr, calculate_session_vwap из engine/indicators.py)
+по каждому символу, SwingTracker по каждой свече, для TP/SL — прежний поиск симулятора
+(searchsorted по накопленному ходу). Время — медиана repeat
+прогонов всей матрицы; у numba первый вызов (компиляция) показан отдельно.
+Расхождение — максимум |ядро - эталон| / |эталон| по всем клеткам; для свингов и TP/SL —
+число несовпавших клеток. Циклы ядер без компиляции сверяются с NumPy на первых символах.
+"""
+import argparse
+import json
+import statistics
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from engine import kernels
+
+P = SimpleNamespace(EMA_FAST=20, EMA_SLOW=200, ATR_LEN=14)
+SWING_WINDOW = 50
+HORIZON = 500
+MAX_MOVE = 1000.0  # ход цены в долях от входа, выше которого уровни не ищутся
+
+
+def synthetic_matrix(symbols, bars, interval_ms=300_000, seed=1):
+    """Случайные блуждания; у каждого десятого символа история короче (NaN слева)."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.003, (symbols, bars)), axis=1))
+    open_ = np.concatenate([close[:, :1], close[:, :-1]], axis=1)
+    high = np.maximum(open_, close) * (1 + rng.random((symbols, bars)) * 0.002)
+    low = np.minimum(open_, close) * (1 - rng.random((symbols, bars)) * 0.002)
+    volume = rng.random((symbols, bars)) * 1e5
+    for i in range(0, symbols, 10):
+        cut = int(rng.integers(1, bars // 2))
+        for a in (open_, high, low, close, volume):
+            a[i, :cut] = np.nan
+    open_time = 1_700_000_000_000 + np.arange(bars, dtype=np.int64) * interval_ms
+    return {"open_time": open_time, "open": open_, "high": high, "low": low, "close": close, "volume": volume}
+
+
+def trades_matrix(m, count, seed=2):
+    """Входы на случайных свечах: пути high/low после входа (NaN за концом истории) и уровни TP/SL."""
+    rng = np.random.default_rng(seed)
+    symbols, bars = m["close"].shape
+    high = np.full((count, HORIZON), np.nan)
+    low = np.full((count, HORIZON), np.nan)
+    entry = np.empty(count)
+    for t in range(count):
+        i = int(rng.integers(symbols))
+        start = int(np.flatnonzero(~np.isnan(m["close"][i]))[0])
+        s = int(rng.integers(start + 1, bars - 1))
+        e = min(s + HORIZON, bars)
+        high[t, :e - s] = m["high"][i, s:e]
+        low[t, :e - s] = m["low"][i, s:e]
+        entry[t] = m["close"][i, s - 1]
+    buy = rng.random(count) < 0.5
+    tp_pct, sl_pct = rng.uniform(0.005, 0.05, count), rng.uniform(0.003, 0.03, count)
+    return {"high": high, "low": low, "entry": entry, "buy": buy, "tp_pct": tp_pct, "sl_pct": sl_pct}
+
+
+# ================= КОД БЕЗ ЯДЕР =================
+def pandas_indicators(m):
+    import pandas as pd
+    from engine.indicators import calculate_atr, calculate_session_vwap
+
+    out = {k: np.full(m["close"].shape, np.nan) for k in ("ema20", "ema200", "atr", "vwap")}
+    for i in range(m["close"].shape[0]):
+        valid = ~np.isnan(m["close"][i])
+        df = pd.DataFrame({"open_time": m["open_time"][valid],
+                           **{c: m[c][i, valid] for c in ("open", "high", "low", "close", "volume")}})
+        columns = {"ema20": df["close"].ewm(span=P.EMA_FAST, adjust=False).mean(),
+                   "ema200": df["close"].ewm(span=P.EMA_SLOW, adjust=False).mean(),
+                   "atr": calculate_atr(df, P.ATR_LEN), "vwap": calculate_session_vwap(df)}
+        for k in out:
+            out[k][i, valid] = columns[k].to_numpy()
+    return out
+
+
+def tracker_swings(m):
+    from engine.swing import SwingTracker
+
+    symbols, bars = m["close"].shape
+    out = np.zeros((2, symbols, bars), dtype=np.int64)
+    rows = np.stack([m["open_time"].astype(float)[None, :].repeat(symbols, 0), m["open"], m["high"],
+                     m["low"], m["close"], m["volume"]], axis=-1)
+    swings = SwingTracker(SWING_WINDOW + 1)
+    for i in range(symbols):
+        symbol = f"S{i}"
+        first = int(np.flatnonzero(~np.isnan(m["close"][i]))[0])
+        for j in range(first, bars):
+            swings.update(symbol, rows[i, first:j + 1], appended=j > first)
+            low, high = swings.bars_since[symbol]
+            out[0, i, j] = 0 if np.isinf(low) else int(low)
+            out[1, i, j] = 0 if np.isinf(high) else int(high)
+    return out
+
+
+def first_passage(path, levels):
+    """
+    Индекс первой свечи, где накопленный ход path[i] достиг levels[i] (len(row), если не достиг).
+    path — неубывающие строки; все строки ищутся одним searchsorted (строки сдвигаются на константу
+    и склеиваются в один отсортированный массив).
+    """
+    n, h = path.shape
+    offset = MAX_MOVE + 1
+    shift = np.arange(n) * offset
+    flat = (np.clip(path, 0, MAX_MOVE) + shift[:, None]).ravel()
+    target = np.where(np.isfinite(levels) & (levels > 0), levels, offset)
+    pos = np.searchsorted(flat, shift + np.minimum(target, offset), side="left") - np.arange(n) * h
+    return np.minimum(pos, h)
+
+
+def searchsorted_touch(t):
+    entry, buy = t["entry"][:, None], t["buy"][:, None]
+    # первая NaN-свеча обрывает путь, дальше накопленный ход стоит
+    valid = np.cumprod(~np.isnan(t["high"]), axis=1).sum(axis=1)
+    up = np.fmax.accumulate(np.nan_to_num(t["high"], nan=-np.inf), axis=1) / entry - 1
+    down = 1 - np.fmin.accumulate(np.nan_to_num(t["low"], nan=np.inf), axis=1) / entry
+    fav, adv = np.where(buy, up, down), np.where(buy, down, up)
+    tp_at, sl_at = first_passage(fav, t["tp_pct"]), first_passage(adv, t["sl_pct"])
+    tp_at = np.where(tp_at < valid, tp_at, HORIZON)
+    sl_at = np.where(sl_at < valid, sl_at, HORIZON)
+    is_sl = (sl_at < HORIZON) & (sl_at <= tp_at)
+    is_tp = (tp_at < HORIZON) & ~is_sl
+    bar = np.where(is_sl, sl_at, np.where(is_tp, tp_at, -1))
+    return bar, np.where(is_sl, kernels.SL, np.where(is_tp, kernels.TP, kernels.OPEN))
+
+
+# ================= ЯДРА =================
+def kernel_indicators(m):
+    return {
+        "ema20": kernels.ema(m["close"], P.EMA_FAST),
+        "ema200": kernels.ema(m["close"], P.EMA_SLOW),
+        "atr": kernels.atr(m["high"], m["low"], m["close"], P.ATR_LEN),
+        "vwap": kernels.session_vwap(m["open_time"], m["high"], m["low"], m["close"], m["volume"]),
+    }
+
+
+def kernel_swings(m):
+    return np.stack([kernels.swing_scan(m["low"], SWING_WINDOW),
+                     kernels.swing_scan(m["high"], SWING_WINDOW, below=False)])
+
+
+def kernel_touch(t):
+    sign = np.where(t["buy"], 1.0, -1.0)
+    return kernels.first_touch(t["high"], t["low"], t["entry"] * (1 + sign * t["tp_pct"]),
+                               t["entry"] * (1 - sign * t["sl_pct"]), t["buy"])
+
+
+def max_rel_diff(got, want):
+    worst = 0.0
+    for k in want:
+        a, b = got[k], want[k]
+        if not np.array_equal(np.isnan(a), np.isnan(b)):
+            return float("inf")
+        ok = ~np.isnan(b)
+        worst = max(worst, float(np.max(np.abs(a[ok] - b[ok]) / np.maximum(np.abs(b[ok]), 1e-300), initial=0.0)))
+    return worst
+
+
+def mismatches(got, want):
+    if isinstance(want, tuple):
+        return int(sum(np.sum(a != b) for a, b in zip(got, want)))
+    return int(np.sum(got != want))
+
+
+def timed(fn, arg, repeat):
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = fn(arg)
+        times.append(time.perf_counter() - t)
+    return result, round(statistics.median(times) * 1000, 1)
+
+
+def check_loops(m, t, rows=5):
+    """Циклы ядер (исходник numba) как обычный Python против NumPy на первых символах."""
+    small = {k: (v[:300] if v.ndim == 1 else v[:rows, :300]) for k, v in m.items()}
+    trades = {k: v[:rows] for k, v in t.items()}
+    backend = kernels.BACKEND
+    out = {}
+    for name in ("python", "numpy"):
+        kernels.use(name)
+        indicators = kernel_indicators(small)
+        indicators["atr_wilder"] = kernels.atr(small["high"], small["low"], small["close"], P.ATR_LEN, wilder=True)
+        out[name] = (indicators, kernel_swings(small), kernel_touch(trades))
+    kernels.use(backend)
+    loops, fallback = out["python"], out["numpy"]
+    return max_rel_diff(loops[0], fallback[0]), mismatches(loops[1], fallback[1]) + mismatches(loops[2], fallback[2])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ядра индикаторов и TP/SL: numba / NumPy / код без ядер")
+    parser.add_argument("--symbols", type=int, default=300)
+    parser.add_argument("--bars", type=int, default=1000)
+    parser.add_argument("--trades", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="сохранить результат в JSON")
+    args = parser.parse_args()
+
+    m = synthetic_matrix(args.symbols, args.bars)
+    t = trades_matrix(m, args.trades)
+    cases = {
+        "индикаторы": (pandas_indicators, kernel_indicators, m, max_rel_diff),
+        "свинги": (tracker_swings, kernel_swings, m, mismatches),
+        "TP/SL": (searchsorted_touch, kernel_touch, t, mismatches),
+    }
+    backends = ["numpy"] + (["numba"] if kernels.NUMBA else [])
+    print(f"📊 {args.symbols} символов × {args.bars} свечей, {args.trades} сделок × {HORIZON} свечей, "
+          f"медиана {args.repeat} прогонов; numba: {'есть' if kernels.NUMBA else 'не установлена'}")
+    print(f"{'ядро':<12} {'без ядер':>10} " + " ".join(f"{b:>10} {'×':>6} {'расх.':>8}" for b in backends)
+          + (f" {'компиляция':>11}" if kernels.NUMBA else ""))
+    pandas_indicators({k: v if v.ndim == 1 else v[:1] for k, v in m.items()})  # прогрев pandas
+    results = {}
+    for name, (baseline, kernel, data, diff) in cases.items():
+        want, base_ms = timed(baseline, data, 1 if name == "свинги" else args.repeat)
+        row = {"baseline_ms": base_ms}
+        line = f"{name:<12} {base_ms:>8.1f}ms "
+        for backend in backends:
+            kernels.use(backend)
+            t0 = time.perf_counter()
+            kernel(data)  # у numba — компиляция
+            first_ms = round((time.perf_counter() - t0) * 1000, 1)
+            got, ms = timed(kernel, data, args.repeat)
+            row[backend] = {"ms": ms, "speedup": round(base_ms / ms, 1) if ms else None,
+                            "diff": diff(got, want), "first_call_ms": first_ms}
+            line += f"{ms:>8.1f}ms {row[backend]['speedup']:>5}x {row[backend]['diff']:>8.2g} "
+        if kernels.NUMBA:
+            line += f"{row['numba']['first_call_ms']:>9.0f}ms"
+        print(line)
+        results[name] = row
+    kernels.use(backends[-1])
+    loop_diff, loop_mismatch = check_loops(m, t)
+    print(f"🔁 Циклы ядер (Python) против NumPy: расхождение {loop_diff:.2g}, несовпадений {loop_mismatch}")
+    results["loops_vs_numpy"] = {"max_rel_diff": loop_diff, "mismatches": loop_mismatch}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Разбор REST-свечей: старый путь через DataFrame против KlineDecoder (engine/klines.py).
+
+    python -m bench.klines
+    python -m bench.klines --bars 1500 --repeat 200 --json klines.json
+
+Время — медиана и p99 по repeat разборам одного ответа; память — пик tracemalloc за один разбор
+(у декодера буферы уже выделены прошлым вызовом и в пик не входят).
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+import tracemalloc
+
+KLINE_COLUMNS = [
+    "open_time", "open", "high", "low", "close", "volume",
+    "close_time", "quote_volume", "trades", "taker_buy_base", "taker_buy_quote", "ignore",
+]
+
+
+def synthetic_klines(bars, interval_ms=300_000, seed=1):
+    """Ответ /fapi/v1/klines: числа строками, как отдаёт Binance."""
+    rng = random.Random(seed)
+    price, t, out = 100.0, 1_700_000_000_000, []
+    for _ in range(bars):
+        o = price
+        price *= 1 + rng.gauss(0, 0.003)
+        h, l = max(o, price) * (1 + rng.random() * 0.002), min(o, price) * (1 - rng.random() * 0.002)
+        v = rng.random() * 1e5
+        out.append([t, f"{o:.4f}", f"{h:.4f}", f"{l:.4f}", f"{price:.4f}", f"{v:.3f}", t + interval_ms - 1,
+                    f"{v * price:.4f}", rng.randint(10, 1000), f"{v / 2:.3f}", f"{v * price / 2:.4f}", "0"])
+        t += interval_ms
+    return out
+
+
+def pandas_all(klines):
+    import pandas as pd
+    df = pd.DataFrame(klines, columns=KLINE_COLUMNS)
+    for c in ("open", "high", "low", "close", "volume"):
+        df[c] = df[c].astype(float)
+    return df
+
+
+def pandas_close(klines):
+    import pandas as pd
+    df = pd.DataFrame(klines, columns=KLINE_COLUMNS)
+    df["close"] = df["close"].astype(float)
+    return df
+
+
+def decoder_all(klines):
+    from engine.klines import decoder
+    return decoder().decode(klines)
+
+
+def decoder_close(klines):
+    from engine.klines import decoder
+    return decoder().decode(klines, ("close",))
+
+
+CASES = {
+    "pandas (все поля)": pandas_all,
+    "decoder (все поля)": decoder_all,
+    "pandas (close)": pandas_close,
+    "decoder (close)": decoder_close,
+}
+
+
+def measure(fn, klines, repeat):
+    fn(klines)  # прогрев: импорт, буферы декодера
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn(klines)
+        times.append(time.perf_counter() - t)
+    tracemalloc.start()
+    fn(klines)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "median_ms": round(statistics.median(times) * 1000, 3),
+        "p99_ms": round(sorted(times)[int(0.99 * (len(times) - 1))] * 1000, 3),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Разбор свечей: DataFrame против KlineDecoder")
+    parser.add_argument("--bars", type=int, default=1500)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--json", help="сохранить результат в JSON")
+    args = parser.parse_args()
+
+    klines = synthetic_klines(args.bars)
+    results = {name: measure(fn, klines, args.repeat) for name, fn in CASES.items()}
+
+    print(f"📊 Разбор {args.bars} свечей, {args.repeat} повторов")
+    print(f"{'путь':<20} {'медиана':>9} {'p99':>9} {'пик памяти':>11}")
+    for name, r in results.items():
+        print(f"{name:<20} {r['median_ms']:>7.3f}ms {r['p99_ms']:>7.3f}ms {r['peak_kb']:>8.1f} KB")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
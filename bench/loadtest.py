@@ -0,0 +1,212 @@
+"""
+Нагрузочный тест ботов на локальном стенде (bench/fakebinance.py): где каждый бот перестаёт
+успевать при росте вселенной.
+
+    python -m bench.loadtest
+    python -m bench.loadtest --bots main.py --symbols 100 500 1000 --seconds 60 --json load.json
+    python -m bench.loadtest ... --update-ms 100 --rest-latency-ms 50 --disconnect-every 30
+
+Для каждого бота и размера вселенной поднимается стенд с синтетическим рынком, бот запускается
+отдельным процессом (python main*.py) на конфиге по умолчанию: все символы ликвидны, снимок выключен,
+поток свечей — --base-interval (1m), время стенда ускорено так, что базовая свеча закрывается
+раз в --bar-seconds. После прогрева --seconds секунд меряется работа, затем поток ставится на паузу,
+пока бот не разберёт очередь.
+
+Бот насыщен, если разобрал меньше 99% отправленных за весь прогон закрытых свечей, p99
+критического пути бара (bar_critical) дольше самой свечи (--bar-seconds) или p99 задержки
+доставки (ws_lag: от отправки стендом до callback бота) больше --max-lag. Наибольшая очередь
+только показывается (незакрытые обновления в неё не попадают). CPU — доля одного ядра процессом
+бота за окно.
+"устар." — закрытия, по которым сигнал не искали из-за возраста (stale_bars, engine/taskqueue.py),
+"слито" — закрытия, слитые очередью сверх QUEUE_MAX (queue_shed).
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.fakebinance import FakeBinance, SyntheticMarket
+from engine.config import INTERVAL_SECONDS, load_config
+from engine.metrics import cpu_seconds
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BOTS = {"main.py": "config1.json", "main_spike.py": "confsp1.json", "main_impulse.py": "confimp1.json"}
+
+
+def read_metrics(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def wait_dump(path, timeout):
+    """Ждёт следующей записи METRICS_FILE ботом и возвращает её."""
+    before = os.path.getmtime(path) if os.path.exists(path) else 0
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        time.sleep(0.2)
+        if os.path.exists(path) and os.path.getmtime(path) != before:
+            m = read_metrics(path)
+            if m is not None:
+                return m
+    return read_metrics(path)
+
+
+def run_step(bot, symbols, args, port):
+    speed = INTERVAL_SECONDS[args.base_interval] / args.bar_seconds
+    server = FakeBinance(SyntheticMarket(symbols, args.seed), port=port, speed=speed, update_ms=args.update_ms,
+                         rest_latency_ms=args.rest_latency_ms, jitter_ms=args.jitter_ms,
+                         ws_latency_ms=args.ws_latency_ms, disconnect_every=args.disconnect_every).start()
+    workdir = tempfile.mkdtemp(prefix="loadtest_")
+    metrics_file = os.path.join(workdir, "metrics.json")
+    config = load_config(os.path.join(ROOT, BOTS[bot]))
+    config.update(NAME=f"LOAD{symbols}", MIN_24H_VOLUME=0, SNAPSHOT_SECONDS=0, REST_WEIGHT_BUDGET=10 ** 6,
+                  KLINE_CACHE=os.path.join(workdir, "kline_cache"), BASE_INTERVAL=args.base_interval)
+    config_path = os.path.join(workdir, "config.json")
+    with open(config_path, "w") as f:
+        json.dump(config, f)
+    env = {**os.environ, **server.env(), "METRICS_FILE": metrics_file, "BOT_TOKEN": "load", "CHAT_ID": "0"}
+    log = open(os.path.join(workdir, "bot.log"), "w")
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, bot), "--config", config_path],
+                            cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    row = {"bot": bot, "symbols": symbols, "speed": speed}
+    try:
+        deadline = time.time() + args.warmup_timeout
+        m = None
+        while time.time() < deadline and proc.poll() is None:
+            time.sleep(0.5)
+            m = read_metrics(metrics_file)
+            if m and "warmup_s" in m["gauges"]:
+                break
+        if not m or "warmup_s" not in m["gauges"]:
+            row["error"] = "бот упал" if proc.poll() is not None else "прогрев не закончился"
+            return row
+        row["warmup_s"] = m["gauges"]["warmup_s"]
+
+        msgs0, cpu0, t0 = server.stats["ws_messages"], cpu_seconds(proc.pid), time.time()
+        rest0 = sum(v for k, v in server.stats.items() if k.startswith("rest "))
+        max_queue = 0
+        while time.time() - t0 < args.seconds and proc.poll() is None:
+            time.sleep(1)
+            m = read_metrics(metrics_file) or m
+            max_queue = max(max_queue, m["gauges"].get("queue_size", 0))
+        elapsed = time.time() - t0
+        cpu = (cpu_seconds(proc.pid) - cpu0) / elapsed
+        messages = server.stats["ws_messages"] - msgs0
+        server.paused = True
+        # закрытия, отправленные до паузы, должны дойти до счётчика бота
+        end = wait_dump(metrics_file, 10)
+        for _ in range(6):
+            if end["gauges"].get("queue_size", 0) == 0:
+                break
+            end = wait_dump(metrics_file, 10)
+        end = wait_dump(metrics_file, 10)
+        sent = server.stats["closed_sent"]
+        processed = end["counters"].get("closed_bars", 0)
+        timings = end["timings_ms"]
+        row.update({
+            "closed_sent": sent,
+            "closed_processed": processed,
+            "msgs_per_s": round(messages / elapsed, 1),
+            "bar_critical_p50_ms": timings.get("bar_critical", {}).get("p50", 0.0),
+            "bar_critical_p99_ms": timings.get("bar_critical", {}).get("p99", 0.0),
+            "ws_lag_p50_ms": timings.get("ws_lag", {}).get("p50", 0.0),
+            "ws_lag_p99_ms": timings.get("ws_lag", {}).get("p99", 0.0),
+            "max_queue": max_queue,
+            "cpu": round(cpu, 2),
+            "rss_mb": end["gauges"].get("mem_rss"),
+            "rest_calls": sum(v for k, v in server.stats.items() if k.startswith("rest ")) - rest0,
+            "ws_disconnects": server.stats["ws_disconnects"],
+            "telegrams": server.stats["telegram"],
+            "stale_bars": end["counters"].get("stale_bars", 0),
+            "queue_shed": end["counters"].get("queue_shed", 0),
+            "queue_overflow": end["counters"].get("queue_overflow", 0),
+        })
+        reasons = []
+        if sent and processed < 0.99 * sent:
+            reasons.append(f"разобрано {processed}/{sent}")
+        if row["ws_lag_p99_ms"] > args.max_lag * 1000:
+            reasons.append(f"ws_lag p99 {row['ws_lag_p99_ms'] / 1000:.1f}s")
+        if row["bar_critical_p99_ms"] > args.bar_seconds * 1000:
+            reasons.append(f"крит. путь p99 {row['bar_critical_p99_ms'] / 1000:.1f}s")
+        if not sent:
+            reasons.append("нет закрытых свечей")
+        row["saturated"] = reasons
+        return row
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(15)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        log.close()
+        server.stop()
+        if args.keep:
+            row["workdir"] = workdir
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_row(r):
+    if "error" in r:
+        print(f"{r['bot']:<16} {r['symbols']:>6}  ❌ {r['error']}")
+        return
+    status = "✅" if not r["saturated"] else "🔥 " + ", ".join(r["saturated"])
+    print(f"{r['bot']:<16} {r['symbols']:>6} {r['warmup_s']:>7.1f}s {r['closed_processed']:>6}/{r['closed_sent']:<6} "
+          f"{r['msgs_per_s']:>8.0f} {r['bar_critical_p99_ms']:>9.0f}ms {r['ws_lag_p99_ms']:>8.0f}ms "
+          f"{r['max_queue']:>6} {r['stale_bars']:>6} {r['queue_shed']:>8} "
+          f"{r['cpu'] * 100:>5.0f}% {r['rss_mb'] or 0:>7.0f}MB  {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест ботов на локальном стенде")
+    parser.add_argument("--bots", nargs="+", default=list(BOTS), choices=list(BOTS))
+    parser.add_argument("--symbols", nargs="+", type=int, default=[100, 250, 500, 1000])
+    parser.add_argument("--base-interval", default="1m")
+    parser.add_argument("--bar-seconds", type=float, default=5, help="реальных секунд на базовую свечу")
+    parser.add_argument("--seconds", type=float, default=60, help="окно измерения после прогрева")
+    parser.add_argument("--update-ms", type=int, default=250, help="незакрытые обновления свечи (Binance: 250)")
+    parser.add_argument("--rest-latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--ws-latency-ms", type=float, default=0)
+    parser.add_argument("--disconnect-every", type=float, default=0)
+    parser.add_argument("--max-lag", type=float, default=1.0, help="порог p99 ws_lag, секунд")
+    parser.add_argument("--warmup-timeout", type=float, default=600)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--all", action="store_true", help="не останавливаться на первом насыщении")
+    parser.add_argument("--keep", action="store_true", help="не удалять рабочие папки (логи ботов)")
+    parser.add_argument("--json", help="сохранить результат в JSON")
+    args = parser.parse_args()
+
+    print(f"🧪 Базовый поток {args.base_interval}, свеча за {args.bar_seconds}s, обновления раз в {args.update_ms}ms, "
+          f"окно {args.seconds:.0f}s")
+    print(f"{'бот':<16} {'символы':>6} {'прогрев':>8} {'закрытия':>13} {'msg/s':>8} {'крит.p99':>11} "
+          f"{'lag p99':>10} {'очередь':>6} {'устар.':>6} {'слито':>8} {'CPU':>6} {'RSS':>9}")
+    results, port = [], args.port
+    for bot in args.bots:
+        saturation = None
+        for symbols in sorted(args.symbols):
+            row = run_step(bot, symbols, args, port)
+            port += 1  # прошлый стенд может ещё держать порт
+            results.append(row)
+            print_row(row)
+            if (row.get("saturated") or "error" in row) and saturation is None:
+                saturation = symbols
+                if not args.all:
+                    break
+        print(f"   ➜ {bot}: " + (f"насыщение на {saturation} символах" if saturation
+                                    else f"не насыщен до {max(args.symbols)} символов"))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Запись реального combined-stream потока свечей для bench.replay.
+
+    python -m bench.record_klines --interval 5m --minutes 120 -o rec_5m.jsonl.gz
+    python -m bench.record_klines --synthetic --symbols 50 --bars 300 -o syn_5m.jsonl.gz
+
+Перед стартом потока сохраняется ticker/24hr и история LOOKBACK свечей
+по каждому символу (seed), чтобы реплей мог отвечать на REST без сети.
+"""
+import argparse
+import time
+from threading import Lock
+
+from bench.recording import RecordingWriter, write_synthetic
+
+BLACKLIST = {
+    "BTCUSDT", "ETHUSDT", "BNBUSDT", "SOLUSDT",
+    "XRPUSDT", "ADAUSDT", "DOGEUSDT", "LINKUSDT"
+}
+
+
+def record_live(path, interval, minutes, min_volume, seed_bars, closed_only):
+    from binance.client import Client
+    from binance import ThreadedWebsocketManager
+
+    client = Client()
+    tickers = client._request_futures_api(method="get", path="ticker/24hr")
+    symbols = [
+        t["symbol"] for t in tickers
+        if t["symbol"].endswith("USDT") and t["symbol"] not in BLACKLIST
+        and float(t["quoteVolume"]) >= min_volume
+    ]
+    # BTCUSDT нужен ботам для корреляции
+    recorded = symbols + ["BTCUSDT"]
+    print(f"✅ Записываем {len(symbols)} токенов + BTCUSDT, {interval}, {minutes} мин")
+
+    writer = RecordingWriter(path, interval, recorded)
+    writer.ticker([{"symbol": t["symbol"], "quoteVolume": t["quoteVolume"]} for t in tickers])
+    for s in recorded:
+        writer.seed(s, interval, client.futures_klines(symbol=s, interval=interval, limit=seed_bars))
+
+    lock = Lock()
+    count = [0]
+
+    def on_message(msg):
+        if closed_only and not msg.get("data", {}).get("k", {}).get("x"):
+            return
+        with lock:
+            writer.message(msg)
+            count[0] += 1
+
+    twm = ThreadedWebsocketManager()
+    twm.start()
+    chunk_size = 30
+    for i in range(0, len(recorded), chunk_size):
+        streams = [f"{s.lower()}@kline_{interval}" for s in recorded[i:i + chunk_size]]
+        twm.start_multiplex_socket(callback=on_message, streams=streams)
+
+    try:
+        time.sleep(minutes * 60)
+    except KeyboardInterrupt:
+        pass
+    twm.stop()
+    with lock:
+        writer.close()
+    print(f"💾 {path}: {count[0]} сообщений")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Запись потока свечей для бенчмарка")
+    parser.add_argument("-o", "--output", required=True, help=".jsonl или .jsonl.gz")
+    parser.add_argument("--interval", default="5m")
+    parser.add_argument("--minutes", type=float, default=60)
+    parser.add_argument("--min-volume", type=float, default=40_000_000)
+    parser.add_argument("--seed-bars", type=int, default=1500)
+    parser.add_argument("--closed-only", action="store_true", help="писать только закрытые свечи")
+    parser.add_argument("--synthetic", action="store_true", help="сгенерировать запись без сети")
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--bars", type=int, default=300)
+    parser.add_argument("--updates-per-bar", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        write_synthetic(args.output, args.symbols, args.bars, args.seed_bars, args.interval,
+                        args.updates_per_bar, args.seed)
+        print(f"💾 {args.output}: синтетика {args.symbols} токенов × {args.bars} свечей")
+    else:
+        record_live(args.output, args.interval, args.minutes, args.min_volume,
+                    args.seed_bars, args.closed_only)
+
+
+if __name__ == "__main__":
+    main()
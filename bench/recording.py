@@ -0,0 +1,162 @@
+import gzip
+import json
+import math
+import random
+import time
+
+# ================= ФОРМАТ ЗАПИСИ =================
+# JSONL (опционально .gz), по одному объекту на строку:
+#   {"type": "meta",   "interval": "5m", "symbols": [...], "created": ...}
+#   {"type": "ticker", "data": [{"symbol": ..., "quoteVolume": ...}, ...]}
+#   {"type": "seed",   "symbol": ..., "interval": ..., "klines": [[...], ...]}
+#   {"type": "msg",    "ts": <время получения, сек>, "msg": {"stream": ..., "data": {"k": ...}}}
+# seed — история свечей на момент начала записи (то, что вернул бы REST),
+# msg — сообщения combined-stream ровно в том виде, в каком их получает handle_kline.
+
+INTERVAL_MS = {
+    "1m": 60_000,
+    "3m": 3 * 60_000,
+    "5m": 5 * 60_000,
+    "15m": 15 * 60_000,
+    "30m": 30 * 60_000,
+    "1h": 60 * 60_000,
+    "2h": 2 * 60 * 60_000,
+    "4h": 4 * 60 * 60_000,
+    "1d": 24 * 60 * 60_000,
+}
+
+
+def _open(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class RecordingWriter:
+    def __init__(self, path, interval, symbols):
+        self.f = _open(path, "w")
+        self._write({"type": "meta", "interval": interval, "symbols": list(symbols), "created": time.time()})
+
+    def _write(self, obj):
+        self.f.write(json.dumps(obj, separators=(",", ":")) + "\n")
+
+    def ticker(self, data):
+        self._write({"type": "ticker", "data": data})
+
+    def seed(self, symbol, interval, klines):
+        self._write({"type": "seed", "symbol": symbol, "interval": interval, "klines": klines})
+
+    def message(self, msg, ts=None):
+        self._write({"type": "msg", "ts": time.time() if ts is None else ts, "msg": msg})
+
+    def close(self):
+        self.f.close()
+
+
+def load_recording(path):
+    """
+    Читает запись целиком.
+    Возвращает (meta, ticker, seeds, messages), где seeds = {symbol: klines},
+    messages = [(ts, msg), ...] в порядке получения.
+    """
+    meta, ticker, seeds, messages = {}, [], {}, []
+    with _open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            obj = json.loads(line)
+            kind = obj.get("type")
+            if kind == "meta":
+                meta = obj
+            elif kind == "ticker":
+                ticker = obj["data"]
+            elif kind == "seed":
+                seeds[obj["symbol"]] = obj["klines"]
+            elif kind == "msg":
+                messages.append((obj["ts"], obj["msg"]))
+    return meta, ticker, seeds, messages
+
+
+def kline_from_ws(k):
+    """Свеча из WebSocket-сообщения в формате строки REST /fapi/v1/klines."""
+    return [k["t"], k["o"], k["h"], k["l"], k["c"], k["v"], k["T"], k["q"], k["n"], k["V"], k["Q"], "0"]
+
+
+def ws_from_kline(symbol, interval, row, closed=True):
+    """Обратное преобразование: строка REST -> сообщение combined-stream."""
+    return {
+        "stream": f"{symbol.lower()}@kline_{interval}",
+        "data": {
+            "e": "kline", "E": row[6], "s": symbol,
+            "k": {
+                "t": row[0], "T": row[6], "s": symbol, "i": interval,
+                "o": row[1], "h": row[2], "l": row[3], "c": row[4], "v": row[5],
+                "n": row[8], "x": closed, "q": row[7], "V": row[9], "Q": row[10], "B": "0",
+            },
+        },
+    }
+
+
+# ================= СИНТЕТИЧЕСКИЕ ДАННЫЕ =================
+def _synthetic_bar(rng, open_time, interval_ms, price, base_vol):
+    ret = rng.gauss(0, 0.004)
+    spike = rng.random() < 0.02
+    if spike:
+        ret *= 4
+    close = price * (1 + ret)
+    high = max(price, close) * (1 + abs(rng.gauss(0, 0.002)))
+    low = min(price, close) * (1 - abs(rng.gauss(0, 0.002)))
+    vol = base_vol * math.exp(rng.gauss(0, 0.35)) * (rng.uniform(3, 12) if spike else 1)
+    quote = vol * (high + low + close) / 3
+    return [
+        open_time, f"{price:.6f}", f"{high:.6f}", f"{low:.6f}", f"{close:.6f}", f"{vol:.3f}",
+        open_time + interval_ms - 1, f"{quote:.3f}", int(vol / 10) + 1,
+        f"{vol / 2:.3f}", f"{quote / 2:.3f}", "0",
+    ], close
+
+
+def write_synthetic(path, symbols=50, bars=300, seed_bars=1500, interval="5m",
+                    updates_per_bar=0, seed=1, start_ms=1_704_067_200_000):
+    """
+    Генерирует воспроизводимую запись без сети: случайное блуждание цены
+    с редкими всплесками объёма. updates_per_bar — число незакрытых
+    промежуточных обновлений свечи (как в живом потоке) перед закрытием.
+    Время начинается с фиксированного start_ms, чтобы сессии VWAP совпадали между прогонами.
+    """
+    rng = random.Random(seed)
+    interval_ms = INTERVAL_MS[interval]
+    # BTCUSDT пишется вместе со всеми: он в BLACKLIST, но нужен для корреляции
+    names = [f"SYN{i:03d}USDT" for i in range(symbols)] + ["BTCUSDT"]
+    start = start_ms // interval_ms * interval_ms
+    writer = RecordingWriter(path, interval, names)
+    writer.ticker([{"symbol": s, "quoteVolume": str(rng.uniform(5e7, 5e8))} for s in names])
+
+    prices = {}
+    for s in names:
+        price, base_vol = rng.uniform(0.1, 100), rng.uniform(1e4, 1e6)
+        klines = []
+        for i in range(seed_bars):
+            row, price = _synthetic_bar(rng, start + i * interval_ms, interval_ms, price, base_vol)
+            klines.append(row)
+        writer.seed(s, interval, klines)
+        prices[s] = (price, base_vol)
+
+    t0 = start + seed_bars * interval_ms
+    for b in range(bars):
+        open_time = t0 + b * interval_ms
+        ts = (open_time + interval_ms) / 1000
+        rows = {}
+        for s in names:
+            price, base_vol = prices[s]
+            rows[s], close = _synthetic_bar(rng, open_time, interval_ms, price, base_vol)
+            prices[s] = (close, base_vol)
+        for u in range(updates_per_bar):
+            ts_u = open_time / 1000 + (u + 1) * interval_ms / 1000 / (updates_per_bar + 1)
+            for s in names:
+                partial = list(rows[s])
+                partial[4] = rows[s][1]
+                writer.message(ws_from_kline(s, interval, partial, closed=False), ts=ts_u)
+        for s in names:
+            writer.message(ws_from_kline(s, interval, rows[s], closed=True), ts=ts)
+    writer.close()
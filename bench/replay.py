@@ -0,0 +1,226 @@
+"""
+Реплей записанного потока свечей через Engine.process_signal бота.
+
+    python -m bench.record_klines --synthetic --symbols 50 --bars 300 -o bench_5m.jsonl.gz
+    python -m bench.replay --bot main.py --config config1.json --recording bench_5m.jsonl.gz --speed max
+    python -m bench.replay --bot spike --config confsp1.json ...
+    python -m bench.replay ... --json result.json
+    python -m bench.replay ... --baseline result.json --max-regression 0.2
+
+REST, Excel и Telegram заменены локальными заглушками (bench/stubs.py),
+файлы состояния бота пишутся во временную папку.
+Отчёт: пропускная способность, p50/p99 задержки на закрытую свечу и на всё закрытие
+(критическая полоса engine/lanes.py), рост памяти.
+С --baseline работает как регрессионный гейт: код возврата 1 при ухудшении.
+"""
+import argparse
+import contextlib
+import io as _io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from bench.recording import load_recording
+from bench.stubs import InstrumentedQueue, IOCounters, KlineHistory, StubClient, closed_kline
+from engine.bots import load_bot
+from engine.config import load_config
+from engine.metrics import METRICS
+from engine.runtime import Engine
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    idx = min(len(values) - 1, max(0, int(round(q / 100 * (len(values) - 1)))))
+    return values[idx]
+
+
+def run_replay(bot, config, recording, speed=None, warmup_bars=0, trace=False, quiet=False):
+    bot_module = load_bot(bot)
+    config_path = os.path.abspath(config)
+    meta, ticker, seeds, messages = load_recording(recording)
+    if not messages:
+        raise SystemExit("В записи нет сообщений")
+
+    StubClient.history = KlineHistory(meta["interval"], seeds, messages)
+    StubClient.ticker = ticker
+    StubClient.calls.clear()
+    io = IOCounters()
+
+    workdir = tempfile.mkdtemp(prefix="bench_replay_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    out = contextlib.redirect_stdout(_io.StringIO()) if quiet else contextlib.nullcontext()
+    try:
+        with out:
+            engine = Engine(bot_module, load_config(config_path), client=StubClient(), journal=io, notifier=io)
+            queue = engine.task_queue = InstrumentedQueue(engine.p.QUEUE_MAX)
+            # прогрев идёт "на момент" открытия первой свечи записи,
+            # дальше REST-заглушка отвечает на момент свечи, которую обрабатывает движок
+            first_t = min(k["t"] for k in map(closed_kline, (m for _, m in messages)) if k is not None)
+            warm_as_of = first_t - StubClient.history.interval_ms
+            engine.clock = lambda: first_t / 1000
+            # с BASE_INTERVAL запись идёт в базовом интервале, а bar_time — open_time свечи бота
+            lag = engine.store.interval_ms - StubClient.history.interval_ms
+            StubClient.as_of = lambda: engine.bar_time() + lag if engine.bar_time() else warm_as_of
+            engine.start()
+            callback = engine.handle_kline
+            subscribed = set(engine.symbols)
+
+            if trace:
+                tracemalloc.start()
+            rss_start = rss_mb()
+            t_start = time.perf_counter()
+            rec_start = messages[0][0]
+            burst = None
+            for ts, msg in messages:
+                if speed:
+                    delay = (ts - rec_start) / speed - (time.perf_counter() - t_start)
+                    if delay > 0:
+                        time.sleep(delay)
+                else:
+                    # на max скорости закрытия подаются пачками по свече, как в живом потоке:
+                    # следующая пачка — только после того, как воркер разобрал предыдущую,
+                    # а отложенные полосы отработали в паузе между закрытиями
+                    k = closed_kline(msg)
+                    if k is not None and k["t"] != burst:
+                        queue.join()
+                        engine.lanes.join()
+                        burst = k["t"]
+                callback(msg)
+            queue.join()
+            engine.lanes.join()
+            elapsed = time.perf_counter() - t_start
+            rss_end = rss_mb()
+            traced = tracemalloc.get_traced_memory() if trace else None
+            if trace:
+                tracemalloc.stop()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    # в статистику идут только символы вселенной бота (BTCUSDT и пр. — нет)
+    samples = [x for x in queue.samples if x[0] in subscribed]
+    seen = {}
+    service, e2e = [], []
+    for symbol, _, s, e in samples:
+        seen[symbol] = seen.get(symbol, 0) + 1
+        if seen[symbol] <= warmup_bars:
+            continue
+        service.append(s)
+        e2e.append(e)
+
+    result = {
+        "bot": bot_module.__name__.rsplit(".", 1)[-1],
+        "config": os.path.basename(config_path),
+        "recording": os.path.basename(recording),
+        "speed": speed or "max",
+        "messages": len(messages),
+        "closed_bars": len(samples),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_bars_s": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "throughput_msgs_s": round(len(messages) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(service, 50) * 1000, 3),
+        "p99_ms": round(percentile(service, 99) * 1000, 3),
+        "e2e_p50_ms": round(percentile(e2e, 50) * 1000, 3),
+        "e2e_p99_ms": round(percentile(e2e, 99) * 1000, 3),
+        "rss_start_mb": round(rss_start, 1),
+        "rss_end_mb": round(rss_end, 1),
+        "rss_growth_mb": round(rss_end - rss_start, 1),
+        "warmup_s": METRICS.gauges.get("warmup_s"),
+        "bar_critical_p50_ms": round(METRICS.percentile("bar_critical", 50) * 1000, 3),
+        "bar_critical_p99_ms": round(METRICS.percentile("bar_critical", 99) * 1000, 3),
+        "memory_mb": {k: round(v, 2) for k, v in engine.memory_report().items() if k not in ("queue", "rss")},
+        "rest_calls": dict(StubClient.calls),
+        "io_calls": dict(io.calls),
+    }
+    if traced is not None:
+        result["traced_current_mb"] = round(traced[0] / 1024 / 1024, 2)
+        result["traced_peak_mb"] = round(traced[1] / 1024 / 1024, 2)
+    return result
+
+
+def compare(result, baseline, max_regression):
+    """Список нарушений относительно baseline (пустой — гейт пройден)."""
+    failures = []
+    if result["p99_ms"] > baseline["p99_ms"] * (1 + max_regression):
+        failures.append(f"p99 {result['p99_ms']}ms > {baseline['p99_ms']}ms × {1 + max_regression:.2f}")
+    if result["p50_ms"] > baseline["p50_ms"] * (1 + max_regression):
+        failures.append(f"p50 {result['p50_ms']}ms > {baseline['p50_ms']}ms × {1 + max_regression:.2f}")
+    if result["throughput_bars_s"] < baseline["throughput_bars_s"] * (1 - max_regression):
+        failures.append(f"throughput {result['throughput_bars_s']} < {baseline['throughput_bars_s']} × {1 - max_regression:.2f}")
+    # небольшой абсолютный допуск, чтобы шум аллокатора не валил гейт
+    if result["rss_growth_mb"] > baseline["rss_growth_mb"] * (1 + max_regression) + 5:
+        failures.append(f"рост RSS {result['rss_growth_mb']}MB > {baseline['rss_growth_mb']}MB")
+    return failures
+
+
+def print_report(r):
+    print(f"📊 {r['bot']} / {r['config']} / {r['recording']} (скорость {r['speed']})")
+    print(f"Сообщений: {r['messages']}, закрытых свечей: {r['closed_bars']}, время: {r['elapsed_s']}s")
+    print(f"Пропускная способность: {r['throughput_bars_s']} свечей/с, {r['throughput_msgs_s']} сообщений/с")
+    print(f"Задержка обработки: p50 {r['p50_ms']}ms, p99 {r['p99_ms']}ms")
+    print(f"От получения до конца: p50 {r['e2e_p50_ms']}ms, p99 {r['e2e_p99_ms']}ms")
+    print(f"Прогрев: {r.get('warmup_s')}s")
+    if "bar_critical_p50_ms" in r:
+        print(f"Закрытие свечи (критическая полоса): p50 {r['bar_critical_p50_ms']}ms, p99 {r['bar_critical_p99_ms']}ms")
+    if r.get("memory_mb"):
+        print("Память по компонентам: " + ", ".join(f"{k} {v} MB" for k, v in r["memory_mb"].items()))
+    print(f"RSS: {r['rss_start_mb']} → {r['rss_end_mb']} MB (рост {r['rss_growth_mb']} MB)")
+    if "traced_peak_mb" in r:
+        print(f"tracemalloc: текущая {r['traced_current_mb']} MB, пик {r['traced_peak_mb']} MB")
+    print(f"REST: {r['rest_calls']}, I/O: {r['io_calls']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Реплей записанных свечей через process_signal")
+    parser.add_argument("--bot", required=True,
+                        help="main.py, main_spike.py, main_impulse.py или volume/spike/impulse")
+    parser.add_argument("--config", required=True)
+    parser.add_argument("--recording", required=True)
+    parser.add_argument("--speed", default="max", help="1, 10, ... или max")
+    parser.add_argument("--warmup-bars", type=int, default=0,
+                        help="сколько первых закрытых свечей каждого символа не учитывать в задержках")
+    parser.add_argument("--tracemalloc", action="store_true", help="точный учёт аллокаций (медленнее)")
+    parser.add_argument("--quiet", action="store_true", help="не печатать вывод бота")
+    parser.add_argument("--json", help="сохранить результат в JSON")
+    parser.add_argument("--baseline", help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    speed = None if args.speed == "max" else float(args.speed)
+    result = run_replay(args.bot, args.config, args.recording, speed, args.warmup_bars,
+                        args.tracemalloc, args.quiet)
+    print_report(result)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        failures = compare(result, baseline, args.max_regression)
+        if failures:
+            for fail in failures:
+                print(f"🔴 Регрессия: {fail}")
+            sys.exit(1)
+        print("🟢 Регрессий нет")
+
+
+if __name__ == "__main__":
+    main()
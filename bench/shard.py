@@ -0,0 +1,213 @@
+"""
+Шардинг (engine/shard.py) на локальных процессах: координатор в этом процессе, воркеры —
+подпроцессы, каждый реплеит всю запись, но обрабатывает только свою долю символов.
+
+    python -m bench.shard --bot main.py --config config1.json --recording bench_5m.jsonl.gz --workers 3
+    python -m bench.shard ... --kill-after 5     # убить первого воркера посреди реплея
+
+Без --kill-after сигналы всех воркеров, собранные координатором, сравниваются с одиночным
+Engine на той же записи (текст сообщений без учёта порядка), trade_id — без повторов и
+из выданных координатором блоков (дыры — неиспользованные хвосты блоков). С --kill-after проверяется ребаланс: символы и сделки выбывшего воркера
+переходят к живым, trade_id не повторяются.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from bench.recording import load_recording
+from bench.stubs import IOCounters, KlineHistory, StubClient, closed_kline
+from engine.bots import load_bot
+from engine.config import load_config, load_params
+from engine.tickers import liquid_symbols
+
+
+class Sink(IOCounters):
+    """Журнал и Telegram, которые запоминают сообщения и trade_id."""
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+        self.trade_ids = []
+
+    def send(self, message):
+        super().send(message)
+        self.messages.append(message)
+
+    def write_trade(self, trade_id, *args, **kwargs):
+        super().write_trade(trade_id, *args, **kwargs)
+        self.trade_ids.append(trade_id)
+
+    def write_trades(self, rows):
+        super().write_trades(rows)
+        self.trade_ids.extend(row[0] for row in rows)
+
+
+def setup(recording):
+    meta, ticker, seeds, messages = load_recording(recording)
+    StubClient.history = KlineHistory(meta["interval"], seeds, messages)
+    StubClient.ticker = ticker
+    return ticker, messages
+
+
+def replay(engine, messages):
+    """Как bench.replay на max скорости: пачками по закрытию, полосы отрабатывают между ними."""
+    first_t = min(k["t"] for k in map(closed_kline, (m for _, m in messages)) if k is not None)
+    warm_as_of = first_t - StubClient.history.interval_ms
+    engine.clock = lambda: first_t / 1000
+    lag = engine.store.interval_ms - StubClient.history.interval_ms
+    StubClient.as_of = lambda: engine.bar_time() + lag if engine.bar_time() else warm_as_of
+    engine.start()
+    burst = None
+    for _, msg in messages:
+        k = closed_kline(msg)
+        if k is not None and k["t"] != burst:
+            engine.task_queue.join()
+            engine.lanes.join()
+            burst = k["t"]
+        engine.handle_kline(msg)
+    engine.task_queue.join()
+    engine.lanes.join()
+    engine.trades.flush()
+
+
+def signals(messages):
+    return Counter(m for m in messages if m.startswith("🤖"))
+
+
+def single(bot, config, recording):
+    from engine.runtime import Engine
+
+    setup(recording)
+    sink = Sink()
+    engine = Engine(load_bot(bot), config, client=StubClient(), journal=sink, notifier=sink)
+    replay(engine, load_recording(recording)[3])
+    return sink
+
+
+def child(args):
+    """Подпроцесс-воркер: подключается к координатору и реплеит запись."""
+    from engine.shard import Worker
+
+    _, messages = setup(args.recording)
+    config = load_config(args.config)
+    os.chdir(args.workdir)
+    worker = Worker(load_bot(args.bot), config, args.child, args.worker_id, client=StubClient())
+    worker.connect()
+    t = time.perf_counter()
+    replay(worker.engine, messages)
+    with open("result.json", "w") as f:
+        json.dump({"elapsed_s": round(time.perf_counter() - t, 3), "symbols": len(worker.engine.symbols),
+                   "open_trades": worker.engine.trades.table.n}, f)
+    while True:  # координатору нужен живой воркер, пока не соберут остальных
+        time.sleep(3600)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Шардинг вселенной на локальных процессах")
+    parser.add_argument("--bot", required=True)
+    parser.add_argument("--config", required=True)
+    parser.add_argument("--recording", required=True)
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--port", type=int, default=7187)
+    parser.add_argument("--kill-after", type=float, help="убить первого воркера через N секунд")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-id", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.config = os.path.abspath(args.config)
+    args.recording = os.path.abspath(args.recording)
+    os.environ.setdefault("SHARD_AUTHKEY", "bench")
+    if args.child:
+        with open(os.path.join(args.workdir, "worker.log"), "w") as log:
+            sys.stdout = log
+            child(args)
+        return
+
+    from engine.shard import Coordinator
+
+    bot = load_bot(args.bot)
+    config = load_config(args.config)
+    ticker, _ = setup(args.recording)
+    min_volume = bot.load_params(config, load_params(config)).MIN_24H_VOLUME
+    volumes = {t["symbol"]: float(t["quoteVolume"]) for t in ticker}
+    root = tempfile.mkdtemp(prefix="bench_shard_")
+    cwd = os.getcwd()
+    procs = []
+    try:
+        os.chdir(root)
+        address = f"127.0.0.1:{args.port}"
+        sink = Sink()
+        coordinator = Coordinator(bot, config, address, journal=sink, notifier=sink,
+                                  universe=lambda: liquid_symbols(volumes, min_volume), quorum=args.workers)
+        coordinator.start()
+        t = time.perf_counter()
+        for i in range(args.workers):
+            workdir = os.path.join(root, f"w{i}")
+            os.makedirs(workdir)
+            procs.append((workdir, subprocess.Popen(
+                [sys.executable, "-m", "bench.shard", "--bot", args.bot, "--config", args.config,
+                 "--recording", args.recording, "--child", address, "--worker-id", f"w{i}",
+                 "--workdir", workdir], cwd=cwd)))
+        killed = None
+        results = {}
+        while len(results) < len(procs) - (killed is not None):
+            time.sleep(0.2)
+            if args.kill_after and killed is None and time.perf_counter() - t >= args.kill_after:
+                killed = procs[0][1]
+                killed.kill()
+                print(f"💀 w0 убит на {time.perf_counter() - t:.1f}s")
+            for i, (workdir, proc) in enumerate(procs):
+                path = os.path.join(workdir, "result.json")
+                if proc is not killed and i not in results and os.path.exists(path):
+                    with open(path) as f:
+                        results[i] = json.load(f)
+                elif proc is not killed and proc.poll() is not None:
+                    raise SystemExit(f"Воркер w{i} упал, лог: {workdir}/worker.log")
+        elapsed = time.perf_counter() - t
+        time.sleep(1)  # последние сообщения воркеров доходят до координатора
+    finally:
+        for _, proc in procs:
+            proc.kill()
+        os.chdir(cwd)
+
+    ids = [int(tid) for tid in sink.trade_ids]
+    print(f"🧩 Воркеров: {args.workers}, токенов: {len(coordinator.symbols)}, время до последнего: {elapsed:.1f}s")
+    for i, r in sorted(results.items()):
+        print(f"   w{i}: {r['symbols']} токенов, реплей {r['elapsed_s']:.1f}s, открытых сделок {r['open_trades']}")
+    print(f"🔢 trade_id: {len(ids)}, уникальных {len(set(ids))}, "
+          f"диапазон {min(ids, default=0)}..{max(ids, default=0)}")
+    ok = len(ids) == len(set(ids))
+    if args.kill_after:
+        print(f"💀 Живых воркеров у координатора: {len(coordinator.workers)}, "
+              f"у них токенов: {sum(len(l.shard) for l in coordinator.workers.values())}")
+        ok &= sum(len(l.shard) for l in coordinator.workers.values()) == len(coordinator.symbols)
+    else:
+        ok &= max(ids, default=0) <= coordinator.ids.last_trade_id
+        os.makedirs(os.path.join(root, "single"))
+        os.chdir(os.path.join(root, "single"))
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                reference = single(args.bot, config, args.recording)
+        finally:
+            os.chdir(cwd)
+        got, want = signals(sink.messages), signals(reference.messages)
+        print(f"📨 Сигналов: шарды {sum(got.values())}, один процесс {sum(want.values())}, "
+              f"совпадают: {got == want}; сделок {len(ids)} / {len(reference.trade_ids)}, "
+              f"обновлений статуса {sink.calls['excel_update']} / {reference.calls['excel_update']}")
+        ok &= (got == want and len(ids) == len(reference.trade_ids)
+               and sink.calls["excel_update"] == reference.calls["excel_update"])
+    shutil.rmtree(root, ignore_errors=True)
+    print("✅ OK" if ok else "❌ FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+База объёма для спайков: среднее окна (VOLUME_BASELINE="mean") против скользящего квантиля
+(engine/quantile.py) и наивной медианы с пересортировкой окна на каждую свечу.
+
+    python -m bench.spike_modes
+    python -m bench.spike_modes --symbols 500 --bars 2000 --lookback 108 --quantile 0.5 --json spikes.json
+
+Синтетический quote_volume: логнормальный фон, редкие выбросы (×--outlier-mult) и настоящие
+спайки (×--spike-mult). Время — на одно закрытие всей вселенной сверх дописывания свечи
+в кольцевой буфер (CandleStore). Качество при пороге --vol-mult: доля пойманных настоящих
+спайков (выброс в окне раздувает среднее и глушит их) и доля срабатываний на обычных свечах.
+Квантиль сверяется с pandas rolling().quantile().
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from engine.quantile import VolumeQuantiles
+from engine.store import CandleStore, Ring
+
+
+def synthetic_volumes(symbols, bars, outlier_mult, spike_mult, seed=1):
+    rng = np.random.default_rng(seed)
+    qv = rng.lognormal(13, 0.5, (symbols, bars))
+    outliers = rng.random((symbols, bars)) < 0.005
+    spikes = (rng.random((symbols, bars)) < 0.01) & ~outliers
+    qv[outliers] *= outlier_mult
+    qv[spikes] *= spike_mult
+    return qv, spikes, outliers
+
+
+def store_for(symbols, lookback):
+    store = CandleStore(None, "5m", lookback + 1)
+    for s in symbols:
+        store.candles[s] = Ring(store.size)
+    return store
+
+
+def run(qv, lookback, mode, q):
+    """(секунд на проход, ratio symbols × bars). mode: None — только дописывание свечей."""
+    n, bars = qv.shape
+    symbols = [f"S{i}" for i in range(n)]
+    store = store_for(symbols, lookback)
+    quantiles = VolumeQuantiles(lookback, q)
+    ratio = np.full((n, bars), np.nan)
+    row = [0.0, 1.0, 1.0, 1.0, 1.0, 0.0]  # close = 1, volume = quote_volume
+    t = time.perf_counter()
+    for j in range(bars):
+        for i, s in enumerate(symbols):
+            row[0], row[5] = j, qv[i, j]
+            ring = store.candles[s]
+            ring.append(row)
+            if mode == "mean":
+                ratio[i, j] = store.quote_volume_ratio(s, lookback)
+            elif mode == "quantile":
+                quantiles.update(s, ring.view(), j > 0)
+                ratio[i, j] = quantiles.ratio(s)
+            elif mode == "naive":
+                rows = ring.view()
+                window = rows[max(0, len(rows) - 1 - lookback):-1, 5]
+                ratio[i, j] = rows[-1, 5] / np.quantile(window, q) if len(window) else np.nan
+    return time.perf_counter() - t, ratio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Спайки объёма: среднее окна против скользящего квантиля")
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--bars", type=int, default=1000)
+    parser.add_argument("--lookback", type=int, default=108)
+    parser.add_argument("--quantile", type=float, default=0.5)
+    parser.add_argument("--vol-mult", type=float, default=3.0, help="порог qv_ratio")
+    parser.add_argument("--spike-mult", type=float, default=5.0)
+    parser.add_argument("--outlier-mult", type=float, default=100.0)
+    parser.add_argument("--json", help="сохранить результат в JSON")
+    args = parser.parse_args()
+
+    qv, spikes, outliers = synthetic_volumes(args.symbols, args.bars, args.outlier_mult, args.spike_mult)
+    base_s, _ = run(qv, args.lookback, None, args.quantile)
+    warm = np.zeros_like(spikes)
+    warm[:, args.lookback:] = True  # окно уже полное
+    ordinary = warm & ~spikes & ~outliers
+    print(f"📊 {args.symbols} символов × {args.bars} свечей, окно {args.lookback}, квантиль {args.quantile}, "
+          f"порог x{args.vol_mult}; дописывание свечей {base_s / args.bars * 1000:.2f}ms на закрытие")
+    print(f"{'база':<10} {'на закрытие':>12} {'на символ':>10} {'спайков поймано':>16} {'ложных':>8}")
+    results = {}
+    ratios = {}
+    for mode in ("mean", "quantile", "naive"):
+        elapsed, ratio = run(qv, args.lookback, mode, args.quantile)
+        ratios[mode] = ratio
+        per_bar_ms = max(elapsed - base_s, 0) / args.bars * 1000
+        fired = ratio >= args.vol_mult
+        caught = float(fired[spikes & warm].mean())
+        false = float(fired[ordinary].mean())
+        results[mode] = {"per_close_ms": round(per_bar_ms, 3),
+                         "per_symbol_us": round(per_bar_ms * 1000 / args.symbols, 2),
+                         "spikes_caught": round(caught, 4), "false_fires": round(false, 5)}
+        print(f"{mode:<10} {per_bar_ms:>10.2f}ms {per_bar_ms * 1000 / args.symbols:>8.2f}µs "
+              f"{caught * 100:>15.1f}% {false * 100:>7.2f}%")
+
+    import pandas as pd
+    ref = pd.DataFrame(qv.T).shift(1).rolling(args.lookback, min_periods=1).quantile(args.quantile).to_numpy().T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ref_ratio = qv / ref
+    ok = ~np.isnan(ref_ratio)
+    diff = float(np.max(np.abs(ratios["quantile"][ok] - ref_ratio[ok]) / ref_ratio[ok]))
+    naive_diff = float(np.max(np.abs(ratios["naive"][ok] - ref_ratio[ok]) / ref_ratio[ok]))
+    print(f"🔍 Квантиль против pandas rolling().quantile(): расхождение {diff:.2g} (наивная {naive_diff:.2g})")
+    results["max_rel_diff_vs_pandas"] = diff
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Время старта и базовая память процесса бота по типам.
+
+    python -m bench.startup
+    python -m bench.startup --bot spike --config confsp1.json --recording syn_1h.jsonl.gz
+    python -m bench.startup --json startup.json
+
+Каждый замер — отдельный свежий процесс, как при старте/перезапуске дино:
+  import  — импорт точки входа (engine.runtime + модуль бота)
+  live    — импорт python-binance (клиент и WebSocket), который живой бот делает при создании Client
+  ready   — Engine + прогрев всей вселенной до "готов" (REST — заглушки на записи)
+  bar     — первое закрытие свечи записи через очередь и воркер: признаки, правила, полосы
+            (то, что модули грузят лениво, грузится здесь — pandas в живом пути быть не должно)
+  restart — перезапуск в той же папке: со снимком состояния (engine/snapshot.py)
+            и без него (только kline_cache)
+RSS снимается после каждого этапа, для прогревов считаются REST-запросы.
+Без --recording генерируется синтетическая запись.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+DEFAULTS = {
+    "volume":  "config1.json",
+    "spike":   "confsp1.json",
+    "impulse": "confimp1.json",
+}
+HEAVY = ("pandas", "openpyxl", "binance", "aiohttp", "requests", "dateparser")
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def child(bot, config, recording):
+    """Замеры внутри свежего процесса; результат — JSON в последней строке stdout."""
+    result = {"bot": bot, "python_rss_mb": round(rss_mb(), 1)}
+
+    t = time.perf_counter()
+    from engine.bots import load_bot
+    from engine.runtime import Engine
+    bot_module = load_bot(bot)
+    result["import_s"] = round(time.perf_counter() - t, 3)
+    result["import_rss_mb"] = round(rss_mb(), 1)
+    result["loaded_after_import"] = [m for m in HEAVY if m in sys.modules]
+
+    import contextlib
+    import io as _io
+    from bench.recording import load_recording
+    from bench.stubs import IOCounters, KlineHistory, StubClient
+    from engine.config import load_config
+
+    meta, ticker, seeds, messages = load_recording(recording)
+    StubClient.history = KlineHistory(meta["interval"], seeds, messages)
+    StubClient.ticker = ticker
+    first_t = min(r[-1][0] for r in seeds.values() if r) + StubClient.history.interval_ms
+    StubClient.as_of = lambda: first_t - StubClient.history.interval_ms
+    overhead = rss_mb() - result["import_rss_mb"]  # запись и заглушки бенчмарка в память бота не входят
+
+    config = load_config(os.path.abspath(config))
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    os.chdir(workdir)
+    def boot():
+        StubClient.calls.clear()
+        t = time.perf_counter()
+        with contextlib.redirect_stdout(_io.StringIO()):
+            io = IOCounters()
+            engine = Engine(bot_module, config, client=StubClient(), journal=io, notifier=io)
+            engine.clock = lambda: first_t / 1000
+            engine.start()
+        return engine, round(time.perf_counter() - t, 3), sum(StubClient.calls.values())
+
+    engine, result["ready_s"], result["ready_rest"] = boot()
+    result["ready_rss_mb"] = round(rss_mb() - overhead, 1)
+    result["symbols"] = len(engine.symbols)
+    result["loaded_after_ready"] = [m for m in HEAVY if m in sys.modules]
+
+    from bench.stubs import closed_kline
+    bar_t = min(k["t"] for k in map(closed_kline, (m for _, m in messages)) if k is not None)
+    t = time.perf_counter()
+    with contextlib.redirect_stdout(_io.StringIO()):
+        for _, msg in messages:
+            k = closed_kline(msg)
+            if k is not None and k["t"] == bar_t:
+                engine.handle_kline(msg)
+        engine.task_queue.join()
+        engine.lanes.join()
+    result["bar_s"] = round(time.perf_counter() - t, 3)
+    result["bar_rss_mb"] = round(rss_mb() - overhead, 1)
+    result["loaded_after_bar"] = [m for m in HEAVY if m in sys.modules]
+
+    from engine import snapshot
+    snapshot.write(snapshot.capture(engine), engine.snapshot_path)
+    _, result["restart_s"], result["restart_rest"] = boot()
+    os.remove(engine.snapshot_path)
+    _, result["restart_nosnap_s"], result["restart_nosnap_rest"] = boot()
+
+    t = time.perf_counter()
+    import binance.client  # noqa: F401
+    from binance import ThreadedWebsocketManager  # noqa: F401
+    result["live_import_s"] = round(time.perf_counter() - t, 3)
+    result["live_rss_mb"] = round(rss_mb() - overhead, 1)
+
+    result["total_s"] = round(result["import_s"] + result["ready_s"] + result["live_import_s"], 3)
+    print(json.dumps(result))
+    sys.stdout.flush()
+    shutil.rmtree(workdir, ignore_errors=True)
+    os._exit(0)
+
+
+def measure(bot, config, recording, repeat=3):
+    """Медиана по repeat свежим процессам."""
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-m", "bench.startup", "--child", "--bot", bot,
+             "--config", config, "--recording", recording],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+        if out.returncode != 0:
+            raise SystemExit(f"🔴 {bot}: {out.stderr.strip()[-500:]}")
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    runs.sort(key=lambda r: r["total_s"])
+    return runs[len(runs) // 2]
+
+
+def print_report(results):
+    print(f"{'бот':<8} {'импорт':>8} {'готов':>8} {'свеча':>8} {'binance':>8} {'итого':>8} "
+          f"{'RSS импорт':>11} {'RSS готов':>10} {'RSS свеча':>10} {'RSS живой':>10}")
+    for r in results:
+        print(f"{r['bot']:<8} {r['import_s']:>7.3f}s {r['ready_s']:>7.3f}s {r['bar_s']:>7.3f}s {r['live_import_s']:>7.3f}s "
+              f"{r['total_s']:>7.3f}s {r['import_rss_mb']:>8.1f} MB {r['ready_rss_mb']:>7.1f} MB "
+              f"{r['bar_rss_mb']:>7.1f} MB {r['live_rss_mb']:>7.1f} MB")
+    print(f"{'бот':<8} {'холодный':>16} {'перезапуск':>16} {'без снимка':>16}")
+    for r in results:
+        print(f"{r['bot']:<8} {r['ready_s']:>7.3f}s {r['ready_rest']:>4} REST {r['restart_s']:>7.3f}s {r['restart_rest']:>4} REST "
+              f"{r['restart_nosnap_s']:>7.3f}s {r['restart_nosnap_rest']:>4} REST")
+    for r in results:
+        print(f"{r['bot']}: после импорта загружены {r['loaded_after_import'] or '—'}, "
+              f"после прогрева {r['loaded_after_ready'] or '—'}, после первой свечи {r['loaded_after_bar'] or '—'} "
+              f"({r['symbols']} токенов)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Время старта и RSS ботов")
+    parser.add_argument("--bot", help="volume/spike/impulse (по умолчанию все три)")
+    parser.add_argument("--config")
+    parser.add_argument("--recording", help="запись с seed-историей; по умолчанию синтетическая")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="сохранить результат в JSON")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.bot, args.config, args.recording)
+        return
+
+    from bench.recording import write_synthetic
+    from engine.bots import load_bot
+
+    bots = [args.bot] if args.bot else list(DEFAULTS)
+    tmp = tempfile.mkdtemp(prefix="bench_startup_")
+    results = []
+    for bot in bots:
+        module = load_bot(bot)
+        name = module.__name__.rsplit(".", 1)[-1]
+        config = args.config or DEFAULTS[name]
+        recording = args.recording
+        if recording is None:
+            recording = os.path.join(tmp, f"syn_{module.INTERVAL}.jsonl.gz")
+            if not os.path.exists(recording):
+                write_synthetic(recording, symbols=50, bars=2, interval=module.INTERVAL)
+        results.append(measure(bot, config, recording, args.repeat))
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
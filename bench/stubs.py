@@ -0,0 +1,194 @@
+import bisect
+import time
+from collections import Counter, deque
+
+from bench.recording import INTERVAL_MS, kline_from_ws
+from engine.taskqueue import BarQueue
+
+# ================= ЛОКАЛЬНЫЕ ЗАГЛУШКИ =================
+# REST, Excel и Telegram подменяются так, чтобы process_signal
+# работал полностью офлайн и детерминированно на записанных данных.
+
+
+class KlineHistory:
+    """
+    Полная история свечей по символам: seed + все закрытые свечи из потока.
+    Срезы берутся "на момент" обрабатываемой свечи, чтобы REST-заглушка
+    не заглядывала в будущее, даже если реплей ушёл вперёд воркера.
+    """
+
+    def __init__(self, interval, seeds, messages):
+        self.interval = interval
+        self.interval_ms = INTERVAL_MS[interval]
+        rows = {s: {r[0]: r for r in klines} for s, klines in seeds.items()}
+        for _, msg in messages:
+            k = msg.get("data", {}).get("k")
+            if k and k.get("x"):
+                rows.setdefault(k["s"], {})[k["t"]] = kline_from_ws(k)
+        self.rows = {s: [by_t[t] for t in sorted(by_t)] for s, by_t in rows.items()}
+        self.times = {s: [r[0] for r in lst] for s, lst in self.rows.items()}
+        self._agg = {}
+
+    def _aggregated(self, symbol, interval):
+        key = (symbol, interval)
+        if key not in self._agg:
+            step = INTERVAL_MS[interval]
+            out = {}
+            for r in self.rows.get(symbol, []):
+                t = r[0] // step * step
+                if t not in out:
+                    out[t] = [t, r[1], float(r[2]), float(r[3]), r[4], float(r[5]), t + step - 1,
+                              float(r[7]), int(r[8]), float(r[9]), float(r[10]), "0"]
+                else:
+                    a = out[t]
+                    a[2] = max(a[2], float(r[2]))
+                    a[3] = min(a[3], float(r[3]))
+                    a[4] = r[4]
+                    a[5] += float(r[5])
+                    a[7] += float(r[7])
+                    a[8] += int(r[8])
+                    a[9] += float(r[9])
+                    a[10] += float(r[10])
+            agg = []
+            for t in sorted(out):
+                a = out[t]
+                agg.append([a[0], a[1], str(a[2]), str(a[3]), a[4], str(a[5]), a[6],
+                            str(a[7]), a[8], str(a[9]), str(a[10]), "0"])
+            self._agg[key] = (agg, [a[0] for a in agg])
+        return self._agg[key]
+
+    def klines(self, symbol, interval, limit, as_of=None, start_time=None, end_time=None):
+        """
+        Как /fapi/v1/klines: последние limit свечей, где последняя — только что
+        открывшаяся (незакрытая), если запрос идёт "в момент закрытия" as_of.
+        """
+        if interval == self.interval:
+            rows, times = self.rows.get(symbol, []), self.times.get(symbol, [])
+            step = self.interval_ms
+        else:
+            rows, times = self._aggregated(symbol, interval)
+            step = INTERVAL_MS[interval]
+        if not rows:
+            return []
+
+        lo = 0 if start_time is None else bisect.bisect_left(times, start_time)
+        if as_of is None:
+            hi = len(rows)
+        else:
+            # закрытые на момент as_of: open_time + step <= as_of + базовый интервал
+            hi = bisect.bisect_right(times, as_of + self.interval_ms - step)
+        if end_time is not None:
+            hi = min(hi, bisect.bisect_right(times, end_time))
+        out = rows[max(lo, hi - limit):hi] if start_time is None else rows[lo:hi][:limit]
+
+        if as_of is not None and start_time is None and out:
+            # незакрытая свеча в конце, как у настоящего REST сразу после закрытия
+            last = out[-1]
+            c = last[4]
+            opened = [last[0] + step, c, c, c, c, "0", last[0] + 2 * step - 1, "0", 0, "0", "0", "0"]
+            out = out[-(limit - 1):] + [opened] if limit > 1 else [opened]
+        return out
+
+
+class StubClient:
+    """Заглушка binance.client.Client: REST отвечает из записи, сеть не трогается."""
+
+    KLINE_INTERVAL_1MINUTE = "1m"
+    KLINE_INTERVAL_3MINUTE = "3m"
+    KLINE_INTERVAL_5MINUTE = "5m"
+    KLINE_INTERVAL_15MINUTE = "15m"
+    KLINE_INTERVAL_30MINUTE = "30m"
+    KLINE_INTERVAL_1HOUR = "1h"
+    KLINE_INTERVAL_2HOUR = "2h"
+    KLINE_INTERVAL_4HOUR = "4h"
+    KLINE_INTERVAL_1DAY = "1d"
+
+    history = None
+    ticker = []
+    as_of = staticmethod(lambda: None)
+    calls = Counter()
+
+    def __init__(self, *args, **kwargs):
+        self.tld = "com"
+
+    def _request_futures_api(self, method, path, signed=False, version=1, **kwargs):
+        StubClient.calls[path] += 1
+        if path == "ticker/24hr":
+            return [dict(t) for t in StubClient.ticker]
+        raise NotImplementedError(f"заглушка REST: {path}")
+
+    def futures_ticker(self, **params):
+        StubClient.calls["ticker"] += 1
+        symbol = params.get("symbol")
+        if symbol is None:
+            return [dict(t) for t in StubClient.ticker]
+        for t in StubClient.ticker:
+            if t["symbol"] == symbol:
+                return dict(t)
+        return {"symbol": symbol, "quoteVolume": "0"}
+
+    def futures_klines(self, **params):
+        StubClient.calls["klines"] += 1
+        return StubClient.history.klines(
+            params["symbol"], params["interval"], int(params.get("limit", 500)),
+            as_of=StubClient.as_of(),
+            start_time=params.get("startTime"), end_time=params.get("endTime"),
+        )
+
+
+class InstrumentedQueue(BarQueue):
+    """
+    Очередь движка (BarQueue), которая помнит время постановки и выдачи каждого элемента.
+    Воркер может забирать элементы пачкой: task_done закрывает их в порядке выдачи.
+    """
+
+    def __init__(self, maxsize=0):
+        super().__init__(maxsize)
+        self._put_times = deque()
+        self._taken = deque()  # (item, put, get) выданные, но ещё не завершённые
+        self.samples = []  # (symbol, open_time, service_s, end_to_end_s)
+
+    def _put(self, item):
+        self._put_times.append(time.perf_counter())
+        super()._put(item)
+
+    def _get(self):
+        item = super()._get()
+        self._taken.append((item, self._put_times.popleft(), time.perf_counter()))
+        return item
+
+    def task_done(self):
+        item, put, got = self._taken.popleft()
+        k = closed_kline(item)
+        if k is not None:
+            now = time.perf_counter()
+            self.samples.append((k["s"], k["t"], now - got, now - put))
+        super().task_done()
+
+
+def closed_kline(msg):
+    if not isinstance(msg, dict):
+        return None
+    k = msg.get("data", {}).get("k") if isinstance(msg.get("data"), dict) else None
+    if k and k.get("x"):
+        return k
+    return None
+
+
+class IOCounters:
+    """Заглушки журнала Excel и Telegram для Engine: только считают вызовы."""
+
+    def __init__(self):
+        self.calls = Counter()
+
+    def send(self, message):
+        self.calls["telegram"] += 1
+
+    def write_trade(self, *args, **kwargs):
+        self.calls["excel_write"] += 1
+
+    def write_trades(self, rows):
+        self.calls["excel_write"] += 1  # одна запись книги на все строки
+
+    def update_status(self, *args, **kwargs):
+        self.calls["excel_update"] += 1
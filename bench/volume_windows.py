@@ -0,0 +1,87 @@
+"""
+z-score объёма по нескольким окнам в одном процессе: префиксные суммы (engine/windows.py)
+против пересчёта среднего и std каждого окна по истории из CandleStore на каждую свечу.
+
+    python -m bench.volume_windows
+    python -m bench.volume_windows --symbols 500 --bars 1000 --windows 10 50 108 --json windows.json
+
+Время — на одно закрытие всей вселенной сверх дописывания свечи в кольцевой буфер.
+Значения сверяются с pandas rolling(w).mean()/std() (shift(1) — окно перед свечой).
+"""
+import argparse
+import json
+import math
+import time
+
+import numpy as np
+
+from bench.spike_modes import store_for, synthetic_volumes
+from engine.windows import VolumeWindows, zscore
+
+
+def run(qv, windows, mode):
+    """(секунд на проход, z symbols × окна × bars). mode: None — только дописывание свечей."""
+    n, bars = qv.shape
+    symbols = [f"S{i}" for i in range(n)]
+    store = store_for(symbols, max(windows))
+    tracker = VolumeWindows(windows)
+    z = np.full((n, len(windows), bars), np.nan)
+    row = [0.0, 1.0, 1.0, 1.0, 1.0, 0.0]  # close = 1, volume = quote_volume
+    t = time.perf_counter()
+    for j in range(bars):
+        for i, s in enumerate(symbols):
+            row[0], row[5] = j, qv[i, j]
+            ring = store.candles[s]
+            ring.append(row)
+            if mode == "prefix":
+                tracker.update(s, ring.view(), j > 0)
+                for k, w in enumerate(windows):
+                    mean, std, _, _ = tracker.stats(s, w)
+                    z[i, k, j] = zscore(row[5], mean, std)
+            elif mode == "naive":
+                rows = ring.view()
+                for k, w in enumerate(windows):
+                    window = rows[max(0, len(rows) - 1 - w):-1, 5]
+                    if len(window) >= 2:
+                        z[i, k, j] = zscore(row[5], window.mean(), window.std(ddof=1))
+    return time.perf_counter() - t, z
+
+
+def main():
+    parser = argparse.ArgumentParser(description="z-score объёма по нескольким окнам: префиксные суммы")
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--bars", type=int, default=600)
+    parser.add_argument("--windows", type=int, nargs="+", default=[10, 50, 108])
+    parser.add_argument("--json", help="сохранить результат в JSON")
+    args = parser.parse_args()
+
+    qv, _, _ = synthetic_volumes(args.symbols, args.bars, 100.0, 5.0)
+    base_s, _ = run(qv, args.windows, None)
+    print(f"📊 {args.symbols} символов × {args.bars} свечей, окна {args.windows}; "
+          f"дописывание свечей {base_s / args.bars * 1000:.2f}ms на закрытие")
+    results, zs = {}, {}
+    for mode in ("prefix", "naive"):
+        elapsed, zs[mode] = run(qv, args.windows, mode)
+        per_bar_ms = max(elapsed - base_s, 0) / args.bars * 1000
+        results[mode] = {"per_close_ms": round(per_bar_ms, 3),
+                         "per_symbol_window_us": round(per_bar_ms * 1000 / args.symbols / len(args.windows), 2)}
+        print(f"{mode:<8} {per_bar_ms:>8.2f}ms на закрытие, "
+              f"{results[mode]['per_symbol_window_us']:.2f}µs на символ и окно")
+
+    import pandas as pd
+    frame = pd.DataFrame(qv.T).shift(1)
+    diff = 0.0
+    for k, w in enumerate(args.windows):
+        rolling = frame.rolling(w, min_periods=2)
+        ref = ((qv.T - rolling.mean()) / rolling.std()).to_numpy().T
+        ok = np.isfinite(ref)
+        diff = max(diff, float(np.max(np.abs(zs["prefix"][:, k][ok] - ref[ok]))))
+    print(f"🔍 z-score против pandas rolling(): расхождение {diff:.2g}")
+    results["max_abs_diff_vs_pandas"] = diff if math.isfinite(diff) else None
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
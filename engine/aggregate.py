@@ -0,0 +1,99 @@
+"""
+Старшие таймфреймы из одного базового потока свечей (BASE_INTERVAL, обычно 1m).
+
+    agg = Aggregator("1m", backfill=engine.backfill_bar)
+    agg.subscribe("5m", on_5m)   # on_5m(bar) — закрытая 5m свеча в формате "k" WebSocket
+    agg.subscribe("1h", on_1h)
+    agg.update(k)                # закрытая 1m свеча из сокета
+
+Свеча старшего ТФ закрывается вместе с последней базовой свечой своего интервала.
+Если последняя базовая свеча пропала (переподключение, потерянное сообщение), корзину закрывает
+первая базовая свеча следующего интервала. Неполная корзина (старт посреди интервала, пропуск
+в потоке) не собирается из кусков: вместо неё отдаётся свеча из backfill(symbol, interval, open_time) —
+один REST-запрос. Если backfill не задан или не ответил, отдаётся то, что есть, с пометкой
+"partial" — числом недостающих базовых свечей: TP/SL по ней проверяется, сигнал не ищется
+(Engine.on_closed_bar). prime() заполняет текущие корзины при прогреве.
+"""
+from engine.config import INTERVAL_SECONDS
+
+DAY_MS = 86_400_000
+
+
+class Aggregator:
+    def __init__(self, base_interval, backfill=None):
+        self.base = base_interval
+        self.base_ms = INTERVAL_SECONDS[base_interval] * 1000
+        self.backfill = backfill
+        self.targets = {}   # interval -> (step_ms, базовых свечей в корзине, [callback, ...])
+        self.buckets = {}   # symbol -> {interval: [open_time, o, h, l, c, v, q, n]}
+        self.last = {}      # symbol -> open_time последней базовой свечи
+
+    def subscribe(self, interval, callback):
+        step = INTERVAL_SECONDS[interval] * 1000
+        if step % self.base_ms or DAY_MS % step:
+            raise ValueError(f"{interval} не собирается из {self.base}")
+        if interval not in self.targets:
+            self.targets[interval] = (step, step // self.base_ms, [])
+        self.targets[interval][2].append(callback)
+
+    def intervals(self):
+        return sorted(self.targets, key=lambda i: INTERVAL_SECONDS[i])
+
+    def update(self, k):
+        """Закрытая базовая свеча из WebSocket (словарь "k"). Подписчики вызываются сразу."""
+        self._add(k["s"], k["t"], float(k["o"]), float(k["h"]), float(k["l"]), float(k["c"]),
+                  float(k["v"]), float(k.get("q", 0.0)), emit=True)
+
+    def prime(self, symbol, klines):
+        """Закрытые базовые свечи (массивы KlineDecoder/KlineCache) в текущие корзины, без отправки."""
+        for t, o, h, l, c, v in zip(klines["open_time"].tolist(), klines["open"].tolist(),
+                                    klines["high"].tolist(), klines["low"].tolist(),
+                                    klines["close"].tolist(), klines["volume"].tolist()):
+            self._add(symbol, int(t), o, h, l, c, v, c * v, emit=False)
+
+    def _add(self, symbol, t, o, h, l, c, v, q, emit):
+        last = self.last.get(symbol)
+        if last is not None and t <= last:
+            return  # повтор после переподключения
+        self.last[symbol] = t
+        buckets = self.buckets.setdefault(symbol, {})
+        for interval, (step, size, callbacks) in self.targets.items():
+            start = t // step * step
+            b = buckets.get(interval)
+            if b is not None and b[0] != start:
+                # последняя базовая свеча старой корзины не пришла — закрываем её сейчас
+                self._close(symbol, interval, b, emit)
+                b = None
+            if b is None:
+                b = buckets[interval] = [start, o, h, l, c, v, q, 1]
+            else:
+                b[2] = max(b[2], h)
+                b[3] = min(b[3], l)
+                b[4] = c
+                b[5] += v
+                b[6] += q
+                b[7] += 1
+            if t + self.base_ms != start + step:
+                continue
+            del buckets[interval]
+            self._close(symbol, interval, b, emit)
+
+    def _close(self, symbol, interval, b, emit):
+        if not emit:
+            return
+        step, size, callbacks = self.targets[interval]
+        start = b[0]
+        bar = None
+        if b[7] < size and self.backfill is not None:
+            bar = self.backfill(symbol, interval, start)
+        if bar is None:
+            bar = {"s": symbol, "i": interval, "t": start, "T": start + step - 1, "x": True,
+                   "o": b[1], "h": b[2], "l": b[3], "c": b[4], "v": b[5], "q": b[6]}
+            if b[7] < size:
+                bar["partial"] = size - b[7]
+        for callback in callbacks:
+            callback(bar)
+
+    def drop(self, symbol):
+        self.buckets.pop(symbol, None)
+        self.last.pop(symbol, None)
@@ -0,0 +1,15 @@
+import importlib
+import os
+
+# Точки входа -> модуль правил бота
+SCRIPTS = {
+    "main.py": "volume",
+    "main_spike.py": "spike",
+    "main_impulse.py": "impulse",
+}
+
+
+def load_bot(name):
+    """Модуль бота по имени (volume/spike/impulse) или по скрипту (main_spike.py)."""
+    name = SCRIPTS.get(os.path.basename(name), name)
+    return importlib.import_module(f"engine.bots.{name}")
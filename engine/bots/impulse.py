@@ -0,0 +1,88 @@
+"""Импульсный бот 1h: тренд + контртренд со свинг фильтрами (main_impulse.py)."""
+from engine.swing import first_swing
+
+INTERVAL = "1h"
+
+DEFAULT_SHEET = "confimp1"
+SHEET_MAP = {
+    "CONFIMP1": "confimp1",
+    "CONFIMP2": "confimp2",
+    "CONFIMP3": "confimp3",
+}
+
+# Стратегии: 3:1, 6:1, 6:2, 10:3, 12:4
+STRATEGIES = {
+    "3:1":  {"tp": 0.03,  "sl": -0.01},
+    "6:1":  {"tp": 0.06,  "sl": -0.01},
+    "6:2":  {"tp": 0.06,  "sl": -0.02},
+    "10:3": {"tp": 0.10,  "sl": -0.03},
+    "12:4": {"tp": 0.12,  "sl": -0.04},
+}
+
+EXCEL_DETAILS = "price"
+EXTRA_COLUMNS = {"X": ("Свинг", "swing_num")}
+CORR_AS_NUMBER = True
+
+# Сигналы: выражения над признаками engine/features.py, см. engine/rules.py
+_VWAP_FAR = "(not USE_VWAP_FILTER or ema20_vwap_atr >= EMA20_PROXIMITY_MULT)"
+_CLEAR_ZONE = (
+    "(not USE_VWAP_FILTER or ema20_vwap_atr >= EMA20_PROXIMITY_MULT and ema200_vwap_atr >= EMA200_PROXIMITY_MULT)"
+    " and ema_gap_atr >= EMA20_PROXIMITY_MULT"
+)
+DEFAULT_RULES = {
+    "BUY_TREND": (
+        "qv_ratio >= VOL_MULT_TREND and bull and body_pct >= MIN_BODY_TREND"
+        " and below_ema20 and (not USE_VWAP_FILTER or below_vwap) and bull_trend"
+        " and ema_gap_atr >= ATR_GAP_MULT and low_below_emas and " + _VWAP_FAR +
+        " and (SWING_BUY_TREND == 0 or bars_since_lower_low > SWING_BUY_TREND)"
+    ),
+    "SELL_TREND": (
+        "qv_ratio >= VOL_MULT_TREND and bear and body_pct >= MIN_BODY_TREND"
+        " and above_ema20 and (not USE_VWAP_FILTER or above_vwap) and bear_trend"
+        " and ema_gap_atr >= ATR_GAP_MULT and high_above_emas and " + _VWAP_FAR +
+        " and (SWING_SELL_TREND == 0 or bars_since_higher_high > SWING_SELL_TREND)"
+    ),
+    "BUY_COUNTER": (
+        "qv_ratio >= VOL_MULT_COUNTER and bull and body_pct >= MIN_BODY_COUNTER"
+        " and below_ema20 and (not USE_VWAP_FILTER or below_vwap) and bear_trend"
+        " and ema_gap_atr >= ATR_GAP_MULT and " + _CLEAR_ZONE +
+        " and (SWING_BUY_COUNTER == 0 or bars_since_lower_low > SWING_BUY_COUNTER)"
+    ),
+    "SELL_COUNTER": (
+        "qv_ratio >= VOL_MULT_COUNTER and bear and body_pct >= MIN_BODY_COUNTER"
+        " and above_ema20 and (not USE_VWAP_FILTER or above_vwap) and bull_trend"
+        " and ema_gap_atr >= ATR_GAP_MULT and " + _CLEAR_ZONE +
+        " and (SWING_SELL_COUNTER == 0 or bars_since_higher_high > SWING_SELL_COUNTER)"
+    ),
+}
+
+
+def load_params(config, p):
+    p.VOL_MULT_TREND      = float(config["VOL_MULT_TREND"])
+    p.VOL_MULT_COUNTER    = float(config["VOL_MULT_COUNTER"])
+    p.SPIKE_MULT          = float(config.get("SPIKE_MULT", min(p.VOL_MULT_TREND, p.VOL_MULT_COUNTER)))
+
+    p.MIN_BODY_TREND      = float(config["MIN_BODY_TREND"])
+    p.MIN_BODY_COUNTER    = float(config["MIN_BODY_COUNTER"])
+
+    p.ATR_GAP_MULT        = float(config["ATR_GAP_MULT"])
+    p.EMA20_PROXIMITY_MULT  = float(config["EMA20_PROXIMITY_MULT"])
+    p.EMA200_PROXIMITY_MULT = float(config["EMA200_PROXIMITY_MULT"])
+
+    # Свинг фильтры (0 = выключен)
+    p.SWING_BUY_TREND     = config.get("SWING_BUY_TREND", 0)
+    p.SWING_SELL_TREND    = config.get("SWING_SELL_TREND", 0)
+    p.SWING_BUY_COUNTER   = config.get("SWING_BUY_COUNTER", 0)
+    p.SWING_SELL_COUNTER  = config.get("SWING_SELL_COUNTER", 0)
+    p.USE_VWAP_FILTER = config.get("USE_VWAP_FILTER", True)
+    return p
+
+
+def enrich(ctx, signals, res):
+    # Колонка X — свинг номер (информационно, всегда пишем)
+    p = ctx.p
+    side_for_swing = "BUY" if any("BUY" in s for s in signals) else "SELL"
+    swing_check_n  = max(p.SWING_BUY_TREND, p.SWING_SELL_TREND, p.SWING_BUY_COUNTER, p.SWING_SELL_COUNTER, 3)
+    since = ctx["bars_since_lower_low"] if side_for_swing == "BUY" else ctx["bars_since_higher_high"]
+    res["swing_num"] = first_swing(since, swing_check_n)
+    return res
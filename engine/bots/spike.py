@@ -0,0 +1,66 @@
+"""Спайк-бот 1h: всплеск объёма + EMA/VWAP/свинг фильтры и кулдаун по спайкам (main_spike.py)."""
+from engine.indicators import get_swing_num
+
+INTERVAL = "1h"
+
+DEFAULT_SHEET = "confsp1"
+SHEET_MAP = {
+    "CONFSP1": "confsp1",
+    "CONFSP2": "confsp2",
+    "CONFSP3": "confsp3",
+    "CONFSP4": "confsp4",
+}
+
+# Стратегии: 3:1, 6:1, 6:2, 10:3, 12:4
+STRATEGIES = {
+    "3:1":  {"tp": 0.03,  "sl": -0.01},
+    "6:1":  {"tp": 0.06,  "sl": -0.01},
+    "6:2":  {"tp": 0.06,  "sl": -0.02},
+    "10:3": {"tp": 0.10,  "sl": -0.03},
+    "12:4": {"tp": 0.12,  "sl": -0.04},
+}
+
+EXCEL_DETAILS = "price"
+EXTRA_COLUMNS = {"X": ("Свинг", "swing_num")}
+CORR_AS_NUMBER = True
+
+# Сигналы: выражения над признаками engine/features.py, см. engine/rules.py
+# bars_since_spike > COOLDOWN_BARS — не было спайка (qv_ratio >= VOL_MULT) за COOLDOWN_BARS предыдущих свечей
+DEFAULT_RULES = {
+    "BUY_TREND": (
+        "qv_ratio >= VOL_MULT and bull and body_pct >= MIN_BODY_PCT"
+        " and (not USE_EMA_FILTER or bull_trend) and (not USE_VWAP_FILTER or close_below_vwap)"
+        " and bars_since_spike > COOLDOWN_BARS"
+        " and (SWING_BUY_TREND == 0 or bars_since_lower_low > SWING_BUY_TREND)"
+    ),
+    "SELL_TREND": (
+        "qv_ratio >= VOL_MULT and bear and body_pct >= MIN_BODY_PCT"
+        " and (not USE_EMA_FILTER or bear_trend) and (not USE_VWAP_FILTER or close_above_vwap)"
+        " and bars_since_spike > COOLDOWN_BARS"
+        " and (SWING_SELL_TREND == 0 or bars_since_higher_high > SWING_SELL_TREND)"
+    ),
+}
+
+
+def load_params(config, p):
+    p.VOL_MULT         = float(config["VOL_MULT"])
+    p.MIN_BODY_PCT     = float(config["MIN_BODY_PCT"])
+    p.SPIKE_MULT       = float(config.get("SPIKE_MULT", p.VOL_MULT))
+
+    # Фильтры — включить/выключить
+    p.USE_EMA_FILTER  = config.get("USE_EMA_FILTER", True)
+    p.USE_VWAP_FILTER = config.get("USE_VWAP_FILTER", True)
+
+    # Свинг фильтры (0 = выключен)
+    p.SWING_BUY_TREND    = config.get("SWING_BUY_TREND", 0)
+    p.SWING_SELL_TREND   = config.get("SWING_SELL_TREND", 0)
+    p.SWING_BUY_COUNTER  = config.get("SWING_BUY_COUNTER", 0)
+    p.SWING_SELL_COUNTER = config.get("SWING_SELL_COUNTER", 0)
+    return p
+
+
+def enrich(ctx, signals, res):
+    # Колонка X — наидальнейшая свеча среди 5 предыдущих
+    side_for_swing = "BUY" if any("BUY" in s for s in signals) else "SELL"
+    res["swing_num"] = get_swing_num(ctx.rows, side_for_swing, 5)
+    return res
@@ -0,0 +1,70 @@
+"""Объёмный бот 5m: тренд + контртренд, опциональный HTF фильтр (main.py)."""
+INTERVAL = "5m"
+
+DEFAULT_SHEET = "config1"
+SHEET_MAP = {
+    "CONFIG_1": "config1",
+    "CONFIG_2": "config2",
+    "CONFIG_3": "config3",
+    "CONFIG_4": "config4",
+    "CONFIG_5": "config5",
+    "CONFIG_6": "config6",
+}
+
+# FIX: 20:3 заменено на 4.5:1.5
+STRATEGIES = {
+    "3:1":    {"tp": 0.03,  "sl": -0.01},
+    "6:1":    {"tp": 0.06,  "sl": -0.01},
+    "6:2":    {"tp": 0.06,  "sl": -0.02},
+    "10:3":   {"tp": 0.10,  "sl": -0.03},
+    "4.5:1.5": {"tp": 0.045, "sl": -0.015},
+}
+
+EXCEL_DETAILS = "pnl"
+EXTRA_COLUMNS = {}
+CORR_AS_NUMBER = False
+
+
+# Сигналы: выражения над признаками engine/features.py, см. engine/rules.py
+DEFAULT_RULES = {
+    "BUY_TREND": (
+        "qv_ratio >= VOL_MULT_TREND and bull and body_pct >= MIN_BODY_TREND"
+        " and below_ema20 and below_vwap and bull_trend and ema_gap_atr >= ATR_GAP_MULT"
+        " and low_below_emas and (not USE_HTF_FILTER or htf_bear)"
+    ),
+    "SELL_TREND": (
+        "qv_ratio >= VOL_MULT_TREND and bear and body_pct >= MIN_BODY_TREND"
+        " and above_ema20 and above_vwap and bear_trend and ema_gap_atr >= ATR_GAP_MULT"
+        " and high_above_emas and (not USE_HTF_FILTER or htf_bull)"
+    ),
+    "BUY_COUNTER": (
+        "qv_ratio >= VOL_MULT_COUNTER and bull and body_pct >= MIN_BODY_COUNTER"
+        " and below_ema20 and below_vwap and bear_trend and ema_gap_atr >= ATR_GAP_MULT"
+        " and ema20_vwap_atr >= EMA20_PROXIMITY_MULT and ema_gap_atr >= EMA20_PROXIMITY_MULT"
+        " and ema200_vwap_atr >= EMA200_PROXIMITY_MULT and (not USE_HTF_FILTER or htf_bear)"
+    ),
+    "SELL_COUNTER": (
+        "qv_ratio >= VOL_MULT_COUNTER and bear and body_pct >= MIN_BODY_COUNTER"
+        " and above_ema20 and above_vwap and bull_trend and ema_gap_atr >= ATR_GAP_MULT"
+        " and ema20_vwap_atr >= EMA20_PROXIMITY_MULT and ema_gap_atr >= EMA20_PROXIMITY_MULT"
+        " and ema200_vwap_atr >= EMA200_PROXIMITY_MULT and (not USE_HTF_FILTER or htf_bull)"
+    ),
+}
+# HTF фильтр инвертирован: BUY — когда на 1ч медвежий тренд, SELL — когда бычий
+
+
+def load_params(config, p):
+    p.VOL_MULT_TREND = float(config["VOL_MULT_TREND"])
+    p.VOL_MULT_COUNTER = float(config["VOL_MULT_COUNTER"])
+    p.SPIKE_MULT = float(config.get("SPIKE_MULT", min(p.VOL_MULT_TREND, p.VOL_MULT_COUNTER)))
+    p.MIN_BODY_TREND = float(config["MIN_BODY_TREND"])
+    p.MIN_BODY_COUNTER = float(config["MIN_BODY_COUNTER"])
+    p.ATR_GAP_MULT = float(config["ATR_GAP_MULT"])
+    p.EMA20_PROXIMITY_MULT = float(config["EMA20_PROXIMITY_MULT"])
+    p.EMA200_PROXIMITY_MULT = float(config["EMA200_PROXIMITY_MULT"])
+    p.USE_HTF_FILTER = config.get("USE_HTF_FILTER", False)  # фильтр старшего ТФ, по умолчанию выключен
+    return p
+
+
+def enrich(ctx, signals, res):
+    return res
@@ -0,0 +1,108 @@
+"""
+Ширина рынка на закрытии свечи: какая доля вселенной дала спайк объёма в одну сторону.
+
+Когда BTC резко двигается, десятки альтов дают спайк на одной и той же свече, и каждый сигнал —
+отдельная сделка, сообщение Telegram и запись книги Excel в самое загруженное окно.
+Engine.on_closed_bar отмечает у каждого символа движение свечи: 1 — спайк объёма (SPIKE_MULT)
+и бычье тело, -1 — спайк и медвежье, 0 — без спайка. Когда закрытие собрано (прошли все символы
+вселенной, пришла свеча следующего закрытия или прошло BREADTH_WAIT_SECONDS), доли считаются
+одним проходом numpy по всем отметкам:
+
+    breadth_up   — доля символов со спайком и бычьим телом
+    breadth_down — доля символов со спайком и медвежьим телом
+
+Свеча массовая, если большая из долей >= BREADTH_THRESHOLD и закрылось хотя бы BREADTH_MIN_SYMBOLS.
+Сигналы символов, которые сами участвуют в движении, обрабатываются по BREADTH_MODE:
+
+  off       — как раньше: сигналы уходят сразу, ширина только в METRICS
+  suppress  — сделки не открываются, в Telegram одна сводка
+  rank      — сделки и сообщения только у BREADTH_TOP сильнейших по qv_ratio, остальные — в сводку
+  summarize — сделки открываются все, строки Excel — одной записью книги, Telegram — одна сводка
+              (корреляция BTC по символам не запрашивается)
+
+Символы вне движения сигналят как обычно. Кроме off, сигналы ждут сборки закрытия — обычно
+доли секунды: закрытия вселенной приходят одной пачкой. Счётчики METRICS: breadth_bars,
+breadth_suppressed, breadth_summarized; breadth_up и breadth_down — последнего закрытия.
+"""
+import time
+
+import numpy as np
+
+MODES = ("off", "suppress", "rank", "summarize")
+
+
+class BarBreadth:
+    """Одно закрытие: движения символов и отложенные до сборки сигналы."""
+
+    __slots__ = ("moves", "held", "first")
+
+    def __init__(self):
+        self.moves = []   # 1 / -1 / 0 по символам в порядке закрытия
+        self.held = []    # [(FeatureContext, signals)]
+        self.first = time.monotonic()
+
+
+class Breadth:
+    def __init__(self, mode, threshold, min_symbols, wait):
+        if mode not in MODES:
+            raise ValueError(f"BREADTH_MODE: ожидается одно из {MODES}, получено {mode!r}")
+        self.mode = mode
+        self.threshold = threshold
+        self.min_symbols = min_symbols
+        self.wait = wait
+        self.bars = {}  # open_time -> BarBreadth
+
+    @property
+    def holds(self):
+        """Сигналы ждут сборки закрытия (иначе уходят сразу)."""
+        return self.mode != "off"
+
+    def record(self, open_time, move):
+        bar = self.bars.get(open_time)
+        if bar is None:
+            bar = self.bars[open_time] = BarBreadth()
+        bar.moves.append(move)
+
+    def hold(self, ctx, signals):
+        self.bars[ctx.candle["t"]].held.append((ctx, signals))
+
+    def timeout(self):
+        """Сколько воркеру ждать свечей до принудительной сборки; None — ждать нечего."""
+        held = [bar.first for bar in self.bars.values() if bar.held]
+        if not held:
+            return None
+        return max(min(held) + self.wait - time.monotonic(), 0.0)
+
+    def due(self, universe, before=None):
+        """
+        Собранные закрытия по порядку [(open_time, BarBreadth)]; из ожидания они удаляются.
+        Закрытие собрано, если прошли universe символов, есть более позднее (или before) или вышло время.
+        """
+        if not self.bars:
+            return []
+        now, latest = time.monotonic(), max(self.bars)
+        if before is not None:
+            latest = max(latest, before)
+        out = []
+        for t in sorted(self.bars):
+            bar = self.bars[t]
+            if t < latest or len(bar.moves) >= universe or now - bar.first >= self.wait:
+                out.append((t, self.bars.pop(t)))
+        return out
+
+    def measure(self, bar):
+        """(закрылось символов, breadth_up, breadth_down, направление массового движения или 0)."""
+        moves = np.asarray(bar.moves, dtype=np.int8)
+        n = len(moves)
+        up = np.count_nonzero(moves > 0) / n
+        down = np.count_nonzero(moves < 0) / n
+        mass = 0
+        if n >= self.min_symbols and max(up, down) >= self.threshold:
+            mass = 1 if up >= down else -1
+        return n, up, down, mass
+
+
+def rank(crowd):
+    """Сигналы массового движения от сильнейшего спайка (qv_ratio) к слабейшему."""
+    order = np.argsort([-ctx["qv_ratio"] for ctx, _ in crowd], kind="stable")
+    return [crowd[i] for i in order]
@@ -0,0 +1,188 @@
+"""
+Команды Telegram: long polling getUpdates в отдельном потоке.
+
+  /stats [NAME] — итоги закрытых стратегий (engine/stats.py)
+  /open [NAME]  — открытые сделки
+
+Один токен может опрашивать только один процесс (иначе 409 у всех), поэтому опрос один на хост:
+  - под supervisor (engine/supervisor.py) — в процессе supervisor, ответ собирается по всем ботам
+    манифеста из их trades_state_{NAME}*.json и active_trades_{NAME}*.json: TradeBook пишет их
+    в конце каждой пачки, так что отстают они не больше чем на пачку;
+  - бот, запущенный сам по себе, — только с TELEGRAM_COMMANDS = true в конфиге: отвечает из памяти,
+    /open — с ценой последней закрытой свечи.
+Без NAME — по строке на бота, с NAME — подробно по одному. Отвечает только чату CHAT_ID.
+"""
+import glob
+import json
+import os
+import time
+
+from engine.stats import PerformanceStats
+
+POLL_TIMEOUT = 30  # секунд, сколько Telegram держит запрос без новых сообщений
+MAX_OPEN_LINES = 30  # сообщение Telegram — до 4096 символов
+
+
+def open_lines(active, price=None):
+    """Строки /open по сделкам в формате TradeBook.to_dict; price(symbol) — последняя цена или None."""
+    lines = []
+    for tid, t in list(active.items())[:MAX_OPEN_LINES]:
+        open_names = [name for name, s in t["strategies"].items() if s["status"] == "OPEN"]
+        line = f"{tid} {t['symbol']} {t['side']} вход {t['entry_price']:.6g}"
+        last = price(t["symbol"]) if price is not None else None
+        if last is not None:
+            pnl = (last - t["entry_price"]) / t["entry_price"] * 100
+            line += f" → {last:.6g} ({pnl if t['side'] == 'BUY' else -pnl:+.2f}%)"
+        line += f", открыты: {', '.join(open_names)}"
+        if t.get("signal"):
+            line += f" [{t['signal']}]"
+        lines.append(line)
+    if len(active) > MAX_OPEN_LINES:
+        lines.append(f"... и ещё {len(active) - MAX_OPEN_LINES}")
+    return lines
+
+
+def total_line(stats):
+    total = stats.rows("config")
+    if not total:
+        return f"{stats.config}: закрытых стратегий пока нет"
+    _, n, tp, sl, winrate, pnl, _ = total[0]
+    return f"{stats.config}: {n} (TP {tp} / SL {sl}), winrate {winrate:.1f}%, PnL {pnl:+.2f}%"
+
+
+# ================= ОДИН БОТ =================
+def open_report(engine):
+    with engine.trades.lock:
+        active = engine.trades.table.to_dict()
+    if not active:
+        return f"📭 {engine.state_name}: открытых сделок нет"
+
+    def price(symbol):
+        ring = engine.store.candles.get(symbol)
+        return float(ring.view()[-1, 4]) if ring is not None and len(ring) else None
+
+    return "\n".join([f"📂 {engine.state_name}: открытых сделок {len(active)}"] + open_lines(active, price))
+
+
+def engine_handlers(engine):
+    return {
+        "/stats": lambda name=None: engine.trades.stats.report(),
+        "/open": lambda name=None: open_report(engine),
+    }
+
+
+# ================= ВСЕ БОТЫ ХОСТА =================
+class StateFiles:
+    """Итоги и открытые сделки ботов из их файлов состояния (воркеры шарда — NAME_<id>)."""
+
+    def __init__(self, names):
+        self.names = list(names)
+
+    def _files(self, prefix, name):
+        return sorted(set(glob.glob(f"{prefix}_{name}.json") + glob.glob(f"{prefix}_{name}_*.json")))
+
+    def _load(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def stats(self, name):
+        # у каждого воркера шарда свой файл итогов — строкой на воркер
+        return [PerformanceStats(os.path.basename(path)[len("trades_state_"):-len(".json")],
+                                 self._load(path).get("stats"))
+                for path in self._files("trades_state", name)]
+
+    def active(self, name):
+        active = {}
+        for path in self._files("active_trades", name):
+            active.update(self._load(path))
+        return dict(sorted(active.items()))
+
+    def pick(self, name):
+        if name is None:
+            return self.names
+        matches = [n for n in self.names if n.lower() == name.lower()]
+        return matches or None
+
+    def stats_report(self, name=None):
+        names = self.pick(name)
+        if names is None:
+            return f"❓ Нет бота {name}; боты: {', '.join(self.names)}"
+        if name is not None:
+            return "\n\n".join(s.report() for s in self.stats(names[0])) or f"📊 {names[0]}: итогов пока нет"
+        lines = ["📊 Итоги закрытых стратегий (/stats NAME — подробно)"]
+        for n in names:
+            lines += [total_line(s) for s in self.stats(n)] or [f"{n}: итогов пока нет"]
+        return "\n".join(lines)
+
+    def open_report(self, name=None):
+        names = self.pick(name)
+        if names is None:
+            return f"❓ Нет бота {name}; боты: {', '.join(self.names)}"
+        if name is not None:
+            active = self.active(names[0])
+            if not active:
+                return f"📭 {names[0]}: открытых сделок нет"
+            return "\n".join([f"📂 {names[0]}: открытых сделок {len(active)}"] + open_lines(active))
+        lines = ["📂 Открытые сделки (/open NAME — список)"]
+        for n in names:
+            lines.append(f"{n}: {len(self.active(n))}")
+        return "\n".join(lines)
+
+    def handlers(self):
+        return {"/stats": self.stats_report, "/open": self.open_report}
+
+
+class CommandPoller:
+    def __init__(self, bot_token, chat_id, handlers, reply):
+        self.bot_token = bot_token
+        self.chat_id = str(chat_id)
+        self.offset = None
+        self.handlers = handlers  # команда -> fn(NAME или None) -> текст ответа
+        self.reply = reply
+
+    def handle(self, update):
+        msg = update.get("message") or {}
+        if str(msg.get("chat", {}).get("id")) != self.chat_id:
+            return
+        text = (msg.get("text") or "").strip()
+        if not text.startswith("/"):
+            return
+        parts = text.split()
+        command = parts[0].split("@")[0].lower()
+        handler = self.handlers.get(command)
+        if handler is not None:
+            self.reply(handler(parts[1] if len(parts) > 1 else None))
+
+    def run(self):
+        import requests
+
+        api = os.getenv("TELEGRAM_API", "https://api.telegram.org")
+        url = f"{api}/bot{self.bot_token}/getUpdates"
+        try:
+            # команды, присланные пока бот лежал, не исполняются: offset=-1 — только последнее сообщение
+            last = requests.get(url, params={"offset": -1, "timeout": 0}, timeout=10).json().get("result", [])
+            if last:
+                self.offset = last[-1]["update_id"] + 1
+        except Exception as e:
+            print(f"Ошибка getUpdates: {e}")
+        while True:
+            try:
+                params = {"timeout": POLL_TIMEOUT, "allowed_updates": '["message"]'}
+                if self.offset is not None:
+                    params["offset"] = self.offset
+                r = requests.get(url, params=params, timeout=POLL_TIMEOUT + 10)
+                if r.status_code == 409:
+                    print("⚠️ Команды Telegram выключены: getUpdates этого токена опрашивает другой процесс")
+                    return
+                for update in r.json().get("result", []):
+                    self.offset = update["update_id"] + 1
+                    try:
+                        self.handle(update)
+                    except Exception as e:
+                        print(f"Ошибка команды Telegram: {e}")
+            except Exception as e:
+                print(f"Ошибка getUpdates: {e}")
+                time.sleep(5)
@@ -0,0 +1,88 @@
+import argparse
+import json
+import socket
+from types import SimpleNamespace
+
+BLACKLIST = {
+    "BTCUSDT", "ETHUSDT", "BNBUSDT", "SOLUSDT",
+    "XRPUSDT", "ADAUSDT", "DOGEUSDT", "LINKUSDT"
+}
+
+INTERVAL_SECONDS = {
+    "1m": 60,
+    "3m": 3 * 60,
+    "5m": 5 * 60,
+    "15m": 15 * 60,
+    "30m": 30 * 60,
+    "1h": 60 * 60,
+    "2h": 2 * 60 * 60,
+    "4h": 4 * 60 * 60,
+    "1d": 24 * 60 * 60,
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", required=True)
+    # шардинг вселенной по процессам (engine/shard.py)
+    shard = parser.add_mutually_exclusive_group()
+    shard.add_argument("--coordinator", metavar="HOST:PORT", help="раздавать символы воркерам")
+    shard.add_argument("--worker", metavar="HOST:PORT", help="взять долю символов у координатора")
+    parser.add_argument("--worker-id", default=socket.gethostname(),
+                        help="имя воркера: суффикс файлов состояния и ключ в кольце (по умолчанию — хост)")
+    # общий поток рынка от supervisor (engine/feed.py) вместо своих сокетов
+    parser.add_argument("--feed", metavar="HOST:PORT", help="брать свечи у хаба потока supervisor")
+    return parser.parse_args(argv)
+
+
+def load_config(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def load_params(config):
+    """Общие для всех ботов настройки. Специфичные добавляет модуль бота."""
+    return SimpleNamespace(
+        NAME=config["NAME"],
+        MIN_24H_VOLUME=config["MIN_24H_VOLUME"],
+        LOOKBACK_CANDLES=config["LOOKBACK_CANDLES"],
+        VOLUME_LOOKBACK=config["VOLUME_LOOKBACK"],
+        BTC_LOOKBACK=config["BTC_LOOKBACK"],
+        EMA_FAST=config["EMA_FAST"],
+        EMA_SLOW=config["EMA_SLOW"],
+        ATR_LEN=config["ATR_LEN"],
+        COOLDOWN_BARS=config["COOLDOWN_BARS"],
+        PREV_VOL_WINDOW=3,
+        HISTORY_EMA_SPANS=config.get("HISTORY_EMA_SPANS", 5),  # глубина истории в периодах EMA_SLOW
+        # прогрев на старте (engine/warmup.py)
+        REST_WEIGHT_BUDGET=config.get("REST_WEIGHT_BUDGET", 1200),  # из 2400 в минуту на IP
+        WARMUP_WORKERS=config.get("WARMUP_WORKERS", 8),
+        KLINE_CACHE=config.get("KLINE_CACHE", "kline_cache"),
+        # один поток свечей на все таймфреймы (engine/aggregate.py); None — поток интервала бота
+        BASE_INTERVAL=config.get("BASE_INTERVAL"),
+        # снимок состояния для быстрого перезапуска (engine/snapshot.py); 0 — выключен
+        SNAPSHOT_SECONDS=config.get("SNAPSHOT_SECONDS", 300),
+        # база объёма для qv_ratio и спайков: "mean" — среднее окна, "quantile" — квантиль (engine/quantile.py),
+        # "seasonal" — типичный объём этого времени суток (engine/seasonal.py)
+        VOLUME_BASELINE=config.get("VOLUME_BASELINE", "mean"),
+        VOLUME_QUANTILE=config.get("VOLUME_QUANTILE", 0.5),  # 0.5 — медиана
+        SEASONAL_DAYS=config.get("SEASONAL_DAYS", 14),
+        # окна z-score объёма в одном процессе (engine/windows.py): признаки vol_z_N ... и колонки Excel
+        VOLUME_WINDOWS=config.get("VOLUME_WINDOWS", []),
+        # перегрузка воркера (engine/taskqueue.py): предел очереди (сверх него закрытые свечи символа
+        # сливаются в одну) и возраст свечи, после которого сигнал по ней не ищется ("skip")
+        # или уходит с пометкой ("flag"); 0 — без предела возраста
+        QUEUE_MAX=config.get("QUEUE_MAX", 10000),
+        STALE_BAR_SECONDS=config.get("STALE_BAR_SECONDS", 120),
+        STALE_SIGNALS=config.get("STALE_SIGNALS", "skip"),
+        # ширина рынка (engine/breadth.py): доля вселенной со спайком в одну сторону, при которой
+        # свеча считается массовой, и что делать с её сигналами: off / suppress / rank / summarize
+        BREADTH_MODE=config.get("BREADTH_MODE", "off"),
+        BREADTH_THRESHOLD=config.get("BREADTH_THRESHOLD", 0.2),
+        BREADTH_MIN_SYMBOLS=config.get("BREADTH_MIN_SYMBOLS", 20),
+        BREADTH_TOP=config.get("BREADTH_TOP", 3),
+        BREADTH_WAIT_SECONDS=config.get("BREADTH_WAIT_SECONDS", 5),
+        # /stats и /open в Telegram (engine/commands.py) у бота без supervisor; getUpdates токена
+        # может опрашивать только один процесс — включать одному боту на токен
+        TELEGRAM_COMMANDS=config.get("TELEGRAM_COMMANDS", False),
+    )
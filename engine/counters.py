@@ -0,0 +1,24 @@
+"""
+Счётчики свечей по символам: сколько закрытий прошло с последнего спайка объёма и с последнего сигнала.
+
+Хранится только open_time отметки, число свечей считается по open_time текущей свечи —
+O(1) на закрытие, пропуски потока и перезапуск бота учитываются сами.
+Отметки сохраняются вместе с trade_id в trades_state_{BOT}.json (см. TradeBook).
+"""
+import math
+
+
+class BarCounters:
+    def __init__(self, interval_ms, marks=None):
+        self.interval_ms = interval_ms
+        self.marks = marks if marks is not None else {}  # symbol -> {"spike": open_time, "signal": open_time}
+
+    def bars_since(self, symbol, kind, open_time):
+        """Сколько свечей назад была отметка kind (inf, если не было)."""
+        t = self.marks.get(symbol, {}).get(kind)
+        if t is None:
+            return math.inf
+        return float((open_time - t) // self.interval_ms)
+
+    def mark(self, symbol, kind, open_time):
+        self.marks.setdefault(symbol, {})[kind] = open_time
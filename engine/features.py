@@ -0,0 +1,347 @@
+"""
+Именованные признаки последней закрытой свечи — столбцы по всем символам пачки для правил сигналов.
+
+Цены и индикаторы: open, high, low, close, ema20, ema200, vwap, atr, natr, quote_volume
+Объём:   avg_vol (среднее quote_volume за VOLUME_LOOKBACK предыдущих свечей),
+         vol_baseline (база объёма по VOLUME_BASELINE: "mean" — avg_vol,
+         "quantile" — квантиль VOLUME_QUANTILE того же окна, engine/quantile.py,
+         "seasonal" — seasonal_vol, пока слот пуст — avg_vol),
+         qv_ratio (quote_volume / vol_baseline), prev_vol_count
+Окна:    vol_mean_N, vol_std_N, vol_z_N и то же по log1p(quote_volume): logvol_mean_N, logvol_std_N,
+         logvol_z_N — за N свечей перед последней, для любого N (engine/windows.py, nan при N < 2 свечей)
+Сезон:   seasonal_vol (типичный quote_volume этого слота суток, будни/выходные; nan, пока не набран),
+         seasonal_ratio (quote_volume / seasonal_vol) — engine/seasonal.py
+Свеча:   body_pct, bull, bear
+EMA/VWAP: below_ema20, above_ema20, below_vwap, above_vwap (open и close по одну сторону),
+         close_below_vwap, close_above_vwap, low_below_emas, high_above_emas,
+         bull_trend, bear_trend,
+         ema_gap_atr, ema20_vwap_atr, ema200_vwap_atr (расстояния в единицах ATR)
+Счётчики: bars_since_spike (свечей с последнего спайка объёма qv_ratio >= SPIKE_MULT до текущей),
+         bars_since_signal (свечей с последнего сигнала) — inf, если не было; engine/counters.py
+Свинг:   bars_since_lower_low, bars_since_higher_high (inf, если такой свечи в истории нет)
+HTF 1ч:  htf_bull, htf_bear (EMA_FAST vs EMA_SLOW на 1ч; при ошибке загрузки оба True), кэш — Engine.htf_emas
+
+Индикаторы считаются ядрами engine/kernels.py по матрице "символы × свечи" прямо из колец
+CandleStore, признаки состояния (свинги, окна, квантили, сезон, счётчики, HTF) берутся из
+инкрементальных структур движка по символу.
+"""
+import math
+import re
+
+import numpy as np
+
+from engine import kernels
+from engine.windows import zscore
+
+FEATURES = {}
+WINDOW_FEATURE = re.compile(r"(log)?vol_(mean|std|z)_(\d+)$")
+OPEN, HIGH, LOW, CLOSE, VOLUME = 1, 2, 3, 4, 5  # столбцы CandleStore после open_time
+
+
+def feature(name):
+    def register(fn):
+        FEATURES[name] = fn
+        return fn
+    return register
+
+
+class FeatureBatch:
+    """
+    Признаки символов, закрывшихся на свече, столбцами (строка — FeatureContext пачки),
+    считаются лениво и кэшируются: правила читают только нужные им столбцы.
+    """
+
+    def __init__(self, engine, contexts):
+        self.engine = engine
+        self.p = engine.p
+        self.contexts = contexts
+        self.n = len(contexts)
+        self.columns = {}
+
+    def __getitem__(self, name):
+        if name not in self.columns:
+            self.columns[name] = FEATURES[name](self)
+        return self.columns[name]
+
+    def history(self, col, length=None):
+        """
+        Столбец col последних length свечей (всех — None) матрицей n × length.
+        Короткие истории дополняются NaN слева, как ждут ядра.
+        """
+        key = (col, length)
+        if key not in self.columns:
+            m = length or max(len(c.rows) for c in self.contexts)
+            out = np.full((self.n, m), np.nan)
+            for i, c in enumerate(self.contexts):
+                tail = c.rows[-m:, col]
+                out[i, m - len(tail):] = tail
+            self.columns[key] = out
+        return self.columns[key]
+
+    def state(self, fn):
+        """Признак из состояния движка — по символу."""
+        return np.array([fn(c) for c in self.contexts])
+
+    def row(self, i):
+        """Посчитанные признаки строки i скалярами Python."""
+        return {name: col[i].item() for name, col in self.columns.items() if name in FEATURES}
+
+
+class FeatureContext:
+    """
+    Символ на его последней закрытой свече: строка FeatureBatch в Engine.scan и enrich бота.
+    У сработавших строк признаки пачки переносятся в values; остальные, нужные только enrich
+    и сообщению, считаются теми же функциями на пачке из одной строки.
+    """
+
+    def __init__(self, engine, symbol, rows, candle):
+        self.engine = engine
+        self.p = engine.p
+        self.symbol = symbol
+        self.rows = rows    # свечи символа из CandleStore (count × 6), без копии
+        self.candle = candle
+        # до отметки спайка текущей свечи: bars_since_spike — о предыдущих свечах
+        self.since_spike = engine.counters.bars_since(symbol, "spike", candle["t"])
+        self.values = {}
+        self.single = None
+        self.age = None  # секунд с закрытия свечи, если она устарела (STALE_SIGNALS = "flag")
+        self.move = 0    # спайк свечи с бычьим (1) или медвежьим (-1) телом, 0 — без спайка (engine/breadth.py)
+
+    def __getitem__(self, name):
+        if name not in self.values:
+            if self.single is None:
+                self.single = FeatureBatch(self.engine, [self])
+            self.values[name] = self.single[name][0].item()
+        return self.values[name]
+
+
+def resolve_feature(name):
+    """Есть ли признак; оконные (vol_z_50 ...) регистрируются при первом обращении к окну."""
+    if name in FEATURES:
+        return True
+    m = WINDOW_FEATURE.match(name)
+    if m is None or int(m[3]) < 2:
+        return False
+    feature(name)(lambda b, log=bool(m[1]), stat=m[2], w=int(m[3]): _window(b, w, log, stat))
+    return True
+
+
+def window_sizes(names):
+    """Окна оконных признаков среди names."""
+    return {int(m[3]) for m in map(WINDOW_FEATURE.match, names) if m}
+
+
+def _ratio(a, b):
+    # как в исходных проверках "a >= b * mult": при b == 0 условие всегда выполнено
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(b == 0, math.inf, a / b)
+
+
+def _quote_volume(b, length):
+    return b.history(CLOSE, length) * b.history(VOLUME, length)
+
+
+for _i, _col in ((OPEN, "open"), (HIGH, "high"), (LOW, "low"), (CLOSE, "close")):
+    feature(_col)(lambda b, i=_i: b.history(i, 1)[:, 0])
+
+
+# ================= ИНДИКАТОРЫ =================
+@feature("ema20")
+def _ema20(b):
+    return kernels.ema(b.history(CLOSE), b.p.EMA_FAST)[:, -1]
+
+@feature("ema200")
+def _ema200(b):
+    return kernels.ema(b.history(CLOSE), b.p.EMA_SLOW)[:, -1]
+
+@feature("atr")
+def _atr(b):
+    # скользящее среднее TR: хватает ATR_LEN свечей и close перед ними
+    length = b.p.ATR_LEN + 1
+    return kernels.atr(b.history(HIGH, length), b.history(LOW, length), b.history(CLOSE, length), b.p.ATR_LEN)[:, -1]
+
+@feature("natr")
+def _natr(b):
+    return b["atr"] / b["close"] * 100
+
+@feature("vwap")
+def _vwap(b):
+    # сутки свечей до последней; у символов с одной последней свечой история непрерывна
+    # (CandleStore перезагружает её при пропуске), так что ось времени у них общая
+    interval = b.engine.store.interval_ms
+    length = max(1, kernels.DAY_MS // interval)
+    high, low, close, volume = (b.history(i, length) for i in (HIGH, LOW, CLOSE, VOLUME))
+    last = np.array([c.candle["t"] for c in b.contexts], dtype=np.int64)
+    out = np.empty(b.n)
+    for t in np.unique(last):
+        rows = np.flatnonzero(last == t)
+        axis = t - interval * np.arange(length - 1, -1, -1, dtype=np.int64)
+        out[rows] = kernels.session_vwap(axis, high[rows], low[rows], close[rows], volume[rows])[:, -1]
+    return out
+
+@feature("quote_volume")
+def _quote_volume_last(b):
+    return b["close"] * b.history(VOLUME, 1)[:, 0]
+
+
+# ================= ОБЪЁМ =================
+@feature("avg_vol")
+def _avg_vol(b):
+    prev = _quote_volume(b, b.p.VOLUME_LOOKBACK + 1)[:, :-1]
+    count = (~np.isnan(prev)).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(count > 0, np.nansum(prev, axis=1) / count, math.nan)
+
+@feature("vol_baseline")
+def _vol_baseline(b):
+    if b.p.VOLUME_BASELINE == "seasonal":
+        base = b["seasonal_vol"]
+        return np.where(np.isnan(base), b["avg_vol"], base)
+    quantiles = b.engine.volume_quantiles
+    return b["avg_vol"] if quantiles is None else b.state(lambda c: quantiles.baseline(c.symbol))
+
+@feature("qv_ratio")
+def _qv_ratio(b):
+    return _ratio(b["quote_volume"], b["vol_baseline"])
+
+@feature("prev_vol_count")
+def _prev_vol_count(b):
+    prev = _quote_volume(b, b.p.PREV_VOL_WINDOW + 1)[:, :-1]
+    return (prev > b["quote_volume"][:, None]).sum(axis=1)
+
+
+# ================= ОКНА ОБЪЁМА =================
+def _window(b, w, log, stat):
+    key = f"_win{w}"
+    if key not in b.columns:
+        windows = b.engine.volume_windows
+        b.columns[key] = b.state(lambda c: windows.stats(c.symbol, w)).reshape(b.n, 4)
+    mean, std, log_mean, log_std = b.columns[key].T
+    x = b["quote_volume"]
+    if log:
+        x, mean, std = np.log1p(x), log_mean, log_std
+    if stat == "z":
+        return zscore(x, mean, std)
+    return mean if stat == "mean" else std
+
+
+# ================= СЕЗОН =================
+@feature("seasonal_vol")
+def _seasonal_vol(b):
+    return b.state(lambda c: b.engine.seasonal.baseline(c.symbol, c.candle["t"]))
+
+@feature("seasonal_ratio")
+def _seasonal_ratio(b):
+    base = b["seasonal_vol"]
+    return np.where(np.isnan(base), base, _ratio(b["quote_volume"], base))
+
+
+# ================= СВЕЧА =================
+@feature("body_pct")
+def _body_pct(b):
+    rng = b["high"] - b["low"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(rng == 0, 0.0, np.abs(b["close"] - b["open"]) / rng * 100)
+
+@feature("bull")
+def _bull(b):
+    return b["close"] > b["open"]
+
+@feature("bear")
+def _bear(b):
+    return b["close"] < b["open"]
+
+
+# ================= EMA / VWAP =================
+@feature("below_ema20")
+def _below_ema20(b):
+    return (b["open"] < b["ema20"]) & (b["close"] < b["ema20"])
+
+@feature("above_ema20")
+def _above_ema20(b):
+    return (b["open"] > b["ema20"]) & (b["close"] > b["ema20"])
+
+@feature("below_vwap")
+def _below_vwap(b):
+    return (b["open"] < b["vwap"]) & (b["close"] < b["vwap"])
+
+@feature("above_vwap")
+def _above_vwap(b):
+    return (b["open"] > b["vwap"]) & (b["close"] > b["vwap"])
+
+@feature("close_below_vwap")
+def _close_below_vwap(b):
+    return b["close"] < b["vwap"]
+
+@feature("close_above_vwap")
+def _close_above_vwap(b):
+    return b["close"] > b["vwap"]
+
+@feature("low_below_emas")
+def _low_below_emas(b):
+    return (b["low"] < b["ema20"]) & (b["low"] < b["ema200"])
+
+@feature("high_above_emas")
+def _high_above_emas(b):
+    return (b["high"] > b["ema20"]) & (b["high"] > b["ema200"])
+
+@feature("bull_trend")
+def _bull_trend(b):
+    return b["ema20"] > b["ema200"]
+
+@feature("bear_trend")
+def _bear_trend(b):
+    return b["ema20"] < b["ema200"]
+
+@feature("ema_gap_atr")
+def _ema_gap_atr(b):
+    return _ratio(np.abs(b["ema20"] - b["ema200"]), b["atr"])
+
+@feature("ema20_vwap_atr")
+def _ema20_vwap_atr(b):
+    return _ratio(np.abs(b["ema20"] - b["vwap"]), b["atr"])
+
+@feature("ema200_vwap_atr")
+def _ema200_vwap_atr(b):
+    return _ratio(np.abs(b["ema200"] - b["vwap"]), b["atr"])
+
+
+# ================= СЧЁТЧИКИ =================
+@feature("bars_since_spike")
+def _bars_since_spike(b):
+    return b.state(lambda c: c.since_spike)
+
+@feature("bars_since_signal")
+def _bars_since_signal(b):
+    return b.state(lambda c: b.engine.counters.bars_since(c.symbol, "signal", c.candle["t"]))
+
+
+# ================= SWING =================
+# считаются инкрементально в engine/swing.py на каждом закрытии
+@feature("bars_since_lower_low")
+def _bars_since_lower_low(b):
+    return b.state(lambda c: b.engine.swings.bars_since[c.symbol][0])
+
+@feature("bars_since_higher_high")
+def _bars_since_higher_high(b):
+    return b.state(lambda c: b.engine.swings.bars_since[c.symbol][1])
+
+
+# ================= HTF ФИЛЬТР (1ч) =================
+def _htf_emas(b):
+    # кэш движка по символу и часу: REST 1ч — раз в час на символ, а не на каждую свечу
+    if "_htf" not in b.columns:
+        interval = b.engine.store.interval_ms
+        emas = [b.engine.htf_emas(c.symbol, (c.candle["t"] + interval) // 3_600_000) for c in b.contexts]
+        # при ошибке загрузки фильтр пропускает оба направления
+        b.columns["_htf"] = np.array([(True, True) if e is None else (e[0] > e[1], e[0] < e[1]) for e in emas],
+                                     dtype=bool).reshape(b.n, 2)
+    return b.columns["_htf"]
+
+@feature("htf_bull")
+def _htf_bull(b):
+    return _htf_emas(b)[:, 0]
+
+@feature("htf_bear")
+def _htf_bear(b):
+    return _htf_emas(b)[:, 1]
@@ -0,0 +1,216 @@
+"""
+Общий поток рынка для ботов одного хоста: одни сокеты Binance на всех вместо своих у каждого.
+
+Хаб живёт в процессе supervisor (engine/supervisor.py). Бот с --feed HOST:PORT
+не открывает WebSocket сам: подключается к хабу, присылает свои потоки
+(<symbol>@kline_<interval>) и получает по ним сообщения в том же виде, что от Binance.
+Хаб держит объединение подписок всех ботов: поток, нужный шести ботам 5m, открыт один раз.
+Ботам уходят только закрытые свечи (незакрытые движок всё равно пропускает), ошибки сокета
+и !miniTicker@arr. Новые потоки добавляются к работающим сокетам; ненужные закрываются
+на плановом суточном перезапуске.
+
+Связь — multiprocessing.connection с ключом FEED_AUTHKEY (supervisor задаёт его ботам сам).
+"""
+import os
+import time
+from multiprocessing.connection import Client as Connect, Listener
+from queue import Queue
+from threading import Event, Lock, Thread
+
+from engine.shard import parse_address
+
+TICKERS = "!miniTicker@arr"
+CHUNK = 30  # потоков на одно соединение, как у Engine.run
+
+
+def feed_key():
+    key = os.getenv("FEED_AUTHKEY")
+    if not key:
+        raise SystemExit("FEED_AUTHKEY не задан: бот и хаб потока должны знать общий ключ")
+    return key.encode()
+
+
+# ================= ХАБ =================
+class FeedLink:
+    """Подключённый бот: его потоки и очередь отправки (медленный бот не держит остальных)."""
+
+    def __init__(self, conn, name):
+        self.conn = conn
+        self.name = name
+        self.streams = set()
+        self.queue = Queue()
+
+    def sender(self, hub):
+        while True:
+            msg = self.queue.get()
+            if msg is None:
+                return
+            try:
+                self.conn.send(msg)
+            except (OSError, ValueError):
+                hub.disconnect(self)
+                return
+
+
+class FeedHub:
+    def __init__(self, address, authkey):
+        self.address = address
+        self.authkey = authkey
+        self.links = set()
+        self.routes = {}      # поток -> {FeedLink}
+        self.opened = set()   # потоки, открытые в текущем ThreadedWebsocketManager
+        self.lock = Lock()
+        self.added = Event()  # новые потоки открывает поток сокетов: twm не принимает сокеты из чужих потоков
+        self.forwarded = 0  # сообщений ботам с запуска (отчёт supervisor)
+
+    def on_message(self, msg):
+        if not isinstance(msg, dict):
+            return
+        stream = msg.get("stream")
+        if stream is not None and stream != TICKERS:
+            data = msg.get("data")
+            if not (isinstance(data, dict) and data.get("k", {}).get("x")):
+                return
+        with self.lock:
+            # ошибка сокета ({"e": "error"}, без stream) и тикеры — всем ботам
+            links = list(self.links if stream in (None, TICKERS) else self.routes.get(stream, ()))
+        for link in links:
+            link.queue.put(msg)
+            self.forwarded += 1
+
+    def subscribe(self, link, streams):
+        with self.lock:
+            for stream in link.streams - streams:
+                self.routes[stream].discard(link)
+            for stream in streams:
+                self.routes.setdefault(stream, set()).add(link)
+            link.streams = streams
+            if streams - self.opened:
+                self.added.set()
+
+    def disconnect(self, link):
+        with self.lock:
+            if link not in self.links:
+                return
+            self.links.discard(link)
+            for stream in link.streams:
+                self.routes[stream].discard(link)
+        link.queue.put(None)
+        print(f"📡 Поток: {link.name} отключился")
+
+    def _open(self, twm):
+        with self.lock:
+            new = sorted(s for s, links in self.routes.items() if links and s not in self.opened)
+        for i in range(0, len(new), CHUNK):
+            twm.start_multiplex_socket(callback=self.on_message, streams=new[i:i + CHUNK])
+        self.opened |= set(new)
+        return len(new)
+
+    def serve(self):
+        listener = Listener(parse_address(self.address), authkey=self.authkey)
+        print(f"📡 Хаб потока рынка на {self.address}")
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                print(f"Ошибка подключения к хабу потока: {e}")
+                continue
+            Thread(target=self.reader, args=(conn,), daemon=True).start()
+
+    def reader(self, conn):
+        link = None
+        try:
+            while True:
+                kind, payload = conn.recv()
+                if kind == "hello":
+                    link = FeedLink(conn, payload)
+                    with self.lock:
+                        self.links.add(link)
+                    Thread(target=link.sender, args=(self,), daemon=True).start()
+                elif kind == "subscribe" and link is not None:
+                    self.subscribe(link, set(payload))
+        except (EOFError, OSError):
+            pass
+        if link is not None:
+            self.disconnect(link)
+
+    def run_sockets(self):
+        """Сокеты Binance с переподключением и суточным перезапуском (без потоков, которые никому не нужны)."""
+        from binance import ThreadedWebsocketManager
+
+        while True:
+            try:
+                twm = ThreadedWebsocketManager()
+                twm.start()
+                self.opened = set()
+                self.added.clear()
+                self._open(twm)
+                twm.start_futures_multiplex_socket(callback=self.on_message, streams=[TICKERS])
+                print(f"🟢 Хаб потока: WebSocket запущен, потоков {len(self.opened)}")
+                restart_at = time.monotonic() + 24 * 60 * 60
+                while time.monotonic() < restart_at:
+                    if self.added.wait(min(60, max(restart_at - time.monotonic(), 0))):
+                        self.added.clear()
+                        new = self._open(twm)
+                        if new:
+                            print(f"📡 Хаб потока: +{new} потоков, всего {len(self.opened)}")
+                print("♻️ Хаб потока: плановый перезапуск WebSocket...")
+            except Exception as e:
+                print(f"🔴 Хаб потока: WebSocket упал: {e}. Переподключение через 30 секунд...")
+                time.sleep(30)
+            try:
+                twm.stop()
+            except Exception:
+                pass
+
+    def start(self):
+        Thread(target=self.serve, daemon=True).start()
+        Thread(target=self.run_sockets, daemon=True).start()
+
+
+# ================= БОТ =================
+class FeedClient:
+    """Вместо своих сокетов Engine.run: сообщения хаба -> handle_kline / tickers.update."""
+
+    def __init__(self, engine, address):
+        self.engine = engine
+        self.address = address
+        self.conn = None
+        self.lock = Lock()
+
+    def send(self, *msg):
+        with self.lock:
+            self.conn.send(msg)
+
+    def resubscribe(self):
+        # вселенная сменилась — новая подписка по текущему соединению (после переподключения — и так новая)
+        engine = self.engine
+        while True:
+            engine.resubscribe.wait()
+            engine.resubscribe.clear()
+            print(f"♻️ Вселенная изменилась ({len(engine.symbols)} токенов), переподписка потока...")
+            try:
+                self.send("subscribe", engine.kline_streams())
+            except (OSError, AttributeError):
+                pass
+
+    def run(self):
+        engine = self.engine
+        Thread(target=self.resubscribe, daemon=True).start()
+        while True:
+            try:
+                self.conn = Connect(parse_address(self.address), authkey=feed_key())
+                self.send("hello", engine.state_name)
+                self.send("subscribe", engine.kline_streams())
+                print(f"🟢 Поток рынка от хаба {self.address}")
+                engine.send_telegram(f"🟢 {engine.state_name} поток рынка подключён")
+                while True:
+                    msg = self.conn.recv()
+                    if msg.get("stream") == TICKERS:
+                        engine.tickers.update(msg)
+                    else:
+                        engine.handle_kline(msg)
+            except (EOFError, OSError) as e:
+                print(f"🔴 Хаб потока недоступен: {e!r}. Переподключение через 5 секунд...")
+                engine.trades.save_active_trades()
+                time.sleep(5)
@@ -0,0 +1,51 @@
+import numpy as np
+
+
+# ================= INDICATORS =================
+# pandas-версии — эталон для ядер engine/kernels.py (bench/kernels.py), в живом пути не грузятся
+def calculate_session_vwap(df):
+    import pandas as pd
+    df = df.copy()
+    df["date"] = pd.to_datetime(df["open_time"], unit="ms").dt.date
+    tp = (df["high"] + df["low"] + df["close"]) / 3
+    df["tpv"] = tp * df["volume"]
+    df["cum_tpv"] = df.groupby("date")["tpv"].cumsum()
+    df["cum_vol"] = df.groupby("date")["volume"].cumsum()
+    return df["cum_tpv"] / df["cum_vol"]
+
+def calculate_atr(df, period):
+    import pandas as pd
+    hl = df["high"] - df["low"]
+    hc = (df["high"] - df["close"].shift()).abs()
+    lc = (df["low"] - df["close"].shift()).abs()
+    tr = pd.concat([hl, hc, lc], axis=1).max(axis=1)
+    return tr.rolling(period).mean()
+
+def ema_last(values, span):
+    """Последнее значение EMA (как ewm(span, adjust=False).mean().iloc[-1]) по массиву."""
+    alpha = 2 / (span + 1)
+    old = 1 - alpha
+    norm = old + alpha  # pandas делит на сумму весов — повторяем ради тех же цифр
+    ema = values[0]
+    for x in values[1:].tolist():
+        ema = (old * ema + alpha * x) / norm
+    return float(ema)
+
+# ================= SWING =================
+# Текущая свеча — последняя закрытая (rows[-1]), i = 1 — предыдущая свеча.
+# Ближайший свинг (bars_since_*) считается инкрементально в engine/swing.py.
+
+def get_swing_num(rows, side, n=5):
+    """
+    Информационно: ищем наидальнейшую свечу среди n предыдущих,
+    у которой low ниже (BUY) или high выше (SELL) текущей.
+    rows — свечи символа из CandleStore. Возвращает номер (1=предыдущая ... n) или 0.
+    """
+    if side == "BUY":
+        values = rows[:, 3]
+        hit = values[-2:-n - 2:-1] < values[-1]
+    else:
+        values = rows[:, 2]
+        hit = values[-2:-n - 2:-1] > values[-1]
+    found = np.flatnonzero(hit)
+    return int(found[-1] + 1) if found.size else 0
@@ -0,0 +1,157 @@
+import os
+from datetime import datetime
+from threading import Lock
+
+# openpyxl и requests импортируются при первой записи / отправке:
+# процесс бота стартует без них (см. bench/startup.py)
+
+EXCEL_STRAT_START_COL = 14  # колонка N
+
+
+def get_column_letter(n):
+    """1 -> A, 14 -> N, 27 -> AA (как openpyxl.utils.get_column_letter)."""
+    letters = ""
+    while n:
+        n, rem = divmod(n - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def column_index(letters):
+    """A -> 1, N -> 14, AA -> 27."""
+    n = 0
+    for ch in letters:
+        n = n * 26 + ord(ch) - 64
+    return n
+
+
+BASE_HEADERS = {
+    "A":"Дата","B":"Время","C":"День","D":"Тикет","E":"Объем",
+    "F":"Trade_id","G":"Тип","H":"Импульс","J":"Цена входа",
+    "K":"Корреляция","M":"NATR%",
+}
+
+
+# ================= TELEGRAM =================
+class Telegram:
+    def __init__(self, bot_token, chat_id):
+        self.bot_token = bot_token
+        self.chat_id = chat_id
+
+    def send(self, message: str):
+        import requests
+
+        api = os.getenv("TELEGRAM_API", "https://api.telegram.org")  # локальный стенд: bench/fakebinance.py
+        url = f"{api}/bot{self.bot_token}/sendMessage"
+        payload = {"chat_id": self.chat_id, "text": message}
+        try:
+            requests.post(url, data=payload, timeout=10)
+        except Exception as e:
+            print(f"Ошибка Telegram: {e}")
+
+
+# ================= EXCEL =================
+class ExcelJournal:
+    """
+    Журнал сделок trades_{BOT}.xlsx.
+    N.. — статус каждой стратегии, следом — цена закрытия
+    (details="pnl": "цена / PnL%", details="price": только цена),
+    extra_columns — дополнительные колонки бота {буква: (заголовок, ключ в trade_info)}.
+    """
+
+    def __init__(self, path, sheet_name, sheet_names, strategies, details="pnl", extra_columns=None):
+        self.path = path
+        self.sheet_name = sheet_name
+        self.sheet_names = list(sheet_names)
+        self.strategies = list(strategies)
+        self.details = details
+        self.extra_columns = extra_columns or {}
+        self.lock = Lock()
+
+        n = len(self.strategies)
+        self.col_status  = {s: get_column_letter(EXCEL_STRAT_START_COL + i) for i, s in enumerate(self.strategies)}
+        self.col_details = {s: get_column_letter(EXCEL_STRAT_START_COL + n + i) for i, s in enumerate(self.strategies)}
+
+    def headers(self):
+        headers = dict(BASE_HEADERS)
+        suffix = "цена/PnL" if self.details == "pnl" else "цена"
+        for s in self.strategies:
+            headers[self.col_status[s]] = s
+        for s in self.strategies:
+            headers[self.col_details[s]] = f"{s} {suffix}"
+        for col, (title, _) in self.extra_columns.items():
+            headers[col] = title
+        return headers
+
+    def _create(self):
+        import openpyxl
+
+        wb = openpyxl.Workbook()
+        for sn in self.sheet_names:
+            if sn not in wb.sheetnames:
+                wb.create_sheet(sn)
+        if "Sheet" in wb.sheetnames:
+            wb.remove(wb["Sheet"])
+        wb.save(self.path)
+
+    def write_trade(self, trade_id, trade_info, vol_text, vol24, corr_text):
+        self.write_trades([(trade_id, trade_info, vol_text, vol24, corr_text)])
+
+    def write_trades(self, rows):
+        """Несколько сделок одной загрузкой и записью книги. rows — [(trade_id, trade_info, vol_text, vol24, corr_text)]."""
+        import openpyxl
+
+        with self.lock:
+            if not os.path.exists(self.path):
+                self._create()
+
+            wb = openpyxl.load_workbook(self.path)
+            if self.sheet_name not in wb.sheetnames:
+                wb.create_sheet(self.sheet_name)
+            ws = wb[self.sheet_name]
+
+            # заголовки дописываются и в старый лист, если колонок стало больше (VOLUME_WINDOWS)
+            for col, header in self.headers().items():
+                if ws[f"{col}1"].value is None:
+                    ws[f"{col}1"] = header
+
+            for trade_id, trade_info, vol_text, vol24, corr_text in rows:
+                self._write_row(ws, ws.max_row + 1, trade_id, trade_info, vol_text, vol24, corr_text)
+            wb.save(self.path)
+
+    def _write_row(self, ws, next_row, trade_id, trade_info, vol_text, vol24, corr_text):
+        dt = trade_info.get("time") or datetime.now()  # закрытие сигнальной свечи (Engine.open_signal)
+        ws["A"+str(next_row)] = dt.strftime("%d.%m.%Y")
+        ws["B"+str(next_row)] = dt.strftime("%H:%M:%S")
+        ws["C"+str(next_row)] = dt.strftime("%a")
+        ws["D"+str(next_row)] = trade_info["symbol"]
+        ws["E"+str(next_row)] = vol24
+        ws["F"+str(next_row)] = trade_id
+        ws["G"+str(next_row)] = ", ".join(trade_info["signals"])
+        ws["H"+str(next_row)] = vol_text
+        ws["J"+str(next_row)] = trade_info["entry_price"]
+        ws["K"+str(next_row)] = corr_text
+        ws["M"+str(next_row)] = trade_info["natr"]
+        for col, (_, key) in self.extra_columns.items():
+            ws[col+str(next_row)] = trade_info[key]
+
+        for s in self.strategies:
+            ws[f"{self.col_status[s]}{next_row}"] = trade_info["strategies"][s]["status"]
+
+    def update_status(self, trade_id, strategy_name, status, close_price, pnl):
+        import openpyxl
+
+        with self.lock:
+            wb = openpyxl.load_workbook(self.path)
+            ws = wb[self.sheet_name]
+
+            for row in range(2, ws.max_row+1):
+                if str(ws[f"F{row}"].value) == trade_id:
+                    ws[f"{self.col_status[strategy_name]}{row}"] = status
+                    if self.details == "pnl":
+                        ws[f"{self.col_details[strategy_name]}{row}"] = f"{close_price:.6f} / {pnl:+.2f}%"
+                    else:
+                        ws[f"{self.col_details[strategy_name]}{row}"] = round(close_price, 6)
+                    break
+
+            wb.save(self.path)
@@ -0,0 +1,354 @@
+"""
+Последовательные рекурсии индикаторов и бэктеста над матрицами (символы × свечи).
+
+EMA (adjust=False), ATR (скользящее среднее TR или по Уайлдеру), сессионный VWAP, свинги и
+первое касание TP/SL — рекурсии по времени: pandas считает их по одной серии, цикл Python
+по свечам медленный. Здесь строка матрицы — символ, столбец — свеча общей оси времени;
+короткие истории дополняются NaN слева. 1-D массив — одна строка, результат той же формы.
+
+С numba (pip install numba) ядра компилируются при первом вызове (cache=True — на диск);
+без неё работает запасной путь на NumPy: цикл по свечам, векторный по символам (у EMA
+на нескольких строках — цикл Python по строке, при NaN только слева — арифметика на месте,
+VWAP — по суткам). Оба пути совпадают
+с pandas-кодом engine/indicators.py до ошибки округления.
+
+Живой путь: признаки пачки (engine/features.py) — EMA, ATR и VWAP всех символов, закрывшихся
+на свече, одной матрицей; симулятор (engine/simulator.py) — first_touch по всем сделкам пачки.
+
+    from engine import kernels
+    kernels.BACKEND                  # "numba" или "numpy"
+    kernels.use("numpy")             # принудительно (бенчмарк bench/kernels.py)
+    kernels.ema(closes, 20)          # closes: символы × свечи
+"""
+import math
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # необязательная зависимость
+    numba = None
+
+DAY_MS = 86_400_000
+TP, SL, OPEN = 1, -1, 0  # исходы first_touch
+ROW_LOOP = 8  # строк, до которых EMA без numba считается циклом Python по строке
+
+
+def _matrix(a):
+    a = np.asarray(a, dtype=np.float64)
+    return np.ascontiguousarray(a[None, :] if a.ndim == 1 else a)
+
+
+def _shape_like(out, a):
+    return out[0] if np.ndim(a) == 1 else out
+
+
+# ================= ЦИКЛЫ (компилируются numba) =================
+# Обычный Python: без numba они не вызываются, вместо них — векторные версии ниже.
+
+def _ema_loop(x, span, out):
+    alpha = 2 / (span + 1)
+    old = 1 - alpha
+    norm = old + alpha  # pandas делит на сумму весов — повторяем ради тех же цифр
+    for i in range(x.shape[0]):
+        prev = np.nan
+        for j in range(x.shape[1]):
+            v = x[i, j]
+            if v == v:
+                prev = v if prev != prev else (old * prev + alpha * v) / norm
+            out[i, j] = prev
+
+
+def _true_range_loop(high, low, close, out):
+    for i in range(high.shape[0]):
+        prev_close = np.nan
+        for j in range(high.shape[1]):
+            tr = high[i, j] - low[i, j]
+            if prev_close == prev_close:
+                tr = max(tr, abs(high[i, j] - prev_close), abs(low[i, j] - prev_close))
+            out[i, j] = tr
+            prev_close = close[i, j]
+
+
+def _atr_loop(tr, period, wilder, out):
+    for i in range(tr.shape[0]):
+        total, valid, prev = 0.0, 0, np.nan
+        for j in range(tr.shape[1]):
+            v = tr[i, j]
+            if v == v:
+                total += v
+                valid += 1
+            if j >= period:
+                old = tr[i, j - period]
+                if old == old:
+                    total -= old
+                    valid -= 1
+            sma = total / period if valid == period else np.nan
+            if not wilder:
+                out[i, j] = sma
+            elif prev != prev:
+                prev = sma
+                out[i, j] = prev
+            else:
+                if v == v:
+                    prev = (prev * (period - 1) + v) / period
+                out[i, j] = prev
+
+
+def _vwap_loop(day, high, low, close, volume, out):
+    for i in range(high.shape[0]):
+        pv, vol = 0.0, 0.0
+        for j in range(high.shape[1]):
+            if j and day[j] != day[j - 1]:
+                pv, vol = 0.0, 0.0
+            tpv = (high[i, j] + low[i, j] + close[i, j]) / 3 * volume[i, j]
+            if tpv != tpv:
+                out[i, j] = np.nan
+                continue
+            pv += tpv
+            vol += volume[i, j]
+            out[i, j] = pv / vol
+
+
+def _swing_loop(x, n, below, farthest, out):
+    for i in range(x.shape[0]):
+        for j in range(x.shape[1]):
+            found = 0
+            for k in range(1, min(n, j) + 1):
+                if (x[i, j - k] < x[i, j]) if below else (x[i, j - k] > x[i, j]):
+                    found = k
+                    if not farthest:
+                        break
+            out[i, j] = found
+
+
+def _first_touch_loop(high, low, tp, sl, buy, bar, result):
+    for i in range(high.shape[0]):
+        bar[i], result[i] = -1, 0
+        for j in range(high.shape[1]):
+            h, l = high[i, j], low[i, j]
+            if h != h or l != l:
+                break  # дальше истории нет
+            if (l <= sl[i]) if buy[i] else (h >= sl[i]):
+                bar[i], result[i] = j, -1
+                break
+            if (h >= tp[i]) if buy[i] else (l <= tp[i]):
+                bar[i], result[i] = j, 1
+                break
+
+
+# ================= ЗАПАСНОЙ ПУТЬ NUMPY =================
+# Цикл по свечам, каждый шаг — одна векторная операция по всем символам.
+
+def _ema_numpy(x, span, out):
+    alpha = 2 / (span + 1)
+    old = 1 - alpha
+    norm = old + alpha
+    if x.shape[0] <= ROW_LOOP:
+        # шаг по свечам — несколько вызовов NumPy, на одной строке (живой символ) это дороже
+        # скалярного цикла по списку
+        for i in range(x.shape[0]):
+            prev, row = math.nan, []
+            for v in x[i].tolist():
+                if v == v:
+                    prev = v if prev != prev else (old * prev + alpha * v) / norm
+                row.append(prev)
+            out[i] = row
+        return
+    missing = np.isnan(x)
+    if (missing == np.logical_and.accumulate(missing, axis=1)).all():
+        # NaN только слева (матрица признаков пачки, engine/features.py): шаг — арифметика на месте,
+        # строка подхватывает первое значение на своей первой свече
+        starts = missing.sum(axis=1)
+        first = {j: np.flatnonzero(starts == j) for j in np.unique(starts[starts > 0]).tolist()}
+        xt = np.ascontiguousarray(x.T)
+        step = alpha * xt
+        res = np.empty_like(xt)
+        prev = xt[0].copy()
+        res[0] = prev
+        for j in range(1, xt.shape[0]):
+            prev *= old
+            prev += step[j]
+            prev /= norm
+            rows = first.get(j)
+            if rows is not None:
+                prev[rows] = xt[j, rows]
+            res[j] = prev
+        out[:] = res.T
+        return
+    prev = x[:, 0].copy()
+    out[:, 0] = prev
+    for j in range(1, x.shape[1]):
+        v = x[:, j]
+        step = (old * prev + alpha * v) / norm
+        prev = np.where(np.isnan(prev), v, np.where(np.isnan(v), prev, step))
+        out[:, j] = prev
+
+
+def _true_range_numpy(high, low, close, out):
+    out[:] = high - low
+    prev_close = close[:, :-1]
+    # fmax пропускает NaN: первая свеча (нет прошлого close) — просто high - low, как в pandas
+    out[:, 1:] = np.fmax(out[:, 1:], np.fmax(np.abs(high[:, 1:] - prev_close), np.abs(low[:, 1:] - prev_close)))
+
+
+def _atr_numpy(tr, period, wilder, out):
+    out[:] = np.nan
+    if tr.shape[1] >= period:
+        # окно с NaN даёт NaN, как rolling(period).mean()
+        windows = np.lib.stride_tricks.sliding_window_view(tr, period, axis=1)
+        out[:, period - 1:] = windows.mean(axis=-1)
+    if not wilder:
+        return
+    prev = out[:, 0].copy()
+    for j in range(1, tr.shape[1]):
+        v = tr[:, j]
+        step = np.where(np.isnan(v), prev, (prev * (period - 1) + v) / period)
+        prev = np.where(np.isnan(prev), out[:, j], step)
+        out[:, j] = prev
+
+
+def _vwap_numpy(day, high, low, close, volume, out):
+    tpv = (high + low + close) / 3 * volume
+    missing = np.isnan(tpv)
+    tpv = np.where(missing, 0.0, tpv)
+    vol = np.where(missing, 0.0, volume)
+    # накопление сбрасывается в начале суток: cumsum по каждому отрезку суток сразу для всех символов
+    bounds = np.concatenate(([0], np.flatnonzero(np.diff(day)) + 1, [len(day)]))
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[:, a:b] = np.cumsum(tpv[:, a:b], axis=1) / np.cumsum(vol[:, a:b], axis=1)
+    out[missing] = np.nan
+
+
+def _swing_numpy(x, n, below, farthest, out):
+    out[:] = 0
+    for k in range(1, min(n, x.shape[1] - 1) + 1):
+        prev, cur = x[:, :-k], x[:, k:]
+        hit = prev < cur if below else prev > cur
+        if farthest:
+            out[:, k:][hit] = k
+        else:
+            out[:, k:] = np.where((out[:, k:] == 0) & hit, k, out[:, k:])
+
+
+def _first_touch_numpy(high, low, tp, sl, buy, bar, result):
+    b = buy[:, None]
+    # история обрывается на первой NaN-свече
+    alive = np.cumprod(~(np.isnan(high) | np.isnan(low)), axis=1).astype(bool)
+    sl_hit = alive & np.where(b, low <= sl[:, None], high >= sl[:, None])
+    tp_hit = alive & np.where(b, high >= tp[:, None], low <= tp[:, None])
+    hit = sl_hit | tp_hit
+    first = hit.argmax(axis=1)
+    rows = np.arange(high.shape[0])
+    touched = hit[rows, first]
+    bar[:] = np.where(touched, first, -1)
+    result[:] = np.where(~touched, 0, np.where(sl_hit[rows, first], -1, 1))
+
+
+# ================= ВЫБОР РЕАЛИЗАЦИИ =================
+LOOPS = {"ema": _ema_loop, "true_range": _true_range_loop, "atr": _atr_loop, "vwap": _vwap_loop,
+         "swing": _swing_loop, "first_touch": _first_touch_loop}
+NUMPY = {"ema": _ema_numpy, "true_range": _true_range_numpy, "atr": _atr_numpy, "vwap": _vwap_numpy,
+         "swing": _swing_numpy, "first_touch": _first_touch_numpy}
+NUMBA = {} if numba is None else {
+    name: numba.njit(cache=True, error_model="numpy")(fn) for name, fn in LOOPS.items()}
+
+BACKEND = "numba" if NUMBA else "numpy"
+_impl = NUMBA or NUMPY
+
+
+def use(backend):
+    """
+    Переключает реализацию: "numba" (если установлена), "numpy" или "python" —
+    циклы numba без компиляции, медленно, только для сверки.
+    """
+    global BACKEND, _impl
+    if backend == "numba" and not NUMBA:
+        raise RuntimeError("numba не установлена")
+    impl = {"numba": NUMBA, "numpy": NUMPY, "python": LOOPS}.get(backend)
+    if impl is None:
+        raise ValueError(f"Неизвестная реализация: {backend}")
+    BACKEND, _impl = backend, impl
+
+
+# ================= ИНДИКАТОРЫ =================
+def ema(values, span):
+    """EMA каждой строки, как ewm(span, adjust=False).mean(); NaN внутри строки — значение переносится."""
+    x = _matrix(values)
+    out = np.empty_like(x)
+    _impl["ema"](x, span, out)
+    return _shape_like(out, values)
+
+
+def true_range(high, low, close):
+    h, l, c = _matrix(high), _matrix(low), _matrix(close)
+    out = np.empty_like(h)
+    _impl["true_range"](h, l, c, out)
+    return _shape_like(out, high)
+
+
+def atr(high, low, close, period, wilder=False):
+    """
+    ATR каждой строки. wilder=False — rolling(period).mean() от TR, как calculate_atr;
+    wilder=True — сглаживание Уайлдера (RMA), затравка — среднее первых period TR.
+    """
+    tr = _matrix(true_range(high, low, close))
+    out = np.empty_like(tr)
+    _impl["atr"](tr, period, wilder, out)
+    return _shape_like(out, high)
+
+
+def session_vwap(open_time, high, low, close, volume):
+    """
+    VWAP с обнулением в начале каждых суток UTC, как calculate_session_vwap.
+    open_time — общая ось времени матриц (мс, длина = число столбцов).
+    """
+    day = np.asarray(open_time, dtype=np.int64) // DAY_MS
+    h = _matrix(high)
+    out = np.empty_like(h)
+    _impl["vwap"](day, h, _matrix(low), _matrix(close), _matrix(volume), out)
+    return _shape_like(out, high)
+
+
+def swing_scan(values, n, below=True, farthest=False):
+    """
+    Для каждой свечи — номер k (1 = предыдущая ... n) свечи, у которой values ниже (below)
+    или выше текущей; 0, если такой нет. farthest=True — самая дальняя, как get_swing_num,
+    иначе ближайшая, как engine/swing.py с окном n.
+    """
+    x = _matrix(values)
+    out = np.empty(x.shape, dtype=np.int64)
+    _impl["swing"](x, n, below, farthest, out)
+    return _shape_like(out, values)
+
+
+# ================= TP / SL =================
+def first_touch(high, low, tp, sl, buy):
+    """
+    Первое касание уровней по свечам после входа (строка — сделка, NaN — конец истории).
+    SL внутри свечи проверяется первым, как TradeBook.resolve.
+    Возвращает (номер свечи или -1, исход TP / SL / OPEN).
+    """
+    h, l = _matrix(high), _matrix(low)
+    n = h.shape[0]
+    tp = np.broadcast_to(np.asarray(tp, dtype=np.float64), (n,)).copy()
+    sl = np.broadcast_to(np.asarray(sl, dtype=np.float64), (n,)).copy()
+    buy = np.broadcast_to(np.asarray(buy, dtype=np.bool_), (n,)).copy()
+    bar = np.empty(n, dtype=np.int64)
+    result = np.empty(n, dtype=np.int64)
+    _impl["first_touch"](h, l, tp, sl, buy, bar, result)
+    return bar, result
+
+
+def compiled():
+    """Прогрев JIT на маленьких массивах, чтобы компиляция не попала в первую свечу."""
+    x = np.ones((1, 4))
+    ema(x, 3)
+    atr(x, x, x, 2)
+    atr(x, x, x, 2, wilder=True)
+    session_vwap(np.arange(4), x, x, x, x)
+    swing_scan(x, 2)
+    swing_scan(x, 2, below=False, farthest=True)
+    first_touch(x, x, 2.0, 0.5, True)
+    return BACKEND
@@ -0,0 +1,99 @@
+"""
+Дисковый кэш фьючерсных свечей: kline_cache/{SYMBOL}_{interval}.npz.
+
+Хранится непрерывный диапазон закрытых свечей символа (open_time, open, high, low, close, volume);
+при запросе за его пределами докачиваются только недостающие края через futures_klines.
+"""
+import os
+import time
+
+import numpy as np
+
+from engine.config import INTERVAL_SECONDS
+from engine.klines import FIELDS, decoder
+from engine.market import kline_weight
+
+REST_LIMIT = 1500  # максимум свечей за запрос /fapi/v1/klines
+
+
+class KlineCache:
+    def __init__(self, client, interval, path="kline_cache", budget=None, clock=time.time):
+        self.client = client
+        self.interval = interval
+        self.interval_ms = INTERVAL_SECONDS[interval] * 1000
+        self.path = path
+        self.budget = budget  # RestBudget или None
+        self.clock = clock
+        self.memory = {}
+
+    def _file(self, symbol):
+        return os.path.join(self.path, f"{symbol}_{self.interval}.npz")
+
+    def _load(self, symbol):
+        if symbol not in self.memory:
+            data = None
+            if os.path.exists(self._file(symbol)):
+                with np.load(self._file(symbol)) as npz:
+                    data = {f: npz[f] for f in FIELDS}
+            self.memory[symbol] = data
+        return self.memory[symbol]
+
+    def _save(self, symbol, data):
+        os.makedirs(self.path, exist_ok=True)
+        tmp = f"{self._file(symbol)}.{os.getpid()}.tmp.npz"  # кэш делят боты supervisor
+        np.savez(tmp, **data)
+        os.replace(tmp, self._file(symbol))
+        self.memory[symbol] = data
+
+    def _fetch(self, symbol, start_ms, end_ms):
+        """Закрытые свечи с open_time в [start_ms, end_ms] постранично по REST_LIMIT."""
+        pages = []
+        closed_before = int(self.clock() * 1000) - self.interval_ms
+        end_ms = min(end_ms, closed_before)
+        t = start_ms
+        while t <= end_ms:
+            limit = min(REST_LIMIT, (end_ms - t) // self.interval_ms + 1)
+            if self.budget:
+                self.budget.acquire(kline_weight(limit))
+            klines = self.client.futures_klines(symbol=symbol, interval=self.interval,
+                                                startTime=t, endTime=end_ms, limit=limit)
+            if not klines:
+                break
+            page = decoder().decode(klines)
+            keep = int(np.searchsorted(page["open_time"], end_ms, "right"))
+            pages.append({f: page[f][:keep].copy() for f in FIELDS})
+            t = klines[-1][0] + self.interval_ms
+            if len(klines) < limit:
+                break
+        if len(pages) == 1:
+            return pages[0]
+        return {f: np.concatenate([p[f] for p in pages]) if pages else
+                np.empty(0, dtype=np.int64 if f == "open_time" else np.float64) for f in FIELDS}
+
+    def get(self, symbol, start_ms, end_ms):
+        """Свечи символа с open_time в [start_ms, end_ms], словарь массивов FIELDS."""
+        start_ms = start_ms // self.interval_ms * self.interval_ms
+        data = self._load(symbol)
+        if data is not None and len(data["open_time"]) and (
+                start_ms > int(data["open_time"][-1]) + self.interval_ms
+                or end_ms < int(data["open_time"][0]) - self.interval_ms):
+            data = None  # кэш не примыкает к запрошенному диапазону — качаем заново, не заполняя дыру
+        if data is None or not len(data["open_time"]):
+            data = self._fetch(symbol, start_ms, end_ms)
+            if len(data["open_time"]):
+                self._save(symbol, data)
+        else:
+            parts = []
+            first, last = int(data["open_time"][0]), int(data["open_time"][-1])
+            if start_ms < first:
+                parts.append(self._fetch(symbol, start_ms, first - self.interval_ms))
+            parts.append(data)
+            if end_ms > last:
+                parts.append(self._fetch(symbol, last + self.interval_ms, end_ms))
+            if len(parts) > 1:
+                data = {f: np.concatenate([p[f] for p in parts]) for f in FIELDS}
+                self._save(symbol, data)
+
+        times = data["open_time"]
+        lo, hi = np.searchsorted(times, start_ms, "left"), np.searchsorted(times, end_ms, "right")
+        return {f: data[f][lo:hi] for f in FIELDS}
@@ -0,0 +1,70 @@
+"""
+Разбор свечей Binance сразу в массивы NumPy, без DataFrame с object-колонками.
+
+    from engine.klines import decoder
+    k = decoder().decode(client.futures_klines(symbol="BTCUSDT", interval="5m", limit=1500))
+    k["close"]  # float64, срез буфера
+
+Из 12 полей REST-свечи разбираются только FIELDS; close_time, quote_volume, trades,
+taker_buy_* и ignore пропускаются. Буферы свои у каждого потока (прогрев идёт в пуле)
+и растут только при более длинном ответе. Результат decode — срезы буферов:
+действителен до следующего decode в том же потоке, хранить — только через copy().
+"""
+import threading
+from operator import itemgetter
+
+import numpy as np
+
+FIELDS = ("open_time", "open", "high", "low", "close", "volume")
+_GETTERS = [itemgetter(i) for i in range(len(FIELDS))]
+
+
+class KlineDecoder:
+    def __init__(self, capacity=1500):
+        self.capacity = 0
+        self._reserve(capacity)
+
+    def _reserve(self, n):
+        if n <= self.capacity:
+            return
+        self.capacity = max(n, 2 * self.capacity)
+        self.open_time = np.empty(self.capacity, dtype=np.int64)
+        self.values = np.empty((len(FIELDS) - 1, self.capacity), dtype=np.float64)  # по колонке на поле
+
+    def decode(self, klines, fields=FIELDS):
+        """REST-свечи (список списков) → {поле: массив}. fields — какие поля разбирать."""
+        n = len(klines)
+        self._reserve(n)
+        out = {}
+        for name in fields:
+            i = FIELDS.index(name)
+            if i == 0:
+                col = self.open_time[:n]
+                col[:] = np.fromiter(map(_GETTERS[0], klines), dtype=np.int64, count=n)
+            else:
+                col = self.values[i - 1, :n]
+                col[:] = np.fromiter(map(float, map(_GETTERS[i], klines)), dtype=np.float64, count=n)
+            out[name] = col
+        return out
+
+
+def ws_row(k):
+    """Свеча из WebSocket (словарь "k") → (open_time, open, high, low, close, volume)."""
+    return (k["t"], float(k["o"]), float(k["h"]), float(k["l"]), float(k["c"]), float(k["v"]))
+
+
+_local = threading.local()
+
+
+def decoder():
+    """KlineDecoder текущего потока."""
+    d = getattr(_local, "decoder", None)
+    if d is None:
+        d = _local.decoder = KlineDecoder()
+    return d
+
+
+def decode_copy(klines, fields=FIELDS):
+    """То же, что decoder().decode, но массивы свои — их можно хранить."""
+    return {f: a.copy() for f, a in decoder().decode(klines, fields).items()}
+
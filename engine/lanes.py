@@ -0,0 +1,109 @@
+"""
+Приоритетные полосы работы на закрытии свечи.
+
+  CRITICAL — TP/SL и поиск сигналов: воркер очереди свечей, выполняется сразу
+  NOTIFY   — Telegram (объём 24h и корреляция BTC входят в текст, поэтому считаются здесь же)
+  JOURNAL  — Excel, снимок и сезонная таблица (состояние сделок пишется в критической полосе: TradeBook.flush)
+
+Отложенные полосы исполняет один фоновый поток и только пока критическая пуста:
+в очереди нет свечей и воркер не внутри пачки. Внутри полосы — FIFO, NOTIFY раньше JOURNAL.
+Для каждого закрытия (open_time) меряется время от первой пришедшей свечи до конца
+критической обработки последней — METRICS "bar_critical".
+"""
+import time
+from collections import deque
+from contextlib import contextmanager
+from threading import Condition, Thread, local
+
+from engine.metrics import METRICS
+
+CRITICAL, NOTIFY, JOURNAL = 0, 1, 2
+DEFERRED = (NOTIFY, JOURNAL)
+MAX_BARS = 100  # закрытия, ожидающие отчёта; старые выбрасываются
+
+
+class LaneScheduler:
+    def __init__(self, pending=lambda: 0):
+        self.pending = pending  # сколько свечей ждёт в очереди критической полосы
+        self.lanes = {lane: deque() for lane in DEFERRED}
+        self.cond = Condition()
+        self.busy = 0      # воркер внутри пачки
+        self.running = 0   # отложенная задача выполняется
+        self.local = local()  # local.bar — open_time свечи выполняемой задачи
+        self.bars = {}     # open_time -> [первая свеча, конец критической обработки]
+
+    def start(self):
+        Thread(target=self._loop, daemon=True).start()
+
+    def submit(self, lane, fn, *args, bar=None):
+        """Ставит fn(*args) в отложенную полосу. bar — open_time свечи, к которой относится задача."""
+        with self.cond:
+            self.lanes[lane].append((fn, args, bar))
+            self.cond.notify_all()
+
+    @contextmanager
+    def critical(self):
+        with self.cond:
+            self.busy += 1
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.busy -= 1
+                self.cond.notify_all()
+
+    # ================= ВРЕМЯ ЗАКРЫТИЯ =================
+    def arrived(self, open_time):
+        """Закрытая свеча пришла из сокета (поток WebSocket)."""
+        if open_time not in self.bars:
+            self.bars[open_time] = [time.perf_counter(), None]
+
+    def done(self, open_time):
+        """Свеча закрытия open_time прошла критическую полосу."""
+        bar = self.bars.get(open_time)
+        if bar is not None:
+            bar[1] = time.perf_counter()
+
+    def settle(self):
+        """Очередь свечей пуста: обработанные закрытия уходят в метрики."""
+        for t in sorted(self.bars):
+            first, last = self.bars[t]
+            if last is not None:
+                del self.bars[t]
+                METRICS.observe("bar_critical", last - first)
+                METRICS.set("bar_critical_last_s", round(last - first, 3))
+        for t in sorted(self.bars)[:-MAX_BARS]:
+            del self.bars[t]
+        for lane, jobs in self.lanes.items():
+            METRICS.set(f"lane_{lane}_depth", len(jobs))
+
+    # ================= ОТЛОЖЕННЫЕ ПОЛОСЫ =================
+    def _next(self):
+        with self.cond:
+            while True:
+                queued = [lane for lane in DEFERRED if self.lanes[lane]]
+                if queued and self.busy == 0 and not self.pending():
+                    self.running += 1
+                    return self.lanes[queued[0]].popleft()
+                # очередь свечей не будит условие — пока есть задачи, проверяем её периодически
+                self.cond.wait(0.02 if queued else None)
+
+    def _loop(self):
+        while True:
+            fn, args, bar = self._next()
+            self.local.bar = bar
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"Ошибка отложенной задачи {getattr(fn, '__name__', fn)}: {e}")
+            finally:
+                self.local.bar = None
+                with self.cond:
+                    self.running -= 1
+                    self.cond.notify_all()
+
+    def join(self):
+        """Ждёт, пока отложенные полосы опустеют (бенчмарк, остановка)."""
+        with self.cond:
+            while self.running or any(self.lanes.values()):
+                self.cond.wait()
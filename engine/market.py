@@ -0,0 +1,155 @@
+import os
+import time
+from collections import deque
+from threading import Lock
+
+import numpy as np
+
+from engine.config import INTERVAL_SECONDS
+from engine.indicators import ema_last
+from engine.klines import decoder
+
+def kline_weight(limit):
+    """Вес запроса /fapi/v1/klines по limit."""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+class RestBudget:
+    """Скользящее минутное окно веса REST-запросов: acquire ждёт, пока вес не влезет в лимит."""
+
+    def __init__(self, weight_per_minute):
+        self.limit = weight_per_minute
+        self.used = deque()  # (время, вес)
+        self.total = 0
+        self.lock = Lock()
+
+    def acquire(self, weight):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                while self.used and now - self.used[0][0] >= 60:
+                    self.total -= self.used.popleft()[1]
+                if not self.used or self.total + weight <= self.limit:
+                    self.used.append((now, weight))
+                    self.total += weight
+                    return
+                wait = 60 - (now - self.used[0][0])
+            time.sleep(wait)
+
+HTF_BARS = 209  # закрытых 1ч свечей под EMA старшего ТФ
+
+def get_htf_emas(client, symbol, fast, slow):
+    """EMA fast/slow на последней закрытой 1ч свече."""
+    klines_1h = client.futures_klines(symbol=symbol, interval="1h", limit=HTF_BARS + 1)
+    close = decoder().decode(klines_1h, ("close",))["close"][:-1]
+    return ema_last(close, fast), ema_last(close, slow)
+
+def get_closed_kline(client, symbol, interval, open_time):
+    """Одна закрытая свеча в формате "k" WebSocket или None, если её ещё нет."""
+    klines = client.futures_klines(symbol=symbol, interval=interval, startTime=open_time, limit=1)
+    k = decoder().decode(klines)
+    if not len(k["open_time"]) or int(k["open_time"][0]) != open_time:
+        return None
+    return {"s": symbol, "i": interval, "t": open_time, "x": True,
+            "o": float(k["open"][0]), "h": float(k["high"][0]), "l": float(k["low"][0]),
+            "c": float(k["close"][0]), "v": float(k["volume"][0])}
+
+TICKER_24H_WEIGHT = 40  # ticker/24hr без symbol
+
+def get_tickers_24h(client):
+    return client._request_futures_api(method="get", path="ticker/24hr")
+
+def get_liquid_futures_symbols(client, min_volume):
+    from engine.tickers import liquid_symbols
+    return liquid_symbols({t["symbol"]: float(t["quoteVolume"]) for t in get_tickers_24h(client)}, min_volume)
+
+def returns_of(close):
+    """Доходности close к предыдущей свече (первая — NaN, как pct_change)."""
+    returns = np.empty(len(close))
+    returns[:1] = np.nan
+    np.divide(close[1:], close[:-1], out=returns[1:])
+    returns[1:] -= 1
+    return returns
+
+def get_returns(client, symbol, interval, limit):
+    klines = client.futures_klines(symbol=symbol, interval=interval, limit=limit)
+    return returns_of(decoder().decode(klines, ("close",))["close"])
+
+class BtcSeries:
+    """
+    Закрытые close BTCUSDT для корреляции. История засевается на прогреве из kline_cache
+    (engine/warmup.py), на закрытии по REST докачивается только хвост после последней известной
+    свечи — закрытые и текущая. Доходности те же, что get_returns по limit последним свечам.
+    """
+
+    def __init__(self, client, interval, limit):
+        self.client = client
+        self.interval = interval
+        self.interval_ms = INTERVAL_SECONDS[interval] * 1000
+        self.limit = limit
+        self.open_time = np.empty(0, dtype=np.int64)
+        self.close = np.empty(0)
+
+    def seed(self, klines):
+        """Закрытые свечи подряд (массивы KlineCache.get)."""
+        self.open_time = klines["open_time"][-self.limit:].astype(np.int64)
+        self.close = klines["close"][-self.limit:].astype(np.float64)
+
+    def returns(self, closed):
+        """closed — open_time последней закрытой свечи (None — просто limit последних по REST)."""
+        ms = self.interval_ms
+        known = int(self.open_time[-1]) if len(self.open_time) else None
+        if closed is not None and known is not None and closed - self.limit * ms <= known <= closed:
+            # закрытые после известной + текущая; если свечей стало больше (поздний вызов),
+            # ответ до известной не дотянется — тогда как раньше
+            klines = self.client.futures_klines(symbol="BTCUSDT", interval=self.interval,
+                                                limit=(closed - known) // ms + 2)
+            k = decoder().decode(klines, ("open_time", "close"))
+            if len(k["open_time"]) and int(k["open_time"][0]) <= known + ms:
+                return self._extend(k, known, closed)
+        klines = self.client.futures_klines(symbol="BTCUSDT", interval=self.interval, limit=self.limit)
+        k = decoder().decode(klines, ("open_time", "close"))
+        if closed is None:
+            return returns_of(k["close"])
+        self.open_time, self.close = self.open_time[:0], self.close[:0]
+        return self._extend(k, None, closed)
+
+    def _extend(self, k, known, closed):
+        """Дописывает закрытые свечи ответа k после known; доходности — с текущей свечой ответа."""
+        new = 0 if known is None else int(np.searchsorted(k["open_time"], known, "right"))
+        done = int(np.searchsorted(k["open_time"], closed, "right"))  # до closed включительно — закрытые
+        self.open_time = np.concatenate((self.open_time, k["open_time"][new:done]))[-self.limit:]
+        self.close = np.concatenate((self.close, k["close"][new:done]))[-self.limit:]
+        return returns_of(np.concatenate((self.close, k["close"][done:]))[-self.limit:])
+
+def get_volume_24h(client, symbol):
+    ticker_24h = client.futures_ticker(symbol=symbol)
+    return float(ticker_24h["quoteVolume"])
+
+# ================= ЛОКАЛЬНЫЙ СТЕНД =================
+# bench/fakebinance.py: BINANCE_ENDPOINT направляет REST и WebSocket python-binance на локальный сервер,
+# SIM_CLOCK="sim_ms:real_s:speed" — ускоренное время стенда (часовая свеча за десяток секунд)
+
+def use_endpoint():
+    base = os.getenv("BINANCE_ENDPOINT")
+    if not base:
+        return
+    from binance.base_client import BaseClient
+    from binance.ws.streams import BinanceSocketManager
+    BaseClient.API_URL = f"{base}/api"
+    BaseClient.FUTURES_URL = f"{base}/fapi"
+    BinanceSocketManager.STREAM_URL = BinanceSocketManager.FSTREAM_URL = base.replace("http", "ws", 1) + "/"
+    print(f"🧪 Binance: {base}")
+
+def market_clock():
+    """Часы движка: time.time или время стенда из SIM_CLOCK."""
+    sim = os.getenv("SIM_CLOCK")
+    if not sim:
+        return time.time
+    sim_ms, real_s, speed = map(float, sim.split(":"))
+    return lambda: sim_ms / 1000 + (time.time() - real_s) * speed
@@ -0,0 +1,118 @@
+"""
+Метрики процесса бота: счётчики, значения и тайминги с перцентилями.
+
+    from engine.metrics import METRICS
+    METRICS.inc("rest_weight", 5)
+    METRICS.set("warmup_s", 12.3)
+    with METRICS.timer("warmup"):
+        ...
+    print(METRICS.report())
+"""
+import os
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+from threading import Lock
+
+
+class Metrics:
+    def __init__(self, window=1000):
+        self.window = window
+        self.lock = Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.timings = {}  # имя -> последние window значений в секундах
+
+    def inc(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name, value):
+        with self.lock:
+            self.gauges[name] = value
+
+    def observe(self, name, seconds):
+        with self.lock:
+            if name not in self.timings:
+                self.timings[name] = deque(maxlen=self.window)
+            self.timings[name].append(seconds)
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def percentile(self, name, q):
+        with self.lock:
+            values = sorted(self.timings.get(name, ()))
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+    def snapshot(self):
+        with self.lock:
+            names = list(self.timings)
+            snap = {"counters": dict(self.counters), "gauges": dict(self.gauges)}
+        snap["timings_ms"] = {
+            name: {"p50": round(self.percentile(name, 50) * 1000, 3),
+                   "p99": round(self.percentile(name, 99) * 1000, 3),
+                   "n": len(self.timings[name])}
+            for name in names
+        }
+        return snap
+
+    def report(self):
+        snap = self.snapshot()
+        lines = [f"{k}: {v}" for k, v in sorted(snap["gauges"].items())]
+        lines += [f"{k}: {v}" for k, v in sorted(snap["counters"].items())]
+        lines += [f"{k}: p50 {v['p50']}ms, p99 {v['p99']}ms (n={v['n']})" for k, v in sorted(snap["timings_ms"].items())]
+        return "\n".join(lines)
+
+
+def rss_mb(pid="self"):
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        if pid != "self":
+            return 0.0  # процесс уже вышел
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def cpu_seconds(pid="self"):
+    """Процессорное время процесса (user + system) из /proc; 0, если недоступно."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+def sizeof(obj, seen=None):
+    """Приблизительный размер объекта в байтах вместе с содержимым контейнеров и массивов NumPy."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    nbytes = getattr(obj, "nbytes", None)
+    if isinstance(nbytes, int) and hasattr(obj, "dtype"):
+        return sys.getsizeof(obj) + (nbytes if obj.base is None else 0)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(sizeof(k, seen) + sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(sizeof(x, seen) for x in obj)
+    elif hasattr(obj, "__slots__"):
+        size += sum(sizeof(getattr(obj, a), seen) for a in obj.__slots__ if hasattr(obj, a))
+    elif hasattr(obj, "__dict__"):
+        size += sizeof(vars(obj), seen)
+    return size
+
+
+METRICS = Metrics()
@@ -0,0 +1,61 @@
+"""
+Скользящий квантиль quote_volume по символу — база объёма при VOLUME_BASELINE = "quantile".
+
+Окно — VOLUME_LOOKBACK свечей перед последней закрытой (то же, что у avg_vol).
+Для каждого символа держится отсортированный список окна и очередь в порядке прихода:
+новая свеча вставляется бинарным поиском, выпавшая удаляется так же —
+без пересортировки окна на каждую свечу. Квантиль — линейная интерполяция,
+как np.quantile / rolling().quantile().
+"""
+from bisect import bisect_left, insort
+from collections import deque
+
+
+class VolumeQuantiles:
+    def __init__(self, lookback, q=0.5):
+        self.lookback = lookback
+        self.q = q
+        self.order = {}   # symbol -> deque quote_volume окна в порядке свечей
+        self.sorted = {}  # symbol -> те же значения по возрастанию
+        self.last = {}    # symbol -> quote_volume последней свечи (в окно войдёт со следующей)
+
+    def update(self, symbol, rows, appended):
+        """
+        rows — история символа из CandleStore (open_time, o, h, l, c, v).
+        appended=False — история перезагружена или свеча заменена: окно строится заново.
+        """
+        if appended and symbol in self.last:
+            self._push(symbol, self.last[symbol])
+        else:
+            prev = rows[-(self.lookback + 1):-1]
+            window = (prev[:, 4] * prev[:, 5]).tolist()
+            self.order[symbol] = deque(window)
+            self.sorted[symbol] = sorted(window)
+        self.last[symbol] = float(rows[-1, 4] * rows[-1, 5])
+
+    def _push(self, symbol, qv):
+        order, window = self.order[symbol], self.sorted[symbol]
+        order.append(qv)
+        insort(window, qv)
+        if len(order) > self.lookback:
+            del window[bisect_left(window, order.popleft())]
+
+    def baseline(self, symbol):
+        """Квантиль q окна символа или nan, если окно пустое."""
+        window = self.sorted.get(symbol)
+        if not window:
+            return float("nan")
+        pos = self.q * (len(window) - 1)
+        i = int(pos)
+        if i + 1 >= len(window):
+            return window[-1]
+        return window[i] + (window[i + 1] - window[i]) * (pos - i)
+
+    def ratio(self, symbol):
+        """quote_volume последней свечи к квантилю окна (inf при нулевой базе)."""
+        base = self.baseline(symbol)
+        return float("inf") if base == 0 else self.last[symbol] / base
+
+    def drop(self, symbol):
+        for state in (self.order, self.sorted, self.last):
+            state.pop(symbol, None)
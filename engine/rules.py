@@ -0,0 +1,211 @@
+"""
+Правила сигналов как выражения над признаками (engine/features.py) и параметрами конфига.
+
+Каждый бот задаёт DEFAULT_RULES; конфиг может переопределить, добавить или выключить правило:
+
+    "RULES": {
+        "BUY_TREND": "qv_ratio >= VOL_MULT_TREND and bull and body_pct >= MIN_BODY_TREND",
+        "BUY_BREAKOUT": "qv_ratio >= 4 and bars_since_higher_high > 20",
+        "SELL_COUNTER": null
+    }
+
+Имена в ВЕРХНЕМ регистре — параметры конфига, подставляются константами при компиляции
+(так "not USE_HTF_FILTER or htf_bear" при выключенном фильтре исчезает целиком).
+Остальные имена — признаки. Поддерживаются and/or/not, сравнения (в т.ч. цепочки),
++ - * /, abs/min/max и "a if cond else b". Выражения компилируются один раз при старте
+в векторные NumPy-предикаты и считаются сразу для всех символов, закрывшихся на свече,
+над столбцами признаков FeatureBatch (engine/features.py).
+"""
+import ast
+import operator
+
+import numpy as np
+
+from engine.features import resolve_feature
+
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+_CMP_OPS = {
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+}
+_FUNCS = {"abs": (abs, np.abs), "min": (min, np.minimum), "max": (max, np.maximum)}
+
+_NAMESPACE = {
+    "__builtins__": {},
+    "_and": lambda *xs: np.logical_and.reduce(xs),
+    "_or": lambda *xs: np.logical_or.reduce(xs),
+    "_not": np.logical_not,
+    "_where": np.where,
+    "abs": np.abs,
+    "min": np.minimum,
+    "max": np.maximum,
+}
+
+
+class _Const:
+    def __init__(self, value):
+        self.value = value
+
+
+def _call(name, args):
+    return ast.Call(func=ast.Name(id=name, ctx=ast.Load()), args=args, keywords=[])
+
+
+def _node(x):
+    return ast.Constant(value=x.value) if isinstance(x, _Const) else x
+
+
+class _Compiler:
+    def __init__(self, rule, params):
+        self.rule = rule
+        self.params = params
+        self.features = set()
+
+    def error(self, node, text):
+        return ValueError(f"Правило {self.rule}: {text} ({ast.unparse(node)})")
+
+    def visit(self, node):
+        if isinstance(node, ast.Constant):
+            return _Const(node.value)
+
+        if isinstance(node, ast.Name):
+            if node.id in self.params:
+                return _Const(self.params[node.id])
+            if resolve_feature(node.id):
+                self.features.add(node.id)
+                return ast.Name(id=node.id, ctx=ast.Load())
+            raise self.error(node, f"неизвестное имя {node.id}")
+
+        if isinstance(node, ast.BoolOp):
+            is_and = isinstance(node.op, ast.And)
+            parts = []
+            for value in node.values:
+                part = self.visit(value)
+                if isinstance(part, _Const):
+                    if bool(part.value) != is_and:
+                        return _Const(not is_and)  # and с False / or с True
+                    continue
+                parts.append(part)
+            if not parts:
+                return _Const(is_and)
+            if len(parts) == 1:
+                return parts[0]
+            return _call("_and" if is_and else "_or", parts)
+
+        if isinstance(node, ast.UnaryOp):
+            operand = self.visit(node.operand)
+            if isinstance(node.op, ast.Not):
+                return _Const(not operand.value) if isinstance(operand, _Const) else _call("_not", [operand])
+            if isinstance(node.op, ast.USub):
+                return _Const(-operand.value) if isinstance(operand, _Const) else ast.UnaryOp(op=ast.USub(), operand=operand)
+            raise self.error(node, "неподдерживаемый унарный оператор")
+
+        if isinstance(node, ast.BinOp):
+            if type(node.op) not in _BIN_OPS:
+                raise self.error(node, "неподдерживаемый оператор")
+            left, right = self.visit(node.left), self.visit(node.right)
+            if isinstance(left, _Const) and isinstance(right, _Const):
+                return _Const(_BIN_OPS[type(node.op)](left.value, right.value))
+            return ast.BinOp(left=_node(left), op=node.op, right=_node(right))
+
+        if isinstance(node, ast.Compare):
+            terms = [self.visit(node.left)] + [self.visit(c) for c in node.comparators]
+            parts = []
+            for op, left, right in zip(node.ops, terms, terms[1:]):
+                if type(op) not in _CMP_OPS:
+                    raise self.error(node, "неподдерживаемое сравнение")
+                if isinstance(left, _Const) and isinstance(right, _Const):
+                    if not _CMP_OPS[type(op)](left.value, right.value):
+                        return _Const(False)
+                    continue
+                parts.append(ast.Compare(left=_node(left), ops=[op], comparators=[_node(right)]))
+            if not parts:
+                return _Const(True)
+            return parts[0] if len(parts) == 1 else _call("_and", parts)
+
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in _FUNCS or node.keywords:
+                raise self.error(node, "допустимы только abs, min, max")
+            args = [self.visit(a) for a in node.args]
+            if all(isinstance(a, _Const) for a in args):
+                return _Const(_FUNCS[node.func.id][0](*(a.value for a in args)))
+            return _call(node.func.id, [_node(a) for a in args])
+
+        if isinstance(node, ast.IfExp):
+            test = self.visit(node.test)
+            if isinstance(test, _Const):
+                return self.visit(node.body if test.value else node.orelse)
+            return _call("_where", [test, _node(self.visit(node.body)), _node(self.visit(node.orelse))])
+
+        raise self.error(node, "неподдерживаемая конструкция")
+
+
+class CompiledRule:
+    def __init__(self, name, source, params):
+        self.name = name
+        self.source = source
+        compiler = _Compiler(name, params)
+        try:
+            tree = ast.parse(source, mode="eval")
+        except SyntaxError as e:
+            raise ValueError(f"Правило {name}: синтаксическая ошибка: {e}")
+        result = compiler.visit(tree.body)
+        self.features = compiler.features
+        if isinstance(result, _Const):
+            self.constant = bool(result.value)
+            self.code = None
+        else:
+            self.constant = None
+            expr = ast.fix_missing_locations(ast.Expression(body=result))
+            self.code = compile(expr, f"<rule {name}>", "eval")
+
+    def evaluate(self, table, n):
+        if self.code is None:
+            return np.full(n, self.constant)
+        mask = np.asarray(eval(self.code, _NAMESPACE, table), dtype=bool)
+        return np.broadcast_to(mask, (n,))
+
+
+def merge_rules(defaults, overrides):
+    """DEFAULT_RULES бота + RULES из конфига (null выключает правило). Порядок сохраняется."""
+    rules = dict(defaults)
+    for name, source in (overrides or {}).items():
+        if source is None:
+            rules.pop(name, None)
+        else:
+            rules[name] = source
+    return rules
+
+
+def rule_params(config, p):
+    """Параметры, доступные правилам: ВЕРХНИЕ ключи конфига и разобранные настройки бота."""
+    params = {k: v for k, v in config.items() if k.isupper()}
+    params.update({k: v for k, v in vars(p).items() if k.isupper()})
+    return params
+
+
+class RuleSet:
+    def __init__(self, rules, params):
+        self.rules = [CompiledRule(name, source, params) for name, source in rules.items()]
+        self.features = sorted(set().union(*(r.features for r in self.rules))) if self.rules else []
+
+    def evaluate(self, batch):
+        """
+        batch — FeatureBatch пачки: правила читают из него только свои столбцы.
+        Возвращает [(номер строки, сработавшие правила)] для строк, где сработало хоть одно.
+        """
+        if not self.rules:
+            return []
+        table = {name: batch[name] for name in self.features}
+        hits = np.column_stack([r.evaluate(table, batch.n) for r in self.rules])
+        names = [r.name for r in self.rules]
+        return [(i, [names[j] for j in np.flatnonzero(hits[i])]) for i in np.flatnonzero(hits.any(axis=1))]
@@ -0,0 +1,849 @@
+import json
+import math
+import os
+import signal
+import time
+from collections import deque
+from datetime import datetime
+from queue import Empty
+from threading import Event, Lock, Thread
+
+import numpy as np
+
+from engine.aggregate import Aggregator
+from engine.breadth import Breadth, rank
+from engine.commands import CommandPoller, engine_handlers
+from engine.config import INTERVAL_SECONDS, load_config, load_params, parse_args
+from engine.counters import BarCounters
+from engine.features import FeatureBatch, FeatureContext, resolve_feature, window_sizes
+from engine.indicators import ema_last
+from engine.journal import EXCEL_STRAT_START_COL, ExcelJournal, Telegram, column_index, get_column_letter
+from engine.klinecache import KlineCache
+from engine.lanes import JOURNAL, NOTIFY, LaneScheduler
+from engine.market import (HTF_BARS, TICKER_24H_WEIGHT, BtcSeries, RestBudget, get_closed_kline,
+                           get_htf_emas, get_returns, get_tickers_24h, get_volume_24h, kline_weight,
+                           market_clock, use_endpoint)
+from engine import snapshot
+from engine.rules import RuleSet, merge_rules, rule_params
+from engine.metrics import METRICS, rss_mb, sizeof
+from engine.store import CandleStore, history_size
+from engine.quantile import VolumeQuantiles
+from engine.seasonal import DAY_MS, SeasonalBaseline
+from engine.swing import SwingTracker
+from engine.taskqueue import BarQueue
+from engine.tickers import TickerTable
+from engine.trades import TradeBook
+from engine.warmup import warm_up
+from engine.windows import VolumeWindows, window_columns
+
+
+BREADTH_LINES = 10  # символов в сводке массового движения
+
+
+class Engine:
+    """
+    Общий рантайм ботов: данные, индикаторы, сделки, Excel/Telegram и цикл WebSocket.
+    Модуль бота (engine/bots/*) задаёт только интервал, STRATEGIES, листы Excel,
+    DEFAULT_RULES (выражения сигналов) и enrich() для своих полей результата.
+    client, journal и notifier можно подменить (бенчмарк, тесты, воркер шарда).
+    state_name — суффикс файлов состояния, если один конфиг запущен несколькими процессами.
+    """
+
+    def __init__(self, bot, config, client=None, journal=None, notifier=None, state_name=None):
+        self.bot = bot
+        self.config = config
+        self.p = bot.load_params(config, load_params(config))
+        self.name = self.p.NAME
+        self.interval = bot.INTERVAL
+        self.state_name = state_name or self.name
+
+        if client is None:
+            # python-binance (aiohttp, dateparser) тянет полсекунды импорта — только когда нужен живой клиент
+            from binance.client import Client
+            client = Client()
+        self.client = client
+        self.trades = TradeBook(self.state_name, bot.STRATEGIES)
+        self.journal = journal or make_journal(bot, self.name, self.p.VOLUME_WINDOWS)
+        self.notifier = notifier or make_notifier()
+        self.rules = RuleSet(merge_rules(bot.DEFAULT_RULES, config.get("RULES")), rule_params(config, self.p))
+        if any(not isinstance(w, int) or w < 2 for w in self.p.VOLUME_WINDOWS):
+            raise ValueError(f"VOLUME_WINDOWS: окна — целые от 2 свечей, получено {self.p.VOLUME_WINDOWS!r}")
+        # окна VOLUME_WINDOWS пишутся в строку сделки, окна из правил только считаются
+        self.window_keys = [key for _, key in window_columns(self.p.VOLUME_WINDOWS)]
+        for key in self.window_keys:
+            resolve_feature(key)
+        windows = set(self.p.VOLUME_WINDOWS) | window_sizes(self.rules.features)
+        self.volume_windows = VolumeWindows(windows) if windows else None
+        self.store = CandleStore(self.client, self.interval, history_size(self.p, self.interval, windows))
+        self.swings = SwingTracker(self.store.size)
+        if self.p.VOLUME_BASELINE not in ("mean", "quantile", "seasonal"):
+            raise ValueError(f"VOLUME_BASELINE: неизвестная база объёма {self.p.VOLUME_BASELINE!r}")
+        self.volume_quantiles = None
+        if self.p.VOLUME_BASELINE == "quantile":
+            self.volume_quantiles = VolumeQuantiles(self.p.VOLUME_LOOKBACK, self.p.VOLUME_QUANTILE)
+
+        self.uses_htf = any(f in self.rules.features for f in ("htf_bull", "htf_bear"))
+        # сезонная таблица объёма — только если она кому-то нужна: история за SEASONAL_DAYS стоит REST
+        self.seasonal = None
+        self.seasonal_path = f"seasonal_{self.state_name}.npz"
+        if self.p.VOLUME_BASELINE == "seasonal" or any(
+                f in self.rules.features for f in ("seasonal_vol", "seasonal_ratio")):
+            self.seasonal = SeasonalBaseline(self.interval, self.p.SEASONAL_DAYS)
+            self.seasonal.load(self.seasonal_path)
+        self.htf = {}        # symbol -> (час, (ema_fast, ema_slow)) на последней закрытой 1ч свече
+        self.btc = BtcSeries(self.client, self.interval, self.p.BTC_LOOKBACK)  # засевается на прогреве
+        self.btc_bar = None  # (open_time свечи, доходности BTC) — одна загрузка на закрытие
+        self.budget = RestBudget(self.p.REST_WEIGHT_BUDGET)
+        self.clock = market_clock()
+
+        # сокеты на BASE_INTERVAL, свечи бота и 1ч для HTF собираются из него в памяти
+        self.stream_interval = self.p.BASE_INTERVAL or self.interval
+        self.aggregator = None
+        self.htf_store = None  # 1ч история из потока вместо REST раз в час на символ
+        self.closed = []       # свечи интервала бота, собранные из текущей базовой
+        if self.stream_interval != self.interval:
+            self.aggregator = Aggregator(self.stream_interval, backfill=self.backfill_bar)
+            self.aggregator.subscribe(self.interval, self.closed.append)
+            if self.uses_htf:
+                self.htf_store = CandleStore(self.client, "1h", HTF_BARS)
+                self.aggregator.subscribe("1h", self.htf_store.update)
+
+        self.tickers = TickerTable()  # 24h объёмы из !miniTicker@arr
+        self.symbols = []
+        self.universe = None  # вызываемое -> список символов вместо ликвидности (воркер шарда)
+        self.resubscribe = Event()  # вселенная изменилась — сокеты перезапускаются
+        self.evicted = set()  # ушли из вселенной — состояние чистит воркер
+        self.commands = deque()  # (fn, args) из других потоков — воркер свечей применяет между пачками
+        # кулдаун и спайки считаются в свечах и переживают перезапуск
+        self.counters = BarCounters(INTERVAL_SECONDS[self.interval] * 1000, self.trades.bar_marks)
+        if self.p.STALE_SIGNALS not in ("skip", "flag"):
+            raise ValueError(f"STALE_SIGNALS: ожидается \"skip\" или \"flag\", получено {self.p.STALE_SIGNALS!r}")
+        self.task_queue = BarQueue(self.p.QUEUE_MAX)
+        self.breadth = Breadth(self.p.BREADTH_MODE, self.p.BREADTH_THRESHOLD,
+                               self.p.BREADTH_MIN_SYMBOLS, self.p.BREADTH_WAIT_SECONDS)
+        self.batch_lock = Lock()  # снимок состояния не берётся посреди пачки
+        self.snapshot_path = f"snapshot_{self.state_name}.npz"
+        self.snapshot_at = time.monotonic()
+        # Telegram и Excel не конкурируют с TP/SL и сигналами за окно закрытия свечи
+        self.lanes = LaneScheduler(lambda: self.task_queue.qsize())
+        self.current = None  # свеча, которая сейчас обрабатывается
+        self.feed = None     # HOST:PORT хаба потока рынка (engine/feed.py) вместо своих сокетов
+
+    def bar_time(self):
+        """open_time свечи текущей работы: у отложенной задачи — свечи, на которой она поставлена."""
+        t = getattr(self.lanes.local, "bar", None)
+        if t is None and self.current:
+            t = self.current["t"]
+        return t
+
+    def send_telegram(self, message):
+        self.notifier.send(message)
+
+    # ================= SYMBOLS =================
+    def refresh_symbols(self):
+        if self.universe is not None:
+            symbols = list(self.universe())
+        else:
+            # REST ticker/24hr — только на старте и если поток тикеров замолчал
+            if not self.tickers.fresh():
+                self.budget.acquire(TICKER_24H_WEIGHT)
+                self.tickers.seed(get_tickers_24h(self.client))
+            symbols = self.tickers.liquid(self.p.MIN_24H_VOLUME)
+        self.evicted |= set(self.symbols) - set(symbols)
+        if self.symbols and set(symbols) != set(self.symbols):
+            self.resubscribe.set()
+        self.symbols = symbols
+        return self.symbols
+
+    def call_in_worker(self, fn, *args):
+        """fn(*args) в потоке воркера свечей перед следующей пачкой (раскладка шарда, приём сделок)."""
+        self.commands.append((fn, args))
+        self.task_queue.put({"e": "command"})  # будит воркер, даже если свечей нет
+
+    def evict(self):
+        """Чистит состояние символов, ушедших из вселенной (вызывается из воркера)."""
+        evicted, self.evicted = self.evicted, set()
+        for symbol in evicted:
+            if symbol in self.symbols:
+                continue
+            self.store.drop(symbol)
+            self.swings.drop(symbol)
+            if self.volume_quantiles is not None:
+                self.volume_quantiles.drop(symbol)
+            if self.volume_windows is not None:
+                self.volume_windows.drop(symbol)
+            self.htf.pop(symbol, None)
+            self.counters.marks.pop(symbol, None)
+            if self.aggregator is not None:
+                self.aggregator.drop(symbol)
+            if self.htf_store is not None:
+                self.htf_store.drop(symbol)
+
+    def memory_report(self):
+        """Память по компонентам, MB. RSS — весь процесс."""
+        mb = 1024 * 1024
+        report = {
+            "candles": self.store.nbytes() / mb,
+            "swings": sizeof(self.swings) / mb,
+            "trades": sizeof(self.trades.table) / mb,
+            "counters": sizeof(self.counters.marks) / mb,
+            "htf": (sizeof(self.htf) + (self.htf_store.nbytes() if self.htf_store else 0)) / mb,
+            "aggregator": sizeof(self.aggregator.buckets) / mb if self.aggregator else 0.0,
+            "queue": self.task_queue.qsize(),
+            "rss": rss_mb(),
+        }
+        for name, value in report.items():
+            METRICS.set(f"mem_{name}" if name != "queue" else "queue_size", round(value, 2))
+        return report
+
+    def update_symbols_periodically(self):
+        while True:
+            time.sleep(3600)
+            try:
+                self.refresh_symbols()
+                print(f"♻️ Обновление токенов: {len(self.symbols)}")
+                m = self.memory_report()
+                print(f"📦 Память: RSS {m['rss']:.1f}MB, свечи {m['candles']:.1f}MB ({len(self.store.candles)} токенов), "
+                      f"свинги {m['swings']:.2f}MB, сделки {m['trades']:.2f}MB, кулдауны {m['counters']:.2f}MB, "
+                      f"HTF {m['htf']:.2f}MB, очередь {m['queue']}")
+                print(f"⏱ Закрытие свечи (критическая полоса): p50 {METRICS.percentile('bar_critical', 50):.3f}s, "
+                      f"p99 {METRICS.percentile('bar_critical', 99):.3f}s")
+                shed = {k: METRICS.counters.get(k, 0) for k in
+                        ("queue_shed", "queue_overflow", "stale_bars", "stale_signals")}
+                if any(shed.values()):
+                    print("🧹 Перегрузка с запуска: " + ", ".join(f"{k} {v}" for k, v in shed.items()))
+                mass = {k: METRICS.counters.get(k, 0) for k in
+                        ("breadth_bars", "breadth_suppressed", "breadth_summarized")}
+                if any(mass.values()):
+                    print("🌊 Массовые свечи с запуска: " + ", ".join(f"{k} {v}" for k, v in mass.items()))
+            except Exception as e:
+                print(f"Ошибка обновления токенов: {e}")
+
+    def build_seasonal(self):
+        """
+        Сезонная таблица для символов без неё и дней, пропущенных, пока бот лежал:
+        история из kline_cache (отдельная папка — прогрев не читает лишние сутки). Раз в час.
+        """
+        cache = KlineCache(self.client, self.interval, os.path.join(self.p.KLINE_CACHE, "seasonal"),
+                           budget=self.budget, clock=self.clock)
+        while True:
+            today = int(self.clock() * 1000) // DAY_MS
+            days = 0
+            for symbol in list(self.symbols):
+                first = self.seasonal.missing(symbol, today)
+                if first is None:
+                    continue
+                try:
+                    klines = cache.get(symbol, first * DAY_MS, today * DAY_MS - self.store.interval_ms)
+                    days += self.seasonal.fold_history(symbol, klines)
+                except Exception as e:
+                    print(f"Ошибка сезонной базы {symbol}: {e}")
+            cache.memory.clear()
+            if self.seasonal.dirty:
+                self.lanes.submit(JOURNAL, self.seasonal.save, self.seasonal_path)
+            if days:
+                print(f"📅 Сезонная база объёма: влито {days} суток, токенов {len(self.seasonal.index)}")
+            time.sleep(3600)
+
+    def dump_metrics(self, path):
+        """METRICS в JSON раз в 5 секунд (METRICS_FILE): нагрузочный стенд, внешний мониторинг."""
+        while True:
+            time.sleep(5)
+            try:
+                METRICS.set("mem_rss", round(rss_mb(), 2))
+                METRICS.set("queue_size", self.task_queue.qsize())
+                tmp = path + ".tmp"
+                with open(tmp, "w") as f:
+                    json.dump(METRICS.snapshot(), f)
+                os.replace(tmp, path)
+            except Exception as e:
+                print(f"Ошибка записи метрик: {e}")
+
+    # ================= SIGNALS =================
+    def htf_emas(self, symbol, hour):
+        """EMA старшего ТФ из кэша; загружается раз в час на символ. None при ошибке."""
+        cached = self.htf.get(symbol)
+        if cached and cached[0] == hour:
+            return cached[1]
+        try:
+            if self.htf_store is None:
+                emas = get_htf_emas(self.client, symbol, self.p.EMA_FAST, self.p.EMA_SLOW)
+            else:
+                emas = self.htf_from_store(symbol, hour)
+                if emas is None:
+                    self.htf_store.seed(symbol, hour * 3_600_000)
+                    emas = self.htf_from_store(symbol, hour)
+        except Exception as e:
+            print(f"Ошибка HTF фильтра {symbol}: {e}")
+            return None
+        self.htf[symbol] = (hour, emas)
+        return emas
+
+    def htf_from_store(self, symbol, hour):
+        """EMA по 1ч свечам из потока, если последняя закрытая — та, что нужна часу hour."""
+        if symbol not in self.htf_store.candles:
+            return None
+        rows = self.htf_store.rows(symbol)
+        if len(rows) < HTF_BARS or int(rows[-1, 0]) != (hour - 1) * 3_600_000:
+            return None
+        close = rows[:, 4]
+        return ema_last(close, self.p.EMA_FAST), ema_last(close, self.p.EMA_SLOW)
+
+    def volume_24h(self, symbol):
+        volume = self.tickers.get(symbol)
+        if volume is None:
+            volume = get_volume_24h(self.client, symbol)
+        return volume
+
+    def backfill_bar(self, symbol, interval, open_time):
+        """Свеча старшего ТФ из REST, когда базовых свечей в корзине не хватило."""
+        try:
+            self.budget.acquire(kline_weight(1))
+            return get_closed_kline(self.client, symbol, interval, open_time)
+        except Exception as e:
+            print(f"Ошибка догрузки свечи {symbol} {interval}: {e}")
+            return None
+
+    def btc_returns(self):
+        # все сигналы одного закрытия считают корреляцию по одной загрузке BTC
+        t = self.bar_time()
+        if self.btc_bar is not None and self.btc_bar[0] == t and t is not None:
+            return self.btc_bar[1]
+        try:
+            returns = self.btc.returns(t)
+        except Exception as e:
+            print(f"Ошибка загрузки BTC свечей: {e}")
+            return None
+        self.btc_bar = (t, returns)
+        return returns
+
+    def correlation(self, symbol):
+        try:
+            btc_returns = self.btc_returns()
+            if btc_returns is None:
+                return "N/A"
+            symbol_returns = get_returns(self.client, symbol, self.interval, self.p.BTC_LOOKBACK)
+            btc_subset = btc_returns[-len(symbol_returns):]
+            valid = ~(np.isnan(btc_subset) | np.isnan(symbol_returns))
+            if valid.sum() < 2:
+                return "N/A"
+            with np.errstate(divide="ignore", invalid="ignore"):
+                corr = np.corrcoef(btc_subset[valid], symbol_returns[valid])[0, 1]
+            return round(float(corr), 2) if self.bot.CORR_AS_NUMBER else f"{corr:.2f}"
+        except Exception as e:
+            print(f"Ошибка корреляции {symbol}: {e}")
+            return "N/A"
+
+    def format_message(self, res, vol24, corr_text):
+        msg_text = (
+            f"🤖 {self.name}\n"
+            f"🔥 {res['symbol']}\n"
+            f"Тип: {', '.join(res['signals'])}\n"
+            f"Close: {res['close']:.6f}\n"
+            f"EMA20: {res['ema20']:.6f}\n"
+            f"EMA200: {res['ema200']:.6f}\n"
+            f"VWAP: {res['vwap']:.6f}\n"
+            f"VOL {res['volText']}\n"
+            f"Prev volume higher: {res['prevVolCount']}/{self.p.PREV_VOL_WINDOW}\n"
+            f"VOL 24h: {vol24:.1f}M USDT\n"
+            f"Corr BTC: {corr_text}\n"
+            f"NATR: {res['natr']}%\n"
+        )
+        for title, key in self.bot.EXTRA_COLUMNS.values():
+            msg_text += f"{title}: {res[key]}\n"
+        if res.get("stale"):
+            msg_text += f"⏳ Устаревший: свеча закрылась {res['stale']}s назад\n"
+        return msg_text
+
+    def on_closed_bar(self, candle):
+        """
+        Первая фаза: TP/SL, история, счётчики спайков/сигналов.
+        Возвращает FeatureContext символа для проверки правил пачкой (scan) или None.
+        """
+        symbol = candle['s']
+        self.current = candle
+        price_high = float(candle["h"])
+        price_low  = float(candle["l"])
+
+        # ===== Закрытие открытых стратегий =====
+        # send_telegram по тейкам и стопам отключён для закрытий
+        for event in self.trades.resolve(symbol, price_high, price_low):
+            self.lanes.submit(JOURNAL, self.journal.update_status, *event, bar=candle["t"])
+
+        # история пополняется на каждой свече, даже в кулдауне
+        appended = self.store.update(candle)
+        self.swings.update(symbol, self.store.rows(symbol), appended)
+        if self.volume_quantiles is not None:
+            self.volume_quantiles.update(symbol, self.store.rows(symbol), appended)
+        if self.volume_windows is not None:
+            self.volume_windows.update(symbol, self.store.rows(symbol), appended)
+        if self.seasonal is not None:
+            self.seasonal.update(symbol, self.store.rows(symbol))
+        spike = self.volume_ratio(symbol) >= self.p.SPIKE_MULT
+        move = int(np.sign(float(candle["c"]) - float(candle["o"]))) if spike else 0
+        self.breadth.record(candle["t"], move)
+
+        # воркер отстал: TP/SL и история выше — как обычно, сигнал по старой свече не ищется или помечается
+        age = self.clock() - (candle["t"] + self.store.interval_ms) / 1000
+        stale = bool(self.p.STALE_BAR_SECONDS) and age > self.p.STALE_BAR_SECONDS
+        if stale:
+            METRICS.inc("stale_bars")
+        # корзина старшего ТФ без части базовых свечей и без REST (engine/aggregate.py): объём занижен
+        partial = bool(candle.get("partial"))
+        if partial:
+            METRICS.inc("partial_bars")
+
+        # Cooldown: COOLDOWN_BARS свечей после сигнала символ не проверяется
+        ctx = None
+        if stale and self.p.STALE_SIGNALS == "skip" or partial:
+            pass
+        elif self.counters.bars_since(symbol, "signal", candle["t"]) >= self.p.COOLDOWN_BARS:
+            ctx = FeatureContext(self, symbol, self.store.rows(symbol), candle)
+            ctx.age = age if stale else None
+            ctx.move = move
+
+        # спайк текущей свечи отмечается после FeatureContext: bars_since_spike — о предыдущих свечах
+        if spike:
+            self.counters.mark(symbol, "spike", candle["t"])
+            self.trades.dirty = True
+        return ctx
+
+    def volume_ratio(self, symbol):
+        """quote_volume последней свечи к базе объёма (VOLUME_BASELINE), как признак qv_ratio."""
+        if self.volume_quantiles is not None:
+            return self.volume_quantiles.ratio(symbol)
+        if self.p.VOLUME_BASELINE == "seasonal":
+            last = self.store.rows(symbol)[-1]
+            ratio = self.seasonal.ratio(symbol, int(last[0]), float(last[4] * last[5]))
+            if not math.isnan(ratio):
+                return ratio
+        return self.store.quote_volume_ratio(symbol, self.p.VOLUME_LOOKBACK)
+
+    def build_result(self, ctx, signals):
+        res = {
+            "symbol":    ctx.symbol,
+            "signals":   signals,
+            "close":     ctx["close"],
+            "ema20":     ctx["ema20"],
+            "ema200":    ctx["ema200"],
+            "vwap":      ctx["vwap"],
+            "natr":      round(ctx["natr"], 3),
+            "volText":   f"x{ctx['qv_ratio']:.2f}",
+            "prevVolCount": ctx["prev_vol_count"],
+        }
+        for key in self.window_keys:
+            value = ctx[key]
+            res[key] = round(value, 3) if math.isfinite(value) else None  # nan/inf в Excel — пустая ячейка
+        if ctx.age is not None:
+            METRICS.inc("stale_signals")
+            res["stale"] = round(ctx.age)
+        return self.bot.enrich(ctx, signals, res)
+
+    def open_signal(self, ctx, signals):
+        """Открытие сделки по сигналу: {"res", "trade_id", "strategies"} для Telegram и Excel."""
+        symbol = ctx.symbol
+        self.current = ctx.candle
+        self.counters.mark(symbol, "signal", ctx.candle["t"])  # сохранится вместе с trade_id
+
+        res = self.build_result(ctx, signals)
+        side = "BUY" if any("BUY" in s for s in res["signals"]) else "SELL"
+        trade_id, strategies = self.trades.open_trade(symbol, side, res["close"], ", ".join(res["signals"]))
+        # Дата/Время строки Excel — закрытие сигнальной свечи, а не момент отложенной записи
+        # (по ним engine/simulator.py выбирает бар входа); местное время, как было у datetime.now()
+        opened = datetime.fromtimestamp((ctx.candle["t"] + self.store.interval_ms) / 1000)
+        return {"res": res, "trade_id": trade_id, "strategies": strategies, "time": opened}
+
+    def emit(self, ctx, signals):
+        """Вторая фаза: открытие сделки; Telegram и Excel уходят в отложенные полосы."""
+        signal = self.open_signal(ctx, signals)
+        # задача JOURNAL встанет за NOTIFY этого сигнала и получит от неё vol24 и корреляцию
+        self.lanes.submit(NOTIFY, self.notify_signal, signal, bar=ctx.candle["t"])
+        self.lanes.submit(JOURNAL, self.journal_signal, signal, bar=ctx.candle["t"])
+
+    def notify_signal(self, signal):
+        res = signal["res"]
+        signal["vol24"] = self.volume_24h(res["symbol"]) / 1_000_000
+
+        # ===== Корреляция BTC =====
+        signal["corr_text"] = self.correlation(res["symbol"])
+
+        # ===== Telegram =====
+        msg_text = self.format_message(res, signal["vol24"], signal["corr_text"])
+        print(msg_text)
+        self.send_telegram(msg_text)
+
+    def journal_signal(self, signal):
+        self.journal.write_trade(*self.trade_row(signal))
+
+    def trade_row(self, signal):
+        """Аргументы ExcelJournal.write_trade для сигнала."""
+        res = signal["res"]
+        trade_info = {
+            "symbol":      res["symbol"],
+            "signals":     res["signals"],
+            "strategies":  signal["strategies"],
+            "entry_price": res["close"],
+            "natr":        res["natr"],
+            "time":        signal["time"],
+        }
+        for _, key in self.bot.EXTRA_COLUMNS.values():
+            trade_info[key] = res[key]
+        for key in self.window_keys:
+            trade_info[key] = res[key]
+        return (signal["trade_id"], trade_info, res["volText"],
+                signal.get("vol24"), signal.get("corr_text", "N/A"))
+
+    def scan(self, rows):
+        """
+        Признаки и правила — разом для всех символов пачки (FeatureBatch); в FeatureContext
+        переносятся только строки сработавших правил.
+        """
+        if not rows:
+            return
+        batch = FeatureBatch(self, rows)
+        for i, signals in self.rules.evaluate(batch):
+            ctx = rows[i]
+            ctx.values.update(batch.row(i))
+            if self.breadth.holds:
+                self.breadth.hold(ctx, signals)  # до сборки закрытия: свеча может оказаться массовой
+                continue
+            try:
+                self.emit(ctx, signals)
+            except Exception as e:
+                print(f"Ошибка process_signal: {e}")
+
+    # ================= BREADTH =================
+    def release_breadth(self, before=None):
+        """
+        Собранные закрытия: ширина рынка в METRICS, отложенные сигналы — по BREADTH_MODE.
+        before — open_time свечи, которая сейчас будет обработана: всё, что раньше неё, собрано.
+        """
+        for t, bar in self.breadth.due(len(self.symbols), before):
+            n, up, down, mass = self.breadth.measure(bar)
+            METRICS.set("breadth_up", round(up, 3))
+            METRICS.set("breadth_down", round(down, 3))
+            if mass:
+                METRICS.inc("breadth_bars")
+            crowd = []
+            for ctx, signals in bar.held:
+                if mass and ctx.move == mass:
+                    crowd.append((ctx, signals))
+                    continue
+                try:
+                    self.emit(ctx, signals)
+                except Exception as e:
+                    print(f"Ошибка process_signal: {e}")
+            if crowd:
+                try:
+                    self.mass_signals(t, crowd, n, up if mass > 0 else down, mass)
+                except Exception as e:
+                    print(f"Ошибка массового движения: {e}")
+
+    def mass_signals(self, t, crowd, n, share, mass):
+        """Сигналы символов массового движения: вместо сообщения на каждый — сводка."""
+        mode = self.p.BREADTH_MODE
+        crowd = rank(crowd)
+        keep = crowd if mode == "summarize" else crowd[:self.p.BREADTH_TOP] if mode == "rank" else []
+        for ctx, _ in crowd[len(keep):]:
+            # кулдаун как после сигнала: продолжение движения на следующей свече не проходит поодиночке
+            self.counters.mark(ctx.symbol, "signal", t)
+        METRICS.inc("breadth_suppressed", len(crowd) - len(keep))
+
+        opened = {}
+        for ctx, signals in keep:
+            if mode == "summarize":
+                opened[ctx.symbol] = self.open_signal(ctx, signals)
+            else:
+                self.emit(ctx, signals)
+        if mode == "summarize":
+            METRICS.inc("breadth_summarized", len(opened))
+            self.lanes.submit(JOURNAL, self.journal_signals, list(opened.values()), bar=t)
+
+        arrow = "▲ рост" if mass > 0 else "▼ падение"
+        action = {"suppress": "сделки не открыты",
+                  "rank": f"открыто {len(keep)} сильнейших по объёму",
+                  "summarize": f"открыто {len(keep)}, без отдельных сообщений"}[mode]
+        lines = [f"🤖 {self.name}",
+                 f"🌊 Массовое движение, {arrow}: {share:.0%} вселенной ({round(share * n)}/{n}) со спайком",
+                 f"Сигналов в движении: {len(crowd)}, {action}"]
+        for i, (ctx, signals) in enumerate(crowd[:BREADTH_LINES]):
+            mark = "✅" if i < len(keep) else "⛔"
+            lines.append(f"{mark} {ctx.symbol} x{ctx['qv_ratio']:.2f} {', '.join(signals)}")
+        if len(crowd) > BREADTH_LINES:
+            lines.append(f"... и ещё {len(crowd) - BREADTH_LINES}")
+        self.lanes.submit(NOTIFY, self.notify_mass, "\n".join(lines) + "\n", list(opened.values()), bar=t)
+
+    def notify_mass(self, msg_text, signals):
+        # объём 24h для Excel — из таблицы тикеров; корреляцию BTC в сводке не считаем: REST на символ
+        for signal in signals:
+            signal["vol24"] = self.volume_24h(signal["res"]["symbol"]) / 1_000_000
+        print(msg_text)
+        self.send_telegram(msg_text)
+
+    def journal_signals(self, signals):
+        if signals:
+            self.journal.write_trades([self.trade_row(signal) for signal in signals])
+
+    def process_batch(self, msgs):
+        """
+        Обрабатывает пачку сообщений из очереди. Если символ встречается в пачке
+        повторно (воркер отстал), накопленное сканируется раньше, чтобы порядок
+        свечей и кулдаун символа не нарушались.
+        """
+        while self.commands:
+            fn, args = self.commands.popleft()
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"Ошибка команды воркера {getattr(fn, '__name__', fn)}: {e}")
+        if self.evicted:
+            self.evict()
+        rows, seen, bars, closed_bars = [], set(), set(), 0
+        for msg in msgs:
+            try:
+                if msg.get("e") == "error":
+                    print(f"🔴 WebSocket ошибка: {msg}")
+                    self.lanes.submit(NOTIFY, self.send_telegram,
+                                      f"🔴 {self.name} WebSocket ошибка: {msg.get('m', 'неизвестно')}")
+                    continue
+
+                if 'data' not in msg or 'k' not in msg['data']:
+                    continue
+                candle = msg['data']['k']
+                symbol = candle['s']
+                if candle['x']:
+                    bars.add(candle['t'])
+                if symbol not in self.symbols or not candle['x']:
+                    continue
+                closed_bars += 1
+                if "mh" in candle:
+                    # очередь слила свечи символа при перегрузке (engine/taskqueue.py):
+                    # TP/SL — по их общему диапазону, история перезагрузится из REST
+                    for event in self.trades.resolve(symbol, candle["mh"], candle["ml"]):
+                        self.lanes.submit(JOURNAL, self.journal.update_status, *event, bar=candle["t"])
+
+                if self.aggregator is not None:
+                    self.aggregator.update(candle)
+                    closed = self.closed[:]
+                    self.closed.clear()
+                else:
+                    closed = [candle]
+
+                for candle in closed:
+                    # отложенные сигналы прошлого закрытия открываются до TP/SL следующей свечи
+                    held = self.breadth.holds and any(t < candle["t"] for t in self.breadth.bars)
+                    if symbol in seen or held:
+                        self.scan(rows)
+                        rows, seen = [], set()
+                    if held:
+                        self.release_breadth(before=candle["t"])
+                    seen.add(symbol)
+                    ctx = self.on_closed_bar(candle)
+                    if ctx is not None:
+                        rows.append(ctx)
+            except Exception as e:
+                print(f"Ошибка process_signal: {e}")
+        try:
+            self.scan(rows)
+            self.release_breadth()
+        except Exception as e:
+            print(f"Ошибка process_signal: {e}")
+        for t in bars:
+            self.lanes.done(t)
+        METRICS.inc("closed_bars", closed_bars)
+        self.save_trades()
+        if self.seasonal is not None and self.seasonal.dirty:
+            self.lanes.submit(JOURNAL, self.seasonal.save, self.seasonal_path)
+
+    def save_trades(self):
+        """
+        Состояние сделок на диск сразу, в критической полосе: trade_id и сделки пачки
+        сохранены раньше, чем Telegram и Excel (отложенные полосы) их покажут.
+        """
+        try:
+            self.trades.flush()
+        except Exception as e:
+            print(f"Ошибка сохранения сделок: {e}")  # dirty остаётся — повтор в конце следующей пачки
+
+    def process_signal(self, msg):
+        self.process_batch([msg])
+
+    # ================= LOOP =================
+    def handle_kline(self, msg):
+        k = msg.get("data", {}).get("k") if isinstance(msg.get("data"), dict) else None
+        if k is not None:
+            if not k.get("x"):
+                return  # незакрытое обновление: воркеру не нужно (engine/taskqueue.py)
+            self.lanes.arrived(k["t"])
+            if "E" in msg["data"]:
+                METRICS.observe("ws_lag", time.time() - msg["data"]["E"] / 1000)
+        self.task_queue.put(msg)
+
+    def worker(self):
+        # забираем всё, что накопилось: свечи одного закрытия сканируются одной пачкой
+        while True:
+            try:
+                # сигналы ждут сборки закрытия — свечи ждём не дольше BREADTH_WAIT_SECONDS
+                batch = [self.task_queue.get(timeout=self.breadth.timeout())]
+            except Empty:
+                with self.lanes.critical(), self.batch_lock:
+                    self.release_breadth()
+                    self.save_trades()
+                continue
+            while True:
+                try:
+                    batch.append(self.task_queue.get_nowait())
+                except Empty:
+                    break
+            with self.lanes.critical(), self.batch_lock:
+                self.process_batch(batch)
+            for _ in batch:
+                self.task_queue.task_done()
+            if self.task_queue.empty():
+                self.lanes.settle()
+                self.maybe_snapshot()
+
+    # ================= SNAPSHOT =================
+    def maybe_snapshot(self):
+        """Раз в SNAPSHOT_SECONDS: копия состояния здесь, запись на диск — в полосе JOURNAL."""
+        if not self.p.SNAPSHOT_SECONDS or time.monotonic() - self.snapshot_at < self.p.SNAPSHOT_SECONDS:
+            return
+        self.snapshot_at = time.monotonic()
+        self.lanes.submit(JOURNAL, snapshot.write, snapshot.capture(self), self.snapshot_path)
+
+    def shutdown(self, signum=None, frame=None):
+        """SIGTERM (перезапуск дино): снимок и состояние сделок на диск перед выходом."""
+        print("🛑 Остановка: сохраняю снимок состояния")
+        with self.batch_lock:
+            if self.p.SNAPSHOT_SECONDS:
+                snapshot.write(snapshot.capture(self), self.snapshot_path)
+            self.trades.flush()
+            self.trades.save_active_trades()
+        raise SystemExit(0)
+
+    def start(self):
+        """Загружает вселенную токенов, прогревает историю и запускает фоновые потоки (без сокетов)."""
+        restored = snapshot.restore(self, self.snapshot_path) if self.p.SNAPSHOT_SECONDS else None
+        if restored:
+            print(f"💾 Снимок: {restored[0]} токенов, возраст {restored[1]:.0f}s")
+        # вселенная из снимка живёт до обычного часового обновления; доля шарда — всегда от координатора
+        if not restored or restored[1] >= 3600 or self.universe is not None:
+            self.refresh_symbols()
+        print(f"✅ Ликвидные токены: {len(self.symbols)}")
+        ready, total, elapsed = warm_up(self)
+        print(f"✅ {self.state_name} готов: прогрето {ready}/{total} токенов за {elapsed:.1f}s")
+        self.send_telegram(f"✅ {self.state_name} готов: прогрето {ready}/{total} токенов за {elapsed:.1f}s")
+        if os.getenv("READY_FILE"):
+            # supervisor ждёт его, прежде чем прогревать следующего бота
+            with open(os.getenv("READY_FILE"), "w") as f:
+                f.write(f"{ready}/{total}")
+        Thread(target=self.update_symbols_periodically, daemon=True).start()
+        if os.getenv("METRICS_FILE"):
+            Thread(target=self.dump_metrics, args=(os.getenv("METRICS_FILE"),), daemon=True).start()
+        self.lanes.start()
+        Thread(target=self.worker, daemon=True).start()
+        if self.seasonal is not None:
+            Thread(target=self.build_seasonal, daemon=True).start()
+        # команды — только у процесса со своим Telegram (не воркер шарда и не стенд);
+        # под supervisor опрос ведёт он сам, по всем ботам (engine/commands.py)
+        if (self.p.TELEGRAM_COMMANDS and not os.getenv("SUPERVISOR_COMMANDS")
+                and isinstance(self.notifier, Telegram) and self.notifier.bot_token):
+            poller = CommandPoller(self.notifier.bot_token, self.notifier.chat_id,
+                                   engine_handlers(self), self.send_telegram)
+            Thread(target=poller.run, daemon=True).start()
+
+    def kline_streams(self):
+        return [f"{s.lower()}@kline_{self.stream_interval}" for s in self.symbols]
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.shutdown)
+        self.start()
+        if self.feed:
+            from engine.feed import FeedClient
+            FeedClient(self, self.feed).run()
+            return
+
+        from binance import ThreadedWebsocketManager
+
+        # ===== WebSocket с переподключением и плановым перезапуском =====
+        chunk_size = 30
+
+        while True:
+            try:
+                twm = ThreadedWebsocketManager()
+                twm.start()
+
+                streams = self.kline_streams()
+                for i in range(0, len(streams), chunk_size):
+                    twm.start_multiplex_socket(callback=self.handle_kline, streams=streams[i:i+chunk_size])
+
+                twm.start_futures_multiplex_socket(callback=self.tickers.update, streams=["!miniTicker@arr"])
+
+                print("🟢 WebSocket запущен")
+                self.send_telegram(f"🟢 {self.state_name} WebSocket запущен")
+
+                # Плановый перезапуск каждые 24 часа или раньше, если сменилась вселенная
+                if self.resubscribe.wait(24 * 60 * 60):
+                    self.resubscribe.clear()
+                    print(f"♻️ Вселенная изменилась ({len(self.symbols)} токенов), переподписка WebSocket...")
+                else:
+                    print("♻️ Плановый перезапуск WebSocket...")
+                    self.send_telegram(f"♻️ {self.name} плановый перезапуск WebSocket")
+                self.trades.save_active_trades()
+                twm.stop()
+
+            except Exception as e:
+                print(f"🔴 WebSocket упал: {e}. Переподключение через 30 секунд...")
+                self.send_telegram(f"🔴 {self.name} WebSocket упал: {e}. Переподключение через 30 секунд...")
+                self.trades.save_active_trades()
+                try:
+                    twm.stop()
+                except Exception:
+                    pass
+                time.sleep(30)
+
+
+def make_journal(bot, name, windows=()):
+    """windows — VOLUME_WINDOWS: z-score окон в колонках после стратегий и колонок бота."""
+    extra_columns = dict(bot.EXTRA_COLUMNS)
+    col = max([EXCEL_STRAT_START_COL + 2 * len(bot.STRATEGIES)] + [column_index(c) + 1 for c in extra_columns])
+    for i, column in enumerate(window_columns(windows)):
+        extra_columns[get_column_letter(col + i)] = column
+    return ExcelJournal(
+        f"trades_{name}.xlsx",
+        bot.SHEET_MAP.get(name, bot.DEFAULT_SHEET),
+        bot.SHEET_MAP.values(),
+        bot.STRATEGIES,
+        details=bot.EXCEL_DETAILS,
+        extra_columns=extra_columns,
+    )
+
+
+def make_notifier():
+    return Telegram(os.getenv("BOT_TOKEN"), os.getenv("CHAT_ID"))
+
+
+def run(bot):
+    """
+    Точка входа ботов: python main*.py --config <файл>.
+    С --coordinator/--worker конфиг делится на шарды по процессам (engine/shard.py),
+    с --feed свечи приходят от хаба supervisor (engine/feed.py).
+    """
+    from dotenv import load_dotenv
+
+    args = parse_args()
+    config = load_config(args.config)
+    load_dotenv()
+    use_endpoint()
+    if args.coordinator:
+        from engine.shard import Coordinator
+        Coordinator(bot, config, args.coordinator).run()
+    elif args.worker:
+        from engine.shard import Worker
+        worker = Worker(bot, config, args.worker, args.worker_id)
+        worker.engine.feed = args.feed
+        worker.run()
+    else:
+        engine = Engine(bot, config)
+        engine.feed = args.feed
+        engine.run()
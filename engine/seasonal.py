@@ -0,0 +1,132 @@
+"""
+Сезонная база объёма: типичный quote_volume символа в этот слот суток (будни / выходные).
+
+Слот — номер свечи от полуночи UTC, отдельно для будней и выходных (2 × свечей в сутках).
+Значение слота — экспоненциальное среднее log(1 + quote_volume) по дням с весом
+2 / (SEASONAL_DAYS + 1) у новых суток: выброс одного дня тонет в логарифме и затухает.
+Таблица — float32 (символы × слоты): для 5m это 576 чисел, 2.3KB на символ.
+
+Сутки вливаются целиком один раз: на закрытии последней свечи суток из истории CandleStore
+(update) и при постройке из kline_cache за SEASONAL_DAYS дней (fold_history) — для новых
+символов и дней, пропущенных, пока бот лежал. Поиск базы на свече — одно чтение из массива.
+Хранится в seasonal_{BOT}.npz.
+"""
+import os
+from threading import Lock
+
+import numpy as np
+
+from engine.config import INTERVAL_SECONDS
+
+DAY_MS = 86_400_000
+
+
+def is_weekend(day):
+    """day — номер суток от 1970-01-01 (четверг)."""
+    return (day + 3) % 7 >= 5
+
+
+class SeasonalBaseline:
+    def __init__(self, interval, days=14):
+        self.interval_ms = INTERVAL_SECONDS[interval] * 1000
+        self.per_day = DAY_MS // self.interval_ms
+        self.days = days
+        self.alpha = 2 / (days + 1)
+        self.index = {}   # symbol -> строка таблицы
+        self.folded = {}  # symbol -> номер последних влитых суток
+        self.table = np.full((64, 2 * self.per_day), np.nan, dtype=np.float32)
+        self.lock = Lock()
+        self.dirty = False
+
+    def _row(self, symbol):
+        row = self.index.get(symbol)
+        if row is None:
+            row = self.index[symbol] = len(self.index)
+            if row == len(self.table):
+                grown = np.full((2 * len(self.table), self.table.shape[1]), np.nan, dtype=np.float32)
+                grown[:row] = self.table
+                self.table = grown
+        return row
+
+    def slot(self, open_time):
+        day = open_time // DAY_MS
+        return (open_time % DAY_MS) // self.interval_ms + (self.per_day if is_weekend(day) else 0)
+
+    def baseline(self, symbol, open_time):
+        """Типичный quote_volume свечи open_time или nan, если слот ещё пуст."""
+        row = self.index.get(symbol)
+        if row is None:
+            return float("nan")
+        return float(np.expm1(self.table[row, self.slot(open_time)]))
+
+    def ratio(self, symbol, open_time, quote_volume):
+        base = self.baseline(symbol, open_time)
+        if base != base:
+            return base
+        return float("inf") if base == 0 else quote_volume / base
+
+    # ================= ВЛИВАНИЕ СУТОК =================
+    def fold(self, symbol, open_time, quote_volume):
+        """Полные сутки UTC: per_day свечей подряд с полуночи. False, если сутки неполные или уже влиты."""
+        if len(open_time) != self.per_day or open_time[0] % DAY_MS:
+            return False
+        if int(open_time[-1]) - int(open_time[0]) != (self.per_day - 1) * self.interval_ms:
+            return False
+        day = int(open_time[0]) // DAY_MS
+        with self.lock:
+            if self.folded.get(symbol, -1) >= day:
+                return False
+            row = self._row(symbol)
+            start = self.per_day if is_weekend(day) else 0
+            cur = self.table[row, start:start + self.per_day]
+            x = np.log1p(np.asarray(quote_volume, dtype=np.float64))
+            self.table[row, start:start + self.per_day] = np.where(np.isnan(cur), x, cur + self.alpha * (x - cur))
+            self.folded[symbol] = day
+            self.dirty = True
+        return True
+
+    def update(self, symbol, rows):
+        """Закрытая свеча из потока (rows — история CandleStore): последняя свеча суток вливает сутки."""
+        if (int(rows[-1, 0]) + self.interval_ms) % DAY_MS:
+            return False
+        day = rows[-self.per_day:]
+        return self.fold(symbol, day[:, 0].astype(np.int64), day[:, 4] * day[:, 5])
+
+    def fold_history(self, symbol, klines):
+        """Массивы KlineCache.get: все полные сутки по порядку. Возвращает число влитых суток."""
+        open_time = klines["open_time"].astype(np.int64)
+        qv = klines["close"] * klines["volume"]
+        starts = np.flatnonzero(open_time % DAY_MS == 0)
+        return sum(self.fold(symbol, open_time[s:s + self.per_day], qv[s:s + self.per_day]) for s in starts)
+
+    def missing(self, symbol, today):
+        """Первые сутки, которых не хватает символу до вчерашних включительно, или None."""
+        first = max(self.folded.get(symbol, -1) + 1, today - self.days)
+        return first if first < today else None
+
+    # ================= ДИСК =================
+    def save(self, path):
+        with self.lock:
+            symbols = sorted(self.index, key=self.index.get)
+            table = self.table[:len(symbols)].copy()
+            folded = np.array([self.folded.get(s, -1) for s in symbols], dtype=np.int64)
+            self.dirty = False
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, symbols=np.array(symbols, dtype=str), table=table, folded=folded,
+                 interval_ms=self.interval_ms, days=self.days)
+        os.replace(tmp, path)
+
+    def load(self, path):
+        """False, если файла нет или он от другого интервала."""
+        if not os.path.exists(path):
+            return False
+        with np.load(path) as npz:
+            if int(npz["interval_ms"]) != self.interval_ms:
+                return False
+            symbols, table, folded = npz["symbols"].tolist(), npz["table"], npz["folded"]
+        with self.lock:
+            for i, symbol in enumerate(symbols):
+                row = self._row(symbol)
+                self.table[row] = table[i]
+                self.folded[symbol] = int(folded[i])
+        return True
@@ -0,0 +1,444 @@
+"""
+Шардинг вселенной токенов одного конфига по нескольким процессам (и хостам).
+
+    python main.py --config config1.json --coordinator 0.0.0.0:7100
+    python main.py --config config1.json --worker 10.0.0.5:7100 --worker-id a
+    python main.py --config config1.json --worker 10.0.0.5:7100 --worker-id b
+
+Координатор:
+  - раз в час получает вселенную (ticker/24hr + MIN_24H_VOLUME) и раскладывает её по живым
+    воркерам консистентным хешированием (HashRing): при смене вселенной или состава воркеров
+    переезжает только доля символов, а не всё подряд;
+  - ведёт единый счётчик trade_id (свой файл trade_ids_{BOT}.json: trades_state_{BOT}.json
+    с итогами и отметками — у одиночного бота) и раздаёт его воркерам блоками по LEASE,
+    записав конец блока на диск до ответа; единственные Excel-журнал и Telegram — поток
+    сделок конфига остаётся один;
+  - следит за heartbeat воркеров; молчащий дольше DEAD_AFTER или отвалившийся воркер
+    выбывает, его символы, открытые сделки и отметки кулдауна (из последнего heartbeat)
+    уходят новым владельцам.
+
+Воркер — обычный Engine со своей долей вселенной: Excel, Telegram и trade_id идут через
+координатора, файлы состояния — с суффиксом воркера. trade_id берутся из заранее полученного
+блока, следующий блок запрашивается, когда осталась половина, — сигнал не ждёт координатора.
+Номера остатка блока при перезапуске воркера пропадают: trade_id уникальны, но могут идти с дырами.
+Отданные при ребалансе символы воркер передаёт вместе со сделками и отметками
+(TradeBook.export), новый владелец принимает их через TradeBook.adopt. Раскладка и приём
+сделок приходят в поток чтения соединения, а применяются воркером свечей между пачками
+(Engine.call_in_worker): вселенная, история и сделки не меняются посреди пачки.
+
+Связь — multiprocessing.connection (pickle по TCP) с ключом SHARD_AUTHKEY из окружения.
+"""
+import bisect
+import hashlib
+import json
+import os
+import time
+from collections import deque
+from multiprocessing.connection import Client as Connect, Listener
+from queue import Empty, Queue
+from threading import Event, Lock, Thread
+
+from engine.config import load_params
+from engine.market import TICKER_24H_WEIGHT, RestBudget, get_liquid_futures_symbols
+from engine.trades import write_json
+
+HEARTBEAT = 5      # секунд между heartbeat воркера
+DEAD_AFTER = 20    # воркер без heartbeat дольше — выбывает
+REPLICAS = 64      # точек на воркера в кольце
+LEASE = 50         # trade_id в одном блоке, который воркер берёт у координатора
+
+
+def parse_address(address):
+    host, port = address.rsplit(":", 1)
+    return host, int(port)
+
+
+def authkey():
+    key = os.getenv("SHARD_AUTHKEY")
+    if not key:
+        raise SystemExit("SHARD_AUTHKEY не задан: координатор и воркеры должны знать общий ключ")
+    return key.encode()
+
+
+# ================= КОНСИСТЕНТНОЕ ХЕШИРОВАНИЕ =================
+def _hash(key):
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """Кольцо с REPLICAS виртуальными точками на узел: символ принадлежит первой точке по часовой."""
+
+    def __init__(self, nodes, replicas=REPLICAS):
+        points = sorted((_hash(f"{node}#{i}"), node) for node in nodes for i in range(replicas))
+        self.keys = [h for h, _ in points]
+        self.nodes = [node for _, node in points]
+
+    def owner(self, symbol):
+        if not self.keys:
+            return None
+        i = bisect.bisect(self.keys, _hash(symbol)) % len(self.keys)
+        return self.nodes[i]
+
+    def assign(self, symbols):
+        """node -> [символы] в порядке symbols; узлы без символов тоже в словаре."""
+        shards = {node: [] for node in set(self.nodes)}
+        for symbol in symbols:
+            shards[self.owner(symbol)].append(symbol)
+        return shards
+
+
+# ================= КООРДИНАТОР =================
+class TradeIds:
+    """Счётчик trade_id координатора в trade_ids_{BOT}.json: итогов и отметок у координатора нет."""
+
+    def __init__(self, name):
+        self.path = f"trade_ids_{name}.json"
+        self.last_trade_id = 0
+        # до отдельного файла счётчик координатора лежал в trades_state_{BOT}.json
+        for path in (self.path, f"trades_state_{name}.json"):
+            if os.path.exists(path):
+                with open(path) as f:
+                    self.last_trade_id = json.load(f).get("last_trade_id", 0)
+                break
+
+    def lease(self, count):
+        """Первый номер блока из count; конец блока на диске раньше, чем воркер его получит."""
+        start = self.last_trade_id + 1
+        self.last_trade_id += count
+        write_json(self.path, {"last_trade_id": self.last_trade_id})
+        return start
+
+
+class WorkerLink:
+    def __init__(self, worker_id, conn):
+        self.id = worker_id
+        self.conn = conn
+        self.lock = Lock()
+        self.seen = time.monotonic()
+        self.shard = []
+        self.state = {"trades": {}, "marks": {}}  # из последнего heartbeat
+
+    def send(self, *msg):
+        with self.lock:
+            self.conn.send(msg)
+
+
+class Coordinator:
+    """
+    journal и notifier — настоящие ExcelJournal/Telegram конфига; client — для вселенной.
+    universe можно подменить вызываемым без аргументов (бенчмарк, тесты).
+    quorum — сколько воркеров ждать до первой раскладки, чтобы на старте символы не переезжали.
+    """
+
+    def __init__(self, bot, config, address, client=None, journal=None, notifier=None, universe=None,
+                 quorum=1):
+        from engine.runtime import make_journal, make_notifier
+
+        self.p = bot.load_params(config, load_params(config))
+        self.name = self.p.NAME
+        self.address = address
+        if client is None and universe is None:
+            from binance.client import Client
+            client = Client()
+        self.client = client
+        self.journal = journal or make_journal(bot, self.name, self.p.VOLUME_WINDOWS)
+        self.notifier = notifier or make_notifier()
+        self.universe = universe or self.liquid_symbols
+        self.budget = RestBudget(self.p.REST_WEIGHT_BUDGET)
+        self.ids = TradeIds(self.name)
+        self.symbols = []
+        self.workers = {}   # worker_id -> WorkerLink
+        self.orphans = {"trades": {}, "marks": {}}  # сделки выбывших воркеров до ребаланса
+        self.lock = Lock()
+        self.journal_lock = Lock()
+        self.listener = None
+        self.quorum = quorum
+
+    def liquid_symbols(self):
+        self.budget.acquire(TICKER_24H_WEIGHT)
+        return get_liquid_futures_symbols(self.client, self.p.MIN_24H_VOLUME)
+
+    def lease(self, count):
+        with self.lock:
+            return self.ids.lease(count)
+
+    # ================= РАСКЛАДКА =================
+    def rebalance(self):
+        """Раздаёт вселенную живым воркерам; символы выбывших приходят новым владельцам со сделками."""
+        with self.lock:
+            links = dict(self.workers)
+            if not links or len(links) < self.quorum:
+                return {}  # сироты ждут воркеров
+            self.quorum = 1
+            shards = HashRing(links).assign(self.symbols)
+            orphans, self.orphans = self.orphans, {"trades": {}, "marks": {}}
+            for worker_id, link in links.items():
+                link.shard = shards.get(worker_id, [])
+        moved = self.route(orphans, links, shards)
+        for link in links.values():
+            try:
+                link.send("assign", link.shard)
+            except OSError:
+                pass
+        print(f"🧩 {self.name}: {len(self.symbols)} токенов на {len(links)} воркеров "
+              f"({', '.join(f'{w}={len(s)}' for w, s in sorted(shards.items()))}), передано сделок: {moved}")
+        return shards
+
+    def route(self, handoff, links=None, shards=None):
+        """Отправляет сделки и отметки кулдауна владельцам их символов. Возвращает число сделок."""
+        if links is None:
+            with self.lock:
+                links = dict(self.workers)
+                shards = {w: link.shard for w, link in links.items()}
+        owner = {s: w for w, symbols in shards.items() for s in symbols}
+        parts = {}
+        for tid, trade in handoff["trades"].items():
+            w = owner.get(trade["symbol"])
+            if w is not None:
+                parts.setdefault(w, {"trades": {}, "marks": {}})["trades"][tid] = trade
+        for symbol, mark in handoff["marks"].items():
+            w = owner.get(symbol)
+            if w is not None:
+                parts.setdefault(w, {"trades": {}, "marks": {}})["marks"][symbol] = mark
+        for w, part in parts.items():
+            try:
+                links[w].send("adopt", part)
+            except OSError:
+                pass
+        return sum(len(part["trades"]) for part in parts.values())
+
+    def drop(self, link, reason):
+        with self.lock:
+            if self.workers.get(link.id) is not link:
+                return
+            del self.workers[link.id]
+            self.orphans["trades"].update(link.state["trades"])
+            self.orphans["marks"].update(link.state["marks"])
+        print(f"⚠️ Воркер {link.id} выбыл ({reason}), символов: {len(link.shard)}")
+        self.notifier.send(f"⚠️ {self.name}: воркер {link.id} выбыл ({reason}), ребаланс")
+        try:
+            link.conn.close()
+        except OSError:
+            pass
+        self.rebalance()
+
+    # ================= СООБЩЕНИЯ ВОРКЕРОВ =================
+    def serve(self, conn):
+        try:
+            kind, worker_id = conn.recv()
+        except (EOFError, OSError, ValueError):
+            conn.close()
+            return
+        if kind != "hello":
+            conn.close()
+            return
+        link = WorkerLink(worker_id, conn)
+        with self.lock:
+            old = self.workers.get(worker_id)
+            self.workers[worker_id] = link
+        if old is not None:
+            old.conn.close()  # переподключился с тем же id: прежнее соединение мертво
+        print(f"🔌 Воркер {worker_id} подключился")
+        self.rebalance()
+        while True:
+            try:
+                msg = conn.recv()
+            except (EOFError, OSError):
+                self.drop(link, "соединение закрыто")
+                return
+            link.seen = time.monotonic()
+            kind = msg[0]
+            try:
+                if kind == "heartbeat":
+                    link.state = msg[1]
+                elif kind == "lease":
+                    link.send("ids", self.lease(msg[1]), msg[1])
+                elif kind == "journal":
+                    with self.journal_lock:
+                        getattr(self.journal, msg[1])(*msg[2], **msg[3])
+                elif kind == "notify":
+                    self.notifier.send(msg[1])
+                elif kind == "handoff":
+                    self.route(msg[1])
+            except Exception as e:
+                print(f"Ошибка сообщения {kind} от воркера {worker_id}: {e}")
+
+    def monitor(self):
+        """Выбывание молчащих воркеров и часовое обновление вселенной."""
+        refreshed = time.monotonic()
+        while True:
+            time.sleep(HEARTBEAT)
+            now = time.monotonic()
+            for link in list(self.workers.values()):
+                if now - link.seen > DEAD_AFTER:
+                    self.drop(link, f"нет heartbeat {now - link.seen:.0f}s")
+            if now - refreshed >= 3600:
+                refreshed = now
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"Ошибка обновления токенов: {e}")
+
+    def refresh(self):
+        symbols = list(self.universe())
+        changed = set(symbols) != set(self.symbols)
+        self.symbols = symbols
+        print(f"♻️ Обновление токенов: {len(symbols)}")
+        if changed:
+            self.rebalance()
+
+    def start(self):
+        self.symbols = list(self.universe())
+        print(f"✅ Ликвидные токены: {len(self.symbols)}")
+        self.listener = Listener(parse_address(self.address), authkey=authkey())
+        Thread(target=self.monitor, daemon=True).start()
+        Thread(target=self.accept, daemon=True).start()
+        print(f"🧭 {self.name}: координатор слушает {self.address}")
+
+    def accept(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except Exception as e:  # неверный ключ, обрыв рукопожатия
+                print(f"Ошибка подключения воркера: {e}")
+                continue
+            Thread(target=self.serve, args=(conn,), daemon=True).start()
+
+    def run(self):
+        self.start()
+        self.notifier.send(f"🧭 {self.name} координатор запущен: {len(self.symbols)} токенов")
+        while True:
+            time.sleep(3600)
+
+
+# ================= ВОРКЕР =================
+class RemoteJournal:
+    """ExcelJournal координатора: запись уходит сообщением, без ожидания."""
+
+    def __init__(self, worker):
+        self.worker = worker
+
+    def write_trade(self, *args, **kwargs):
+        self.worker.send("journal", "write_trade", args, kwargs)
+
+    def write_trades(self, *args, **kwargs):
+        self.worker.send("journal", "write_trades", args, kwargs)
+
+    def update_status(self, *args, **kwargs):
+        self.worker.send("journal", "update_status", args, kwargs)
+
+
+class RemoteNotifier:
+    def __init__(self, worker):
+        self.worker = worker
+
+    def send(self, message):
+        self.worker.send("notify", message)
+
+
+class Worker:
+    """Engine с долей вселенной от координатора. Без координатора не стартует."""
+
+    def __init__(self, bot, config, address, worker_id, client=None):
+        from engine.runtime import Engine
+
+        self.id = worker_id
+        self.conn = Connect(parse_address(address), authkey=authkey())
+        self.lock = Lock()
+        self.ids = Queue()      # блоки trade_id от координатора (поток чтения)
+        self.leased = deque()   # номера текущего блока (воркер свечей)
+        self.leasing = False    # запрос блока в полёте
+        self.assigned = []
+        self.ready = Event()
+        name = bot.load_params(config, load_params(config)).NAME
+        self.engine = Engine(bot, config, client, journal=RemoteJournal(self), notifier=RemoteNotifier(self),
+                             state_name=f"{name}_{worker_id}")
+        self.engine.universe = lambda: list(self.assigned)
+        self.engine.trades.allocate = self.next_trade_id
+
+    def send(self, *msg):
+        with self.lock:
+            self.conn.send(msg)
+
+    def request_lease(self):
+        self.leasing = True
+        self.send("lease", LEASE)
+
+    def next_trade_id(self):
+        # open_trade зовёт только воркер очереди свечей: блок ждём, лишь если прежний кончился раньше ответа
+        while True:
+            try:
+                self.leased.extend(self.ids.get_nowait())
+                self.leasing = False
+            except Empty:
+                break
+        if not self.leased:
+            if not self.leasing:
+                self.request_lease()
+            self.leased.extend(self.ids.get())
+            self.leasing = False
+        if len(self.leased) <= LEASE // 2 and not self.leasing:
+            self.request_lease()
+        return self.leased.popleft()
+
+    def on_assign(self, symbols):
+        dropped = set(self.assigned) - set(symbols)
+        if not self.ready.is_set():
+            # после перезапуска файл сделок может держать символы, которые уже у других
+            dropped = {t["symbol"] for t in self.engine.trades.table.to_dict().values()} - set(symbols)
+        self.assigned = list(symbols)
+        if dropped:
+            handoff = self.engine.trades.export(dropped)
+            if handoff["trades"] or handoff["marks"]:
+                self.send("handoff", handoff)
+        print(f"🧩 Воркер {self.id}: {len(symbols)} токенов, отдано {len(dropped)}")
+        if self.ready.is_set():
+            self.engine.refresh_symbols()
+        self.ready.set()
+
+    def reader(self):
+        while True:
+            try:
+                msg = self.conn.recv()
+            except (EOFError, OSError):
+                print(f"🔴 Воркер {self.id}: координатор недоступен, остановка")
+                os._exit(1)  # без координатора нет trade_id и журнала — перезапустит supervisor
+            kind = msg[0]
+            try:
+                if kind == "ids":
+                    self.ids.put(range(msg[1], msg[1] + msg[2]))
+                elif kind == "assign" and not self.ready.is_set():
+                    self.on_assign(msg[1])  # первая доля — до старта Engine, воркер свечей ещё не идёт
+                elif kind == "assign":
+                    self.engine.call_in_worker(self.on_assign, msg[1])
+                elif kind == "adopt":
+                    self.engine.call_in_worker(self.adopt, msg[1])
+            except Exception as e:
+                print(f"Ошибка сообщения {kind} от координатора: {e}")
+
+    def adopt(self, handoff):
+        self.engine.trades.adopt(handoff)
+        print(f"🧩 Воркер {self.id}: принято сделок {len(handoff['trades'])}")
+
+    def heartbeat(self):
+        trades = self.engine.trades
+        while True:
+            with trades.lock:
+                active = trades.table.to_dict()
+            try:
+                self.send("heartbeat", {"trades": active, "marks": trades.marks()})
+            except OSError:
+                return
+            time.sleep(HEARTBEAT)
+
+    def connect(self):
+        """hello и ожидание первой доли вселенной."""
+        Thread(target=self.reader, daemon=True).start()
+        self.send("hello", self.id)
+        self.request_lease()
+        self.ready.wait()
+        Thread(target=self.heartbeat, daemon=True).start()
+
+    def run(self):
+        self.connect()
+        self.engine.run()
@@ -0,0 +1,230 @@
+"""
+Симулятор исходов TP/SL по историческим сделкам: любые соотношения на уже открытых когда-то входах.
+
+    python -m engine.simulator --bot main.py --journal trades_CONFIG_1.xlsx
+    python -m engine.simulator --bot spike --journal trades_CONFSP1.xlsx --ratios 3:1 8:2 atr:2:1 --out outcomes.csv
+    python -m engine.simulator --bot impulse --active active_trades_CONFIMP1.json
+
+Входы берутся из журнала Excel (все листы или --sheet) и/или active_trades_{BOT}.json,
+свечи — из kline_cache (engine/klinecache.py), недостающие докачиваются.
+
+Соотношения: "3:1" — TP 3%, SL 1%; "atr:2:1" — TP 2×NATR, SL 1×NATR на свече входа.
+По умолчанию — STRATEGIES бота.
+
+Логика та же, что у живого бота: первая проверяемая свеча — следующая после сигнальной,
+внутри свечи SL проверяется первым, закрытие по цене уровня.
+Первое касание ищется сразу для всех сделок пачки ядром kernels.first_touch
+(engine/kernels.py: numba или векторный NumPy) по матрицам high/low после входа.
+"""
+import argparse
+import json
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from engine import kernels
+from engine.config import INTERVAL_SECONDS
+from engine.klinecache import KlineCache
+
+CHUNK = 2000       # сделок в одной пачке
+
+
+# ================= РАЗБОР ВХОДНЫХ ДАННЫХ =================
+def parse_ratio(spec):
+    """'3:1' -> ('3:1', 'pct', 0.03, 0.01); 'atr:2:1' -> ('atr:2:1', 'natr', 2.0, 1.0)."""
+    parts = spec.split(":")
+    if parts[0].lower() in ("atr", "natr"):
+        return spec, "natr", float(parts[1]), float(parts[2])
+    return spec, "pct", float(parts[0]) / 100, float(parts[1]) / 100
+
+
+def strategy_ratios(strategies):
+    return [(name, "pct", s["tp"], abs(s["sl"])) for name, s in strategies.items()]
+
+
+def load_journal(path, sheet=None, utc_offset_hours=0):
+    """Сделки из trades_{BOT}.xlsx: trade_id, symbol, side, entry_price, time (UTC), natr."""
+    sheets = pd.read_excel(path, sheet_name=sheet if sheet else None, dtype=str)
+    if sheet:
+        sheets = {sheet: sheets}
+    rows = []
+    for df in sheets.values():
+        if "Trade_id" not in df.columns:
+            continue
+        for _, r in df.dropna(subset=["Trade_id", "Тикет", "Цена входа"]).iterrows():
+            local = datetime.strptime(f"{r['Дата']} {r['Время']}", "%d.%m.%Y %H:%M:%S")
+            rows.append({
+                "trade_id":    str(r["Trade_id"]),
+                "symbol":      r["Тикет"],
+                "side":        "BUY" if "BUY" in str(r["Тип"]) else "SELL",
+                "entry_price": float(r["Цена входа"]),
+                "time":        local - timedelta(hours=utc_offset_hours),
+                "natr":        float(r["NATR%"]) if pd.notna(r.get("NATR%")) else np.nan,
+            })
+    return rows
+
+
+def load_active(path):
+    """Сделки из active_trades_{BOT}.json (open_time там в UTC, NATR нет)."""
+    with open(path) as f:
+        active = json.load(f)
+    return [{
+        "trade_id":    tid,
+        "symbol":      t["symbol"],
+        "side":        t["side"],
+        "entry_price": float(t["entry_price"]),
+        "time":        datetime.strptime(t["open_time"], "%Y-%m-%d %H:%M:%S"),
+        "natr":        np.nan,
+    } for tid, t in active.items() if t.get("open_time")]
+
+
+# ================= ПУТИ ЦЕНЫ =================
+def build_paths(trades, cache, horizon, atr_len=50):
+    """
+    Матрицы пути для каждой сделки: high и low horizon свечей после сигнальной (NaN за концом
+    истории), время свечей и длина доступной истории.
+    Недостающий NATR считается по кэшу на сигнальной свече.
+    """
+    interval_ms = cache.interval_ms
+    n = len(trades)
+    highs = np.full((n, horizon), np.nan)
+    lows = np.full((n, horizon), np.nan)
+    times = np.zeros((n, horizon), dtype=np.int64)
+    valid = np.zeros(n, dtype=np.int64)
+    natr = np.array([t["natr"] for t in trades], dtype=np.float64)
+
+    by_symbol = {}
+    for i, t in enumerate(trades):
+        by_symbol.setdefault(t["symbol"], []).append(i)
+
+    for symbol, idx in by_symbol.items():
+        # бар, открывшийся на закрытии сигнальной свечи, — первый проверяемый
+        starts = {}
+        for i in idx:
+            t = int(trades[i]["time"].replace(tzinfo=timezone.utc).timestamp() * 1000)
+            starts[i] = t // interval_ms * interval_ms
+        lo = min(starts.values()) - (atr_len + 1) * interval_ms
+        hi = max(starts.values()) + horizon * interval_ms
+        try:
+            k = cache.get(symbol, lo, hi)
+        except Exception as e:
+            print(f"Ошибка загрузки свечей {symbol}: {e}")
+            continue
+        open_time, high, low, close = k["open_time"], k["high"], k["low"], k["close"]
+        for i in idx:
+            s = int(np.searchsorted(open_time, starts[i]))
+            e = min(s + horizon, len(open_time))
+            m = e - s
+            if m <= 0:
+                continue
+            highs[i, :m] = high[s:e]
+            lows[i, :m] = low[s:e]
+            times[i, :m] = open_time[s:e]
+            valid[i] = m
+            if np.isnan(natr[i]) and s > atr_len:
+                prev_close = close[s - atr_len - 1:s - 1]
+                h, l = high[s - atr_len:s], low[s - atr_len:s]
+                tr = np.maximum(h - l, np.maximum(np.abs(h - prev_close), np.abs(l - prev_close)))
+                natr[i] = tr.mean() / close[s - 1] * 100
+    return highs, lows, times, valid, natr
+
+
+def simulate(trades, ratios, cache, horizon=2000, atr_len=50):
+    """DataFrame исходов: по строке на (сделка, соотношение)."""
+    if not trades:
+        return pd.DataFrame()
+    frames = []
+    for c in range(0, len(trades), CHUNK):
+        chunk = trades[c:c + CHUNK]
+        highs, lows, times, valid, natr = build_paths(chunk, cache, horizon, atr_len)
+        buy = np.array([t["side"] == "BUY" for t in chunk])
+        entry = np.array([t["entry_price"] for t in chunk], dtype=np.float64)
+        # для SELL прибыль — ход вниз, стоп — ход вверх
+        sign = np.where(buy, 1.0, -1.0)
+        for name, kind, tp, sl in ratios:
+            scale = natr / 100 if kind == "natr" else 1.0
+            tp_lvl = np.broadcast_to(tp * scale, (len(chunk),)).astype(float)
+            sl_lvl = np.broadcast_to(sl * scale, (len(chunk),)).astype(float)
+            # неположительный или неизвестный (NaN у NATR) уровень не достигается
+            tp_price = np.where(tp_lvl > 0, entry * (1 + sign * tp_lvl), np.nan)
+            sl_price = np.where(sl_lvl > 0, entry * (1 - sign * sl_lvl), np.nan)
+            hit, result = kernels.first_touch(highs, lows, tp_price, sl_price, buy)
+
+            is_sl = result == kernels.SL
+            is_tp = result == kernels.TP
+            hit_time = np.where(hit >= 0, times[np.arange(len(chunk)), np.maximum(hit, 0)], 0)
+            frames.append(pd.DataFrame({
+                "trade_id":    [t["trade_id"] for t in chunk],
+                "symbol":      [t["symbol"] for t in chunk],
+                "side":        np.where(buy, "BUY", "SELL"),
+                "entry_price": [t["entry_price"] for t in chunk],
+                "entry_time":  [t["time"] for t in chunk],
+                "ratio":       name,
+                "tp_pct":      tp_lvl * 100,
+                "sl_pct":      sl_lvl * 100,
+                "result":      np.where(is_sl, "SL", np.where(is_tp, "TP", np.where(valid > 0, "OPEN", "NO DATA"))),
+                "bars":        np.where(hit >= 0, hit + 1, np.nan),
+                "hit_time":    pd.to_datetime(np.where(hit >= 0, hit_time, np.nan), unit="ms"),
+                "pnl":         np.round(np.where(is_tp, tp_lvl, np.where(is_sl, -sl_lvl, 0.0)) * 100, 2),
+            }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def summary(outcomes):
+    closed = outcomes[outcomes["result"].isin(["TP", "SL"])]
+    g = closed.groupby("ratio", sort=False)
+    table = pd.DataFrame({
+        "сделок":   outcomes.groupby("ratio", sort=False).size(),
+        "TP":       g["result"].apply(lambda r: int((r == "TP").sum())),
+        "SL":       g["result"].apply(lambda r: int((r == "SL").sum())),
+        "winrate%": g["result"].apply(lambda r: round((r == "TP").mean() * 100, 1)),
+        "PnL%":     g["pnl"].sum().round(2),
+        "средний PnL%": g["pnl"].mean().round(3),
+        "свечей до выхода": g["bars"].median(),
+    })
+    return table.fillna(0)
+
+
+def main():
+    from engine.bots import load_bot
+
+    parser = argparse.ArgumentParser(description="Симуляция TP/SL соотношений на исторических входах")
+    parser.add_argument("--bot", required=True, help="main.py, main_spike.py, main_impulse.py или volume/spike/impulse")
+    parser.add_argument("--journal", help="trades_{BOT}.xlsx")
+    parser.add_argument("--sheet", help="лист журнала (по умолчанию все)")
+    parser.add_argument("--active", help="active_trades_{BOT}.json")
+    parser.add_argument("--ratios", nargs="+", help="3:1 6:2 atr:2:1 ... (по умолчанию STRATEGIES бота)")
+    parser.add_argument("--horizon", type=int, default=2000, help="сколько свечей после входа смотреть")
+    parser.add_argument("--atr-len", type=int, default=50)
+    parser.add_argument("--utc-offset", type=float, default=0, help="часовой пояс времени в журнале")
+    parser.add_argument("--cache", default="kline_cache")
+    parser.add_argument("--out", help="CSV с исходом каждой сделки")
+    args = parser.parse_args()
+
+    bot = load_bot(args.bot)
+    trades = []
+    if args.journal:
+        trades += load_journal(args.journal, args.sheet, args.utc_offset)
+    if args.active:
+        known = {t["trade_id"] for t in trades}
+        trades += [t for t in load_active(args.active) if t["trade_id"] not in known]
+    if not trades:
+        raise SystemExit("Нет сделок: укажите --journal и/или --active")
+
+    ratios = [parse_ratio(r) for r in args.ratios] if args.ratios else strategy_ratios(bot.STRATEGIES)
+
+    from binance.client import Client
+    cache = KlineCache(Client(), bot.INTERVAL, args.cache)
+    outcomes = simulate(trades, ratios, cache, args.horizon, args.atr_len)
+
+    hours = args.horizon * INTERVAL_SECONDS[bot.INTERVAL] / 3600
+    print(f"📊 {len(trades)} сделок × {len(ratios)} соотношений, горизонт {args.horizon} свечей ({hours:.0f}ч)")
+    print(summary(outcomes).to_string())
+    if args.out:
+        outcomes.to_csv(args.out, index=False)
+        print(f"💾 {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Снимок состояния движка для быстрого перезапуска: snapshot_{BOT}.npz.
+
+Внутри: история свечей по символам (Ring), 1ч история HTF из потока, кэш EMA старшего ТФ,
+вселенная токенов и время снимка. Свинги пересчитываются из свечей при прогреве,
+отметки кулдауна и сделки и так лежат в trades_state/active_trades, корзины Aggregator
+заполняет prime_buckets.
+
+capture() копирует массивы в потоке воркера между пачками (единицы миллисекунд),
+write() пишет на диск в полосе JOURNAL: tmp-файл + fsync + os.replace, так что на диске
+всегда целый снимок. На старте restore() загружает его, а прогрев докачивает
+только свечи, закрывшиеся после снимка.
+"""
+import json
+import os
+
+import numpy as np
+
+from engine.store import STORE_COLUMNS
+
+VERSION = 1
+
+
+def _pack(store):
+    names = [s for s, ring in store.candles.items() if len(ring)]
+    views = [store.rows(s) for s in names]
+    counts = np.array([len(v) for v in views], dtype=np.int64)
+    rows = np.concatenate(views) if views else np.empty((0, len(STORE_COLUMNS)))
+    return names, counts, rows
+
+
+def _unpack(store, names, counts, rows):
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    for i, symbol in enumerate(names):
+        chunk = rows[offsets[i]:offsets[i + 1]]
+        store.load(symbol, {f: chunk[:, j] for j, f in enumerate(STORE_COLUMNS)})
+
+
+def capture(engine):
+    """Копия состояния движка. Вызывается из воркера, пока пачка не обрабатывается."""
+    names, counts, rows = _pack(engine.store)
+    meta = {
+        "version": VERSION,
+        "bot": engine.name,
+        "interval": engine.interval,
+        "size": engine.store.size,
+        "saved_at": engine.clock(),
+        "symbols": list(engine.symbols),
+        "candles": names,
+        "htf": {s: [hour, list(emas)] for s, (hour, emas) in engine.htf.items()},
+    }
+    state = {"candles": rows, "counts": counts}
+    if engine.htf_store is not None:
+        meta["htf_candles"], state["htf_counts"], state["htf_rows"] = _pack(engine.htf_store)
+    state["meta"] = np.array(json.dumps(meta))
+    return state
+
+
+def write(state, path):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **state)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def restore(engine, path):
+    """
+    Загружает снимок в движок. Возвращает (символов, возраст снимка в секундах) или None,
+    если снимка нет, он от другого интервала/размера истории или старше всей истории.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as npz:
+            meta = json.loads(str(npz["meta"]))
+            if (meta.get("version") != VERSION or meta["interval"] != engine.interval
+                    or meta["size"] != engine.store.size):
+                return None
+            age = engine.clock() - meta["saved_at"]
+            if age < 0 or age * 1000 >= engine.store.size * engine.store.interval_ms:
+                return None
+            _unpack(engine.store, meta["candles"], npz["counts"], npz["candles"])
+            if engine.htf_store is not None and "htf_candles" in meta:
+                _unpack(engine.htf_store, meta["htf_candles"], npz["htf_counts"], npz["htf_rows"])
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Ошибка чтения снимка {path}: {e}")
+        return None
+    engine.htf.update({s: (hour, tuple(emas)) for s, (hour, emas) in meta["htf"].items()})
+    engine.symbols = meta["symbols"]
+    for symbol in set(meta["candles"]) - set(meta["symbols"]):
+        engine.store.drop(symbol)
+    return len(meta["candles"]), age
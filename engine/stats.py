@@ -0,0 +1,62 @@
+"""
+Итоги закрытых стратегий в памяти: по стратегии (3:1, 10:3 ...), типу сигнала и конфигу.
+
+Каждое закрытие TP/SL (TradeBook.resolve) — O(1) обновление трёх строк
+[закрытий, TP, SL, сумма PnL%]. Итоги лежат в trades_state_{BOT}.json рядом
+со счётчиком trade_id и переживают перезапуск; команды Telegram /stats и /open
+(engine/commands.py) отвечают отсюда, не открывая Excel.
+"""
+from threading import Lock
+
+GROUPS = {"strategy": "Стратегии", "signal": "Сигналы", "config": "Конфиг"}
+
+
+class PerformanceStats:
+    def __init__(self, config_name, state=None):
+        self.config = config_name
+        self.lock = Lock()
+        self.groups = {g: {} for g in GROUPS}  # группа -> ключ -> [закрытий, TP, SL, сумма PnL%]
+        for group, rows in (state or {}).items():
+            if group in self.groups:
+                self.groups[group] = {k: list(v) for k, v in rows.items()}
+
+    def record(self, strategy, signal, result, pnl):
+        """Закрытие одной стратегии сделки: result — "TP" или "SL", pnl — в процентах."""
+        with self.lock:
+            for group, key in (("strategy", strategy), ("signal", signal or "—"), ("config", self.config)):
+                row = self.groups[group].get(key)
+                if row is None:
+                    row = self.groups[group][key] = [0, 0, 0, 0.0]
+                row[0] += 1
+                row[1 if result == "TP" else 2] += 1
+                row[3] += pnl
+
+    def to_dict(self):
+        with self.lock:
+            return {g: {k: list(v) for k, v in rows.items()} for g, rows in self.groups.items()}
+
+    def rows(self, group):
+        """[(ключ, закрытий, TP, SL, winrate%, сумма PnL%, средний PnL%), ...] по убыванию суммы PnL."""
+        with self.lock:
+            items = [(k, *v) for k, v in self.groups[group].items()]
+        out = [(k, n, tp, sl, tp / n * 100 if n else 0.0, pnl, pnl / n if n else 0.0)
+               for k, n, tp, sl, pnl in items]
+        return sorted(out, key=lambda r: -r[5])
+
+    def report(self):
+        lines = [f"📊 {self.config}: итоги закрытых стратегий"]
+        for group, title in GROUPS.items():
+            rows = self.rows(group)
+            if group == "config" or not rows:
+                continue
+            lines.append(f"\n{title}:")
+            for key, n, tp, sl, winrate, pnl, avg in rows:
+                lines.append(f"{key}: {n} (TP {tp} / SL {sl}), winrate {winrate:.1f}%, "
+                             f"PnL {pnl:+.2f}%, средний {avg:+.3f}%")
+        total = self.rows("config")
+        if not total:
+            lines.append("Закрытых стратегий пока нет")
+        for key, n, tp, sl, winrate, pnl, avg in total:
+            lines.append(f"\nВсего: {n} (TP {tp} / SL {sl}), winrate {winrate:.1f}%, "
+                         f"PnL {pnl:+.2f}%, средний {avg:+.3f}%")
+        return "\n".join(lines)
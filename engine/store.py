@@ -0,0 +1,162 @@
+import math
+
+import numpy as np
+
+from engine.config import INTERVAL_SECONDS
+from engine.klines import FIELDS, decoder, ws_row
+
+STORE_COLUMNS = list(FIELDS)
+
+
+def history_size(p, interval, windows=()):
+    """
+    Сколько закрытых свечей реально нужно индикаторам:
+    HISTORY_EMA_SPANS × EMA_SLOW на разгон EMA (вклад начала окна ~e^-2×spans),
+    сутки на сессионный VWAP, ATR_LEN, VOLUME_LOOKBACK и окна объёма windows, кулдаун.
+    Не больше LOOKBACK_CANDLES - 1 — столько закрытых свечей давал REST раньше.
+    """
+    bars_per_day = 86400 // INTERVAL_SECONDS[interval]
+    need = max(
+        p.HISTORY_EMA_SPANS * p.EMA_SLOW,
+        bars_per_day + 1,
+        p.ATR_LEN + 1,
+        p.VOLUME_LOOKBACK + 1,
+        max(windows, default=0) + 1,
+        p.COOLDOWN_BARS + 1,
+        p.PREV_VOL_WINDOW + 1,
+    )
+    return min(p.LOOKBACK_CANDLES - 1, need)
+
+
+class Ring:
+    """
+    Кольцевой буфер свечей фиксированной ёмкости: float64 (capacity × 6), без аллокаций на свечу.
+    Каждая строка пишется дважды (i и i + capacity), поэтому последние count свечей
+    всегда лежат подряд и view() — срез без копирования.
+    """
+
+    __slots__ = ("capacity", "buf", "end", "count")
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.buf = np.empty((2 * capacity, len(STORE_COLUMNS)), dtype=np.float64)
+        self.end = capacity  # view = buf[end - count:end]
+        self.count = 0
+
+    def append(self, row):
+        i = self.end % self.capacity
+        self.buf[i] = row
+        self.buf[i + self.capacity] = row
+        self.end = i + self.capacity + 1
+        self.count = min(self.count + 1, self.capacity)
+
+    def replace_last(self, row):
+        i = (self.end - 1) % self.capacity
+        self.buf[i] = row
+        self.buf[i + self.capacity] = row
+
+    def view(self):
+        return self.buf[self.end - self.count:self.end]
+
+    def last_open_time(self):
+        return int(self.buf[self.end - 1, 0]) if self.count else None
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        return self.buf.nbytes
+
+
+class CandleStore:
+    """
+    История закрытых свечей по символам в Ring фиксированной ёмкости size (см. history_size).
+    Заполняется при прогреве или из REST при первой закрытой свече символа,
+    дальше — только из WebSocket. При пропуске свечей история перезагружается.
+    """
+
+    def __init__(self, client, interval, size):
+        self.client = client
+        self.interval = interval
+        self.interval_ms = INTERVAL_SECONDS[interval] * 1000
+        self.size = size
+        self.candles = {}
+
+    def _ring(self, symbol):
+        ring = self.candles.get(symbol)
+        if ring is None:
+            ring = self.candles[symbol] = Ring(self.size)
+        else:
+            ring.count = 0
+        return ring
+
+    def seed(self, symbol, open_time):
+        """История из REST: size закрытых свечей до open_time."""
+        klines = decoder().decode(
+            self.client.futures_klines(symbol=symbol, interval=self.interval, limit=self.size + 1))
+        closed = int(np.searchsorted(klines["open_time"], open_time, "left"))
+        self.load(symbol, {f: a[:closed] for f, a in klines.items()})
+        return self.candles[symbol]
+
+    def load(self, symbol, klines):
+        """Загружает историю символа из готовых массивов (KlineCache.get, KlineDecoder)."""
+        ring = self._ring(symbol)
+        n = min(len(klines["open_time"]), self.size)
+        if n:
+            view = ring.buf[self.size - n:self.size]
+            for j, col in enumerate(STORE_COLUMNS):
+                view[:, j] = klines[col][-n:]
+            ring.buf[2 * self.size - n:] = view
+        ring.end, ring.count = self.size, n
+        return ring.view()
+
+    def extend(self, symbol, klines):
+        """Дописывает закрытые свечи (массивы KlineCache.get) в конец истории символа."""
+        ring = self.candles[symbol]
+        for row in zip(*(klines[f].tolist() for f in STORE_COLUMNS)):
+            ring.append(row)
+
+    def update(self, candle):
+        """
+        Добавляет закрытую свечу из WebSocket (словарь "k").
+        Возвращает True, если свеча просто дописана в конец непрерывной истории.
+        """
+        symbol, open_time = candle["s"], candle["t"]
+        row = ws_row(candle)
+        ring = self.candles.get(symbol)
+        last = ring.last_open_time() if ring is not None else None
+        if last == open_time:
+            ring.replace_last(row)
+            return False
+        appended = last is not None and last + self.interval_ms == open_time
+        if not appended:
+            ring = self.seed(symbol, open_time)
+        ring.append(row)
+        return appended
+
+    def rows(self, symbol):
+        """Свечи символа (count × 6, float64) без копирования."""
+        return self.candles[symbol].view()
+
+    def quote_volume_ratio(self, symbol, lookback):
+        """quote_volume последней свечи к среднему за lookback предыдущих (как признак qv_ratio)."""
+        rows = self.rows(symbol)
+        n = len(rows)
+        prev = rows[max(0, n - 1 - lookback):n - 1]
+        if not len(prev):
+            return math.nan
+        avg = float((prev[:, 4] * prev[:, 5]).mean())
+        return math.inf if avg == 0 else float(rows[-1, 4] * rows[-1, 5]) / avg
+
+    def frame(self, symbol):
+        """Кадр pandas для эталонного кода (bench, разбор); живой путь читает rows() без pandas."""
+        import pandas as pd
+        # без копии: кадр живёт, пока не дописана следующая свеча символа
+        return pd.DataFrame(self.rows(symbol), columns=STORE_COLUMNS, copy=False)
+
+    def nbytes(self):
+        return sum(r.nbytes for r in self.candles.values())
+
+    def drop(self, symbol):
+        self.candles.pop(symbol, None)
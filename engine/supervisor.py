@@ -0,0 +1,282 @@
+"""
+Supervisor: все боты хоста под одним родителем по манифесту (Procfile: worker: python supervisor.py).
+
+    python supervisor.py --manifest bots.json
+
+    {
+      "feed": "127.0.0.1:7200",
+      "stagger_seconds": 5,
+      "ready_timeout": 900,
+      "report_seconds": 3600,
+      "commands": true,
+      "bots": [
+        {"script": "main.py", "config": "config1.json", "cpus": [0], "memory_mb": 500},
+        {"script": "main_spike.py", "config": "confsp1.json", "args": ["--worker-id", "a"]}
+      ]
+    }
+
+feed — хаб общего потока рынка (engine/feed.py) в процессе supervisor: боты получают --feed
+и не открывают свои сокеты; null — у каждого бота свои. kline_cache у ботов общий (рабочая папка),
+так что история, скачанная первым ботом интервала, следующие читают с диска.
+
+Старты по одному: следующий бот запускается после того, как предыдущий прогрелся
+(READY_FILE, engine/runtime.py) или прошло ready_timeout, и ещё stagger_seconds сверху —
+прогревы не делят окно REST на всех сразу. Упавший бот перезапускается с паузой
+5s, 10s, 20s ... до 5 минут (сброс после 10 минут работы) и на старте сам поднимает снимок
+и сделки (engine/snapshot.py, trades_state). cpus — привязка к ядрам (sched_setaffinity),
+memory_mb — предел RSS: бот сверх него получает SIGTERM (снимок на диск) и перезапускается.
+Раз в report_seconds — RSS и CPU по ботам и суммарно. SIGTERM supervisor уходит всем ботам.
+
+commands — команды Telegram /stats и /open (engine/commands.py) опрашивает supervisor, один на
+токен BOT_TOKEN, и отвечает по всем ботам манифеста; сами боты getUpdates не опрашивают.
+"""
+import argparse
+import json
+import os
+import secrets
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from collections import deque
+from threading import Thread
+
+from engine.metrics import cpu_seconds, rss_mb
+
+GRACE = 20            # секунд на SIGTERM до SIGKILL (Heroku даёт 30)
+BACKOFF = (5, 300)    # пауза перед перезапуском: первая и максимальная
+STABLE_AFTER = 600    # столько секунд работы — и счётчик падений сбрасывается
+MEMORY_CHECK = 5      # секунд между проверками RSS
+
+
+class BotProcess:
+    def __init__(self, spec, workdir):
+        self.config = spec["config"]
+        with open(self.config) as f:
+            # NAME — ключ файлов состояния: двум процессам с одним NAME нельзя
+            self.config_name = json.load(f)["NAME"]  # префикс файлов состояния (и воркеров шарда)
+        self.name = spec.get("name") or self.config_name
+        self.cmd = [sys.executable, "-u", spec["script"], "--config", self.config, *spec.get("args", [])]
+        self.cpus = spec.get("cpus")
+        self.memory_mb = spec.get("memory_mb")
+        self.ready_file = os.path.join(workdir, f"ready_{self.name}")
+        self.proc = None
+        self.killing = None  # процесс, которому уже отправлен SIGTERM за память
+        self.started = None
+        self.ready = False
+        self.restarts = 0
+        self.failures = 0   # падений подряд
+        self.retry_at = 0.0
+        self.cpu = (time.monotonic(), 0.0)  # (когда, cpu_seconds) прошлого отчёта
+
+    @property
+    def alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def spawn(self, env):
+        if os.path.exists(self.ready_file):
+            os.remove(self.ready_file)
+        self.proc = subprocess.Popen(self.cmd, env=dict(env, READY_FILE=self.ready_file),
+                                     stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+        self.started = time.monotonic()
+        self.ready = False
+        self.cpu = (self.started, 0.0)
+        Thread(target=self.pump, args=(self.proc,), daemon=True).start()
+        if self.cpus:
+            self.pin()
+        print(f"🚀 {self.name}: запущен, pid {self.proc.pid}")
+
+    def pin(self):
+        if not hasattr(os, "sched_setaffinity"):
+            print(f"⚠️ {self.name}: привязка к ядрам не поддерживается на этой ОС")
+            return
+        cpus = set(self.cpus) & os.sched_getaffinity(0)
+        if not cpus:
+            print(f"⚠️ {self.name}: ядер {self.cpus} нет в доступных {sorted(os.sched_getaffinity(0))}")
+            return
+        try:
+            os.sched_setaffinity(self.proc.pid, cpus)
+        except OSError as e:
+            print(f"⚠️ {self.name}: привязка к ядрам {sorted(cpus)}: {e}")
+
+    def pump(self, proc):
+        # вывод бота в общий лог с префиксом: 13 процессов в одном потоке логов различимы
+        for line in proc.stdout:
+            print(f"[{self.name}] {line}", end="")
+
+    def stop(self, sig=signal.SIGTERM):
+        if self.alive:
+            self.proc.send_signal(sig)
+
+
+class Supervisor:
+    def __init__(self, manifest):
+        self.workdir = tempfile.mkdtemp(prefix="supervisor_")
+        self.bots = [BotProcess(spec, self.workdir) for spec in manifest["bots"]]
+        names = [b.name for b in self.bots]
+        if len(set(names)) != len(names):
+            raise SystemExit(f"NAME ботов в манифесте повторяются: {names}")
+        self.stagger = manifest.get("stagger_seconds", 5)
+        self.ready_timeout = manifest.get("ready_timeout", 900)
+        self.report_every = manifest.get("report_seconds", 3600)
+        self.env = dict(os.environ)
+        self.poller = None
+        if manifest.get("commands", True) and os.getenv("BOT_TOKEN"):
+            from engine.commands import CommandPoller, StateFiles
+            from engine.journal import Telegram
+            names = list(dict.fromkeys(b.config_name for b in self.bots))
+            telegram = Telegram(os.getenv("BOT_TOKEN"), os.getenv("CHAT_ID"))
+            self.poller = CommandPoller(telegram.bot_token, telegram.chat_id,
+                                        StateFiles(names).handlers(), telegram.send)
+            self.env["SUPERVISOR_COMMANDS"] = "1"
+        self.hub = None
+        if manifest.get("feed"):
+            from engine.feed import FeedHub
+            key = secrets.token_hex(16)
+            self.hub = FeedHub(manifest["feed"], key.encode())
+            self.env["FEED_AUTHKEY"] = key
+            for bot in self.bots:
+                bot.cmd += ["--feed", manifest["feed"]]
+        self.pending = deque(self.bots)  # очередь стартов, по одному
+        self.starting = None
+        self.next_start = 0.0
+        self.stopping = False
+
+    # ================= СТАРТЫ =================
+    def step_starts(self, now):
+        bot = self.starting
+        if bot is not None:
+            if os.path.exists(bot.ready_file):
+                bot.ready = True
+                print(f"✅ {bot.name}: прогрет за {now - bot.started:.0f}s")
+            elif bot.alive and now - bot.started < self.ready_timeout:
+                return
+            elif bot.alive:
+                print(f"⚠️ {bot.name}: не прогрелся за {self.ready_timeout}s, запускаю следующего")
+            self.starting = None
+            self.next_start = now + self.stagger
+        # упавший бот в паузе перед перезапуском не держит очередь
+        due = [b for b in self.pending if b.retry_at <= now]
+        if not due or now < self.next_start:
+            return
+        bot = due[0]
+        self.pending.remove(bot)
+        bot.spawn(self.env)
+        self.starting = bot
+
+    def step_exits(self, now):
+        for bot in self.bots:
+            if bot.proc is None or bot.alive or bot in self.pending:
+                continue
+            if now - bot.started >= STABLE_AFTER:
+                bot.failures = 0
+            delay = min(BACKOFF[0] * 2 ** bot.failures, BACKOFF[1])
+            bot.failures += 1
+            bot.restarts += 1
+            bot.retry_at = now + delay
+            print(f"🔴 {bot.name}: вышел с кодом {bot.proc.returncode} после {now - bot.started:.0f}s, "
+                  f"перезапуск через {delay}s")
+            self.pending.append(bot)
+
+    def step_memory(self):
+        for bot in self.bots:
+            if not bot.memory_mb or not bot.alive or bot.killing is bot.proc:
+                continue
+            rss = rss_mb(bot.proc.pid)
+            if rss > bot.memory_mb:
+                print(f"🧯 {bot.name}: RSS {rss:.0f}MB > {bot.memory_mb}MB, перезапуск со снимком")
+                self.terminate(bot)
+
+    def terminate(self, bot):
+        """SIGTERM (бот пишет снимок), через GRACE — SIGKILL. Не ждёт: выход подхватит step_exits."""
+        bot.stop()
+        proc = bot.killing = bot.proc
+
+        def kill():
+            try:
+                proc.wait(GRACE)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+        Thread(target=kill, daemon=True).start()
+
+    # ================= ОТЧЁТ =================
+    def report(self):
+        now = time.monotonic()
+        lines, total_rss, total_cpu = [], 0.0, 0.0
+        for bot in self.bots:
+            if not bot.alive:
+                lines.append(f"  {bot.name}: не работает, перезапусков {bot.restarts}")
+                continue
+            rss = rss_mb(bot.proc.pid)
+            cpu = cpu_seconds(bot.proc.pid)
+            since, cpu_before = bot.cpu
+            load = (cpu - cpu_before) / max(now - since, 1e-9) * 100
+            bot.cpu = (now, cpu)
+            total_rss += rss
+            total_cpu += load
+            limit = f"/{bot.memory_mb}" if bot.memory_mb else ""
+            lines.append(f"  {bot.name}: RSS {rss:.0f}{limit}MB, CPU {load:.1f}%, "
+                         f"аптайм {(now - bot.started) / 60:.0f}м, перезапусков {bot.restarts}"
+                         + ("" if bot.ready else ", прогрев"))
+        alive = sum(b.alive for b in self.bots)
+        head = (f"📦 Supervisor: ботов {alive}/{len(self.bots)}, RSS {total_rss + rss_mb():.0f}MB "
+                f"(supervisor {rss_mb():.0f}MB), CPU {total_cpu:.1f}%")
+        if self.hub is not None:
+            head += f", поток: {len(self.hub.opened)} сокет-потоков, переслано {self.hub.forwarded}"
+        print("\n".join([head] + lines))
+
+    # ================= ЦИКЛ =================
+    def shutdown(self, signum=None, frame=None):
+        self.stopping = True
+
+    def stop_all(self):
+        print("🛑 Supervisor: остановка ботов")
+        for bot in self.bots:
+            bot.stop()
+        deadline = time.monotonic() + GRACE
+        for bot in self.bots:
+            if bot.proc is None:
+                continue
+            try:
+                bot.proc.wait(max(deadline - time.monotonic(), 0))
+            except subprocess.TimeoutExpired:
+                print(f"⚠️ {bot.name}: не вышел за {GRACE}s, SIGKILL")
+                bot.proc.kill()
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.shutdown)
+        signal.signal(signal.SIGINT, self.shutdown)
+        if self.hub is not None:
+            self.hub.start()
+        if self.poller is not None:
+            Thread(target=self.poller.run, daemon=True).start()
+        print(f"🧭 Supervisor: {len(self.bots)} ботов, пауза между стартами {self.stagger}s")
+        memory_at = report_at = time.monotonic()
+        while not self.stopping:
+            now = time.monotonic()
+            self.step_exits(now)
+            self.step_starts(now)
+            if now - memory_at >= MEMORY_CHECK:
+                memory_at = now
+                self.step_memory()
+            if now - report_at >= self.report_every:
+                report_at = now
+                self.report()
+            time.sleep(1)
+        self.stop_all()
+
+
+def main(argv=None):
+    from dotenv import load_dotenv
+    from engine.market import use_endpoint
+
+    parser = argparse.ArgumentParser(description="Все боты хоста по манифесту")
+    parser.add_argument("--manifest", default="bots.json")
+    args = parser.parse_args(argv)
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+    load_dotenv()
+    use_endpoint()
+    Supervisor(manifest).run()
@@ -0,0 +1,66 @@
+"""
+Свинги по потоку: сколько свечей назад был low ниже (high выше) последней закрытой свечи.
+
+Для каждого символа держится монотонный стек: лоу в нём строго возрастают снизу вверх,
+всё, что не ниже новой свечи, уже никогда не станет "ближайшим более низким" и выбрасывается.
+Обновление — амортизированное O(1) на закрытие вместо прохода по истории через df.iloc.
+Окно то же, что у CandleStore: свечи старше size последних не учитываются.
+"""
+import math
+from collections import deque
+
+
+class SwingTracker:
+    def __init__(self, size):
+        self.size = size
+        self.count = {}   # symbol -> номер последней свечи
+        self.lows = {}    # symbol -> deque[(номер, low)], low строго возрастает
+        self.highs = {}   # symbol -> deque[(номер, high)], high строго убывает
+        self.bars_since = {}  # symbol -> (bars_since_lower_low, bars_since_higher_high)
+
+    def update(self, symbol, rows, appended):
+        """
+        rows — история символа из CandleStore (open_time, o, h, l, c, v).
+        appended=False — история перезагружена или свеча заменена: стек строится заново.
+        """
+        if appended and symbol in self.count:
+            self._push(symbol, rows[-1])
+            return
+        self.count[symbol] = -1
+        self.lows[symbol] = deque()
+        self.highs[symbol] = deque()
+        for row in rows:
+            self._push(symbol, row)
+
+    def _push(self, symbol, row):
+        n = self.count[symbol] + 1
+        self.count[symbol] = n
+        first = n - self.size + 1  # самая старая свеча окна
+        high, low = float(row[2]), float(row[3])
+
+        lows = self.lows[symbol]
+        while lows and lows[-1][1] >= low:
+            lows.pop()
+        while lows and lows[0][0] < first:
+            lows.popleft()
+        since_low = n - lows[-1][0] if lows else math.inf
+        lows.append((n, low))
+
+        highs = self.highs[symbol]
+        while highs and highs[-1][1] <= high:
+            highs.pop()
+        while highs and highs[0][0] < first:
+            highs.popleft()
+        since_high = n - highs[-1][0] if highs else math.inf
+        highs.append((n, high))
+
+        self.bars_since[symbol] = (float(since_low), float(since_high))
+
+    def drop(self, symbol):
+        for state in (self.count, self.lows, self.highs, self.bars_since):
+            state.pop(symbol, None)
+
+
+def first_swing(bars_since, n):
+    """Номер ближайшей свечи со свингом среди n предыдущих (1=предыдущая) или 0."""
+    return int(bars_since) if n and bars_since <= n else 0
@@ -0,0 +1,73 @@
+"""
+Очередь сообщений WebSocket -> воркер свечей с пределом и слиянием по символу.
+
+Незакрытые обновления свечи движку не нужны (сигналы и TP/SL — только на закрытии), поэтому
+Engine.handle_kline отбрасывает их ещё в потоке сокета, до очереди. В очередь попадают закрытые
+свечи, ошибки сокета и команды воркеру, по порядку. Пока в очереди меньше QUEUE_MAX сообщений,
+каждая закрытая свеча — отдельный элемент.
+
+Сверх QUEUE_MAX у символа в очереди одна ждущая ячейка: новая закрытая свеча встаёт в неё
+вместо ждущей (на её место в очереди), а диапазон слитых свечей копится в "mh"/"ml" — общий
+максимум high и минимум low. Engine.process_batch проверяет TP/SL по этому диапазону, так что
+цены пропущенных свечей не теряются; история символа видит дыру и перезагружается из REST
+(CandleStore.update), старшие ТФ — дозапросом корзины (engine/aggregate.py). Очередь не длиннее
+QUEUE_MAX плюс по ячейке на символ; put не блокирует поток сокета.
+
+Свечи, до которых воркер дошёл позже STALE_BAR_SECONDS после закрытия, проверяются
+на TP/SL и пишутся в историю как обычно, а сигнал по ним пропускается или помечается
+(STALE_SIGNALS, Engine.on_closed_bar). Счётчики METRICS: queue_shed (слитые свечи),
+queue_overflow (свечи символов без ждущей ячейки сверх QUEUE_MAX), stale_bars, stale_signals.
+"""
+from queue import Queue
+
+from engine.metrics import METRICS
+
+
+def _closed_kline(msg):
+    data = msg.get("data") if isinstance(msg, dict) else None
+    k = data.get("k") if isinstance(data, dict) else None
+    return k if k is not None and k.get("x") else None
+
+
+def merge_bars(old, new):
+    """Закрытая свеча new вместо ждущей old того же символа; диапазон обеих — в mh/ml."""
+    new["mh"] = max(old.get("mh", float(old["h"])), float(new["h"]))
+    new["ml"] = min(old.get("ml", float(old["l"])), float(new["l"]))
+    new["shed"] = old.get("shed", 0) + 1
+    return new
+
+
+class BarQueue(Queue):
+    def __init__(self, maxsize=0):
+        super().__init__()  # put не блокирует поток сокета: предел соблюдается слиянием
+        self.limit = maxsize
+        self.pending = {}   # symbol -> ячейка последней закрытой свечи символа в очереди
+
+    def put(self, item, block=True, timeout=None):
+        k = _closed_kline(item)
+        with self.not_empty:
+            if self.limit and self._qsize() >= self.limit:
+                cell = self.pending.get(k["s"]) if k is not None else None
+                if cell is not None:
+                    merge_bars(_closed_kline(cell[0]), k)
+                    cell[0] = item
+                    METRICS.inc("queue_shed")
+                    return
+                METRICS.inc("queue_overflow")
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def _put(self, item):
+        cell = [item]
+        k = _closed_kline(item)
+        if k is not None:
+            self.pending[k["s"]] = cell
+        self.queue.append(cell)
+
+    def _get(self):
+        cell = self.queue.popleft()
+        k = _closed_kline(cell[0])
+        if k is not None and self.pending.get(k["s"]) is cell:
+            del self.pending[k["s"]]
+        return cell[0]
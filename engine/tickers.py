@@ -0,0 +1,63 @@
+"""
+24h объём фьючерсов в памяти из потока !miniTicker@arr.
+
+Одна таблица на бота заменяет REST: ticker/24hr раз в час (вселенная, MIN_24H_VOLUME)
+и futures_ticker на каждый сигнал (VOL 24h). Поток присылает раз в секунду тикеры,
+изменившиеся за эту секунду, поэтому таблица засевается одним ticker/24hr на старте.
+Если поток молчит дольше max_age секунд, таблица считается устаревшей и
+вызывающий код идёт в REST, как раньше. Символ, о котором ни поток, ни REST не сообщали
+дольше max_age (делистинг, торги остановлены), в liquid() и get() не попадает.
+"""
+import math
+import time
+
+from engine.config import BLACKLIST
+
+
+def liquid_symbols(volumes, min_volume):
+    """USDT-символы вне BLACKLIST с 24h объёмом не ниже min_volume, в порядке volumes."""
+    return [s for s, q in volumes.items()
+            if s.endswith("USDT") and s not in BLACKLIST and q >= min_volume]
+
+
+class TickerTable:
+    def __init__(self, max_age=300, clock=time.monotonic):
+        self.max_age = max_age
+        self.clock = clock
+        self.quote_volume = {}  # symbol -> 24h объём в USDT
+        self.seen = {}          # symbol -> время последнего обновления символа (clock)
+        self.updated = None     # время последнего обновления таблицы (clock)
+
+    def seed(self, tickers):
+        """Ответ REST ticker/24hr."""
+        now = self.clock()
+        for t in tickers:
+            self.quote_volume[t["symbol"]] = float(t["quoteVolume"])
+            self.seen[t["symbol"]] = now
+        self.updated = now
+
+    def update(self, msg):
+        """Сообщение !miniTicker@arr (как есть или в обёртке multiplex-потока)."""
+        data = msg.get("data") if isinstance(msg, dict) else msg
+        if not isinstance(data, list):
+            return
+        now = self.clock()
+        for t in data:
+            self.quote_volume[t["s"]] = float(t["q"])
+            self.seen[t["s"]] = now
+        self.updated = now
+
+    def fresh(self):
+        return self.updated is not None and self.clock() - self.updated < self.max_age
+
+    def liquid(self, min_volume):
+        # список — поток сокета дописывает таблицу, пока её читают
+        cutoff = self.clock() - self.max_age
+        return liquid_symbols({s: q for s, q in list(self.quote_volume.items())
+                               if self.seen.get(s, cutoff) > cutoff}, min_volume)
+
+    def get(self, symbol):
+        """24h объём символа или None, если таблица или символ устарели или символа в ней нет."""
+        if not self.fresh() or self.clock() - self.seen.get(symbol, -math.inf) >= self.max_age:
+            return None
+        return self.quote_volume.get(symbol)
@@ -0,0 +1,354 @@
+import json
+import os
+from datetime import datetime
+from threading import Lock
+
+import numpy as np
+
+from engine.stats import PerformanceStats
+
+SIDES = {"BUY": 1, "SELL": -1}
+SIDE_NAMES = {1: "BUY", -1: "SELL"}
+
+
+class OpenTrades:
+    """
+    Открытые сделки столбцами: по строке на сделку, по столбцу tp/sl на стратегию.
+    Статус стратегий — битовые маски: open (бит j = стратегия j ещё открыта)
+    и tp (бит j = стратегия j закрылась по TP, закрытая без этого бита — по SL).
+    Закрытая сделка удаляется перестановкой последней строки на её место.
+    """
+
+    def __init__(self, strategy_names, capacity=64):
+        self.names = list(strategy_names)
+        self.symbol_ids = {}
+        self.symbol_names = []
+        self.n = 0
+        self._alloc(capacity)
+
+    def _alloc(self, capacity):
+        k = len(self.names)
+        old = self.n
+        arrays = {
+            "trade_id": np.zeros(capacity, dtype=np.int64),
+            "symbol":   np.zeros(capacity, dtype=np.int32),
+            "side":     np.zeros(capacity, dtype=np.int8),
+            "entry":    np.zeros(capacity, dtype=np.float64),
+            "tp":       np.zeros((capacity, k), dtype=np.float64),
+            "sl":       np.zeros((capacity, k), dtype=np.float64),
+            "open":     np.zeros(capacity, dtype=np.uint32),
+            "tp_hit":   np.zeros(capacity, dtype=np.uint32),
+        }
+        for name, arr in arrays.items():
+            if old:
+                arr[:old] = getattr(self, name)[:old]
+            setattr(self, name, arr)
+        self.open_time = (self.open_time[:old] if old else []) + [None] * (capacity - old)
+        self.signal = (self.signal[:old] if old else []) + [None] * (capacity - old)
+
+    def symbol_id(self, symbol):
+        sid = self.symbol_ids.get(symbol)
+        if sid is None:
+            sid = self.symbol_ids[symbol] = len(self.symbol_names)
+            self.symbol_names.append(symbol)
+        return sid
+
+    def add_entry(self, tid, trade):
+        """Сделка в формате to_dict. Стратегии не из names пропускаются."""
+        tp = np.zeros(len(self.names))
+        sl = np.zeros(len(self.names))
+        open_mask = tp_mask = 0
+        for j, name in enumerate(self.names):
+            strat = trade["strategies"].get(name)
+            if strat is None:
+                continue
+            tp[j], sl[j] = strat["tp"], strat["sl"]
+            if strat["status"] == "OPEN":
+                open_mask |= 1 << j
+            elif strat["status"] == "TP":
+                tp_mask |= 1 << j
+        if open_mask:
+            self.add(int(tid), trade["symbol"], trade["side"], trade["entry_price"],
+                     tp, sl, open_mask, tp_mask, trade.get("open_time"), trade.get("signal", ""))
+
+    def pop_symbols(self, symbols):
+        """Вынимает сделки символов (формат to_dict) — символ переходит к другому воркеру."""
+        active = {tid: t for tid, t in self.to_dict().items() if t["symbol"] in symbols}
+        ids = {int(tid) for tid in active}
+        for i in sorted((i for i in range(self.n) if int(self.trade_id[i]) in ids), reverse=True):
+            self.remove(i)
+        return active
+
+    def add(self, trade_id, symbol, side, entry_price, tp, sl, open_mask, tp_mask, open_time, signal=""):
+        if self.n == len(self.entry):
+            self._alloc(len(self.entry) * 2)
+        i = self.n
+        self.trade_id[i] = trade_id
+        self.symbol[i] = self.symbol_id(symbol)
+        self.side[i] = SIDES[side]
+        self.entry[i] = entry_price
+        self.tp[i] = tp
+        self.sl[i] = sl
+        self.open[i] = open_mask
+        self.tp_hit[i] = tp_mask
+        self.open_time[i] = open_time
+        self.signal[i] = signal
+        self.n += 1
+
+    def remove(self, i):
+        last = self.n - 1
+        if i != last:
+            for arr in (self.trade_id, self.symbol, self.side, self.entry, self.tp, self.sl, self.open, self.tp_hit):
+                arr[i] = arr[last]
+            self.open_time[i] = self.open_time[last]
+            self.signal[i] = self.signal[last]
+        self.open_time[last] = None
+        self.signal[last] = None
+        self.n = last
+
+    def rows(self, symbol):
+        """Строки открытых сделок символа в порядке trade_id."""
+        sid = self.symbol_ids.get(symbol)
+        if sid is None or not self.n:
+            return np.empty(0, dtype=np.intp)
+        rows = np.flatnonzero(self.symbol[:self.n] == sid)
+        return rows[np.argsort(self.trade_id[rows], kind="stable")]
+
+    def resolve(self, symbol, price_high, price_low, record=None):
+        """
+        Одно векторное сравнение всех стратегий всех сделок символа со свечой.
+        SL проверяется первым. Возвращает [(trade_id, strat_name, result, close_price, pnl), ...]
+        и закрывает сделки, у которых не осталось открытых стратегий.
+        record(strat_name, signal, result, pnl) вызывается на каждое закрытие (engine/stats.py).
+        """
+        rows = self.rows(symbol)
+        if not rows.size:
+            return [], 0
+        k = len(self.names)
+        buy = (self.side[rows] == 1)[:, None]
+        tp, sl = self.tp[rows], self.sl[rows]
+        bits = np.uint32(1) << np.arange(k, dtype=np.uint32)
+        is_open = (self.open[rows][:, None] & bits) != 0
+
+        sl_hit = is_open & np.where(buy, price_low <= sl, price_high >= sl)
+        tp_hit = is_open & ~sl_hit & np.where(buy, price_high >= tp, price_low <= tp)
+        if not (sl_hit.any() or tp_hit.any()):
+            return [], 0
+
+        events = []
+        entry = self.entry[rows]
+        for r, j in zip(*np.nonzero(sl_hit | tp_hit)):
+            i = rows[r]
+            result = "SL" if sl_hit[r, j] else "TP"
+            close_price = float(sl[r, j] if result == "SL" else tp[r, j])
+            pnl = (close_price - float(entry[r])) / float(entry[r]) * 100
+            if not buy[r, 0]:
+                pnl = -pnl
+            events.append((f"{int(self.trade_id[i]):05d}", self.names[j], result, close_price, round(pnl, 2)))
+            if record is not None:
+                record(self.names[j], self.signal[i], result, round(pnl, 2))
+
+        self.open[rows] &= ~(sl_hit | tp_hit).dot(bits).astype(np.uint32)
+        self.tp_hit[rows] |= tp_hit.dot(bits).astype(np.uint32)
+
+        # удаляем с конца, чтобы перестановка не задела ещё не удалённые строки
+        closed = sorted(rows[self.open[rows] == 0], reverse=True)
+        for i in closed:
+            self.remove(i)
+        return events, len(closed)
+
+    # ================= JSON (прежний формат active_trades) =================
+    def to_dict(self):
+        active = {}
+        for i in sorted(range(self.n), key=lambda i: self.trade_id[i]):
+            strategies = {}
+            for j, name in enumerate(self.names):
+                bit = 1 << j
+                if self.open[i] & bit:
+                    status = "OPEN"
+                elif self.tp_hit[i] & bit:
+                    status = "TP"
+                else:
+                    status = "SL"
+                strategies[name] = {"tp": float(self.tp[i, j]), "sl": float(self.sl[i, j]), "status": status}
+            active[f"{int(self.trade_id[i]):05d}"] = {
+                "symbol":      self.symbol_names[self.symbol[i]],
+                "side":        SIDE_NAMES[int(self.side[i])],
+                "entry_price": float(self.entry[i]),
+                "strategies":  strategies,
+                "open_time":   self.open_time[i],
+                "signal":      self.signal[i],
+            }
+        return active
+
+    @classmethod
+    def from_dict(cls, active, strategy_names):
+        # стратегии из старого файла, которых уже нет в STRATEGIES, доигрываются до закрытия
+        names = list(strategy_names)
+        for trade in active.values():
+            for name in trade["strategies"]:
+                if name not in names:
+                    names.append(name)
+        table = cls(names, capacity=max(64, len(active)))
+        for tid, trade in active.items():
+            table.add_entry(tid, trade)
+        return table
+
+
+def write_json(path, data):
+    # tmp + os.replace: убитый посреди записи процесс не оставляет обрезанный файл
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+class TradeBook:
+    """
+    Открытые сделки (OpenTrades), счётчик trade_id, отметки кулдауна (engine/counters.py)
+    и итоги закрытий (engine/stats.py) бота.
+    ACTIVE_TRADES хранится в active_trades_{BOT}.json в прежнем формате (плюс тип сигнала),
+    счётчик, отметки и итоги — в trades_state_{BOT}.json (старые файлы подхватываются как есть).
+    open_trade/resolve только помечают dirty; на диск пишет flush — в критической полосе,
+    в конце пачки и до того, как Telegram и Excel (отложенные полосы) увидят новые trade_id:
+    после падения бот не выдаст уже отправленный номер второй раз.
+    """
+
+    def __init__(self, bot_name, strategies):
+        self.strategies = strategies
+        self.state_file = f"trades_state_{bot_name}.json"
+        self.active_file = f"active_trades_{bot_name}.json"
+        self.lock = Lock()
+        self._id_lock = Lock()
+        self.table = OpenTrades.from_dict(self.load_active_trades(), strategies)
+        self._state_lock = Lock()
+        state = self.load_state()
+        self.last_trade_id = state.get("last_trade_id", 0)
+        self.bar_marks = state.get("bar_marks", {})
+        self.stats = PerformanceStats(bot_name, state.get("stats"))
+        self.changes = 0  # изменений с запуска; saved — сколько из них уже на диске
+        self.saved = 0
+        self.allocate = None  # внешний источник trade_id (координатор шардов, engine/shard.py)
+
+    # ================= PERSISTENCE =================
+    def load_state(self):
+        if not os.path.exists(self.state_file):
+            return {}
+        with open(self.state_file, "r") as f:
+            return json.load(f)
+
+    @property
+    def dirty(self):
+        return self.changes != self.saved
+
+    @dirty.setter
+    def dirty(self, value):
+        if value:
+            self.changes += 1
+        else:
+            self.saved = self.changes
+
+    def marks(self):
+        # копия под lock: отметки меняют воркер (counters.mark) и передача символов (adopt/export)
+        with self.lock:
+            return {s: dict(m) for s, m in list(self.bar_marks.items())}
+
+    def state(self):
+        return {"last_trade_id": self.last_trade_id, "bar_marks": self.marks(), "stats": self.stats.to_dict()}
+
+    def save_state(self):
+        with self._state_lock:
+            write_json(self.state_file, self.state())
+
+    def save_active_trades(self):
+        with self.lock:
+            active = self.table.to_dict()
+        with self._state_lock:
+            write_json(self.active_file, active)
+
+    def flush(self):
+        """Сохраняет состояние и открытые сделки, если они менялись. Изменения во время записи не теряются."""
+        if not self.dirty:
+            return
+        changes = self.changes
+        self.save_state()
+        self.save_active_trades()
+        self.saved = changes  # только после os.replace обоих файлов: упавшая запись повторится
+
+    def load_active_trades(self):
+        if not os.path.exists(self.active_file):
+            return {}
+        with open(self.active_file, "r") as f:
+            return json.load(f)
+
+    def get_next_trade_id(self):
+        if self.allocate is not None:
+            return f"{self.allocate():05d}"
+        with self._id_lock:
+            self.last_trade_id += 1
+            tid = self.last_trade_id
+        self.dirty = True
+        return f"{tid:05d}"
+
+    # ================= TRADES =================
+    def levels(self, side, entry_price):
+        strategies = {}
+        for name, strat_cfg in self.strategies.items():
+            if side == "BUY":
+                tp = entry_price * (1 + strat_cfg["tp"])
+                sl = entry_price * (1 - abs(strat_cfg["sl"]))
+            else:
+                tp = entry_price * (1 - strat_cfg["tp"])
+                sl = entry_price * (1 + abs(strat_cfg["sl"]))
+            strategies[name] = {"tp": tp, "sl": sl, "status": "OPEN"}
+        return strategies
+
+    def open_trade(self, symbol, side, entry_price, signal=""):
+        """Регистрирует сделку. signal — тип сигнала для итогов. Возвращает (trade_id, strategies)."""
+        trade_id = self.get_next_trade_id()
+        strategies = self.levels(side, entry_price)
+        names = self.table.names
+        tp = np.zeros(len(names))
+        sl = np.zeros(len(names))
+        open_mask = 0
+        for j, name in enumerate(names):
+            if name in strategies:
+                tp[j], sl[j] = strategies[name]["tp"], strategies[name]["sl"]
+                open_mask |= 1 << j
+        with self.lock:
+            self.table.add(int(trade_id), symbol, side, entry_price, tp, sl, open_mask, 0,
+                           datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"), signal)
+        self.dirty = True
+        return trade_id, strategies
+
+    def export(self, symbols):
+        """Открытые сделки и отметки кулдауна символов для передачи другому воркеру."""
+        symbols = set(symbols)
+        with self.lock:
+            active = self.table.pop_symbols(symbols)
+            marks = {s: self.bar_marks.pop(s) for s in symbols if s in self.bar_marks}
+        if active or marks:
+            self.dirty = True
+        return {"trades": active, "marks": marks}
+
+    def adopt(self, handoff):
+        """Принимает export() другого воркера; уже известные trade_id не дублируются."""
+        with self.lock:
+            known = set(self.table.trade_id[:self.table.n].tolist())
+            for tid, trade in handoff["trades"].items():
+                if int(tid) not in known:
+                    self.table.add_entry(tid, trade)
+            self.bar_marks.update(handoff["marks"])
+        self.dirty = True
+
+    def resolve(self, symbol, price_high, price_low):
+        """
+        Закрывает стратегии, по которым свеча задела TP или SL (SL проверяется первым).
+        Возвращает [(trade_id, strat_name, result, close_price, pnl), ...].
+        """
+        with self.lock:
+            events, closed = self.table.resolve(symbol, price_high, price_low, self.stats.record)
+
+        if events:
+            self.dirty = True  # итоги изменились, даже если у сделки остались открытые стратегии
+        return events
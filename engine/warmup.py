@@ -0,0 +1,135 @@
+"""
+Прогрев перед запуском сокетов: история свечей, свинги и HTF по всей вселенной параллельно,
+закрытые свечи BTC для корреляции (Engine.btc) — первый сигнал докачивает только их хвост.
+
+История берётся из kline_cache (engine/klinecache.py) — после перезапуска докачивается только
+хвост с момента остановки. Все REST-запросы идут через RestBudget (REST_WEIGHT_BUDGET веса в минуту),
+так что прогрев не упирается в лимит Binance, как раньше первая свеча после старта.
+Символы, которые не прогрелись, догружаются как раньше — при первой закрытой свече.
+С BASE_INTERVAL текущие корзины старших ТФ заполняются базовыми свечами с их начала,
+чтобы первая же собранная свеча после старта была полной. Спайки последних COOLDOWN_BARS
+свечей истории отмечаются в счётчиках (engine/counters.py), как если бы бот их видел.
+"""
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from engine import kernels
+from engine.klinecache import KlineCache
+from engine.klines import decoder
+from engine.market import kline_weight
+from engine.metrics import METRICS
+
+
+def prime_buckets(engine, symbol, now_ms):
+    """Базовые свечи от начала самой длинной текущей корзины до now_ms в Aggregator."""
+    agg = engine.aggregator
+    base_now = now_ms // agg.base_ms * agg.base_ms
+    longest = max(step for step, _, _ in agg.targets.values())
+    start = base_now // longest * longest
+    limit = (base_now - start) // agg.base_ms
+    if not limit:
+        return
+    engine.budget.acquire(kline_weight(limit))
+    klines = engine.client.futures_klines(symbol=symbol, interval=agg.base,
+                                          startTime=start, endTime=base_now - 1, limit=limit)
+    agg.prime(symbol, decoder().decode(klines))
+
+
+def restored_rows(engine, cache, symbol, open_now):
+    """История из снимка + свечи после него. None, если снимка по символу нет или хвост не докачался."""
+    ms = engine.store.interval_ms
+    ring = engine.store.candles.get(symbol)
+    last = ring.last_open_time() if ring is not None else None
+    if last is None or not open_now - engine.store.size * ms <= last < open_now:
+        return None
+    if last < open_now - ms:
+        gap = cache.get(symbol, last + ms, open_now - ms)
+        if len(gap["open_time"]) != (open_now - ms - last) // ms:
+            return None
+        engine.store.extend(symbol, gap)
+    return engine.store.rows(symbol)
+
+
+def mark_recent_spikes(engine, symbol, rows):
+    """
+    Отметка спайка по последним COOLDOWN_BARS свечам истории: каждая — против среднего своих
+    VOLUME_LOOKBACK предыдущих (как qv_ratio при VOLUME_BASELINE = "mean"; для остальных баз —
+    приближение). После холодного старта или простоя отметок нет или они старые, и кулдаун
+    по спайкам (bars_since_spike) пропустил бы свечу сразу после спайка.
+    """
+    n = engine.p.COOLDOWN_BARS
+    if n <= 0 or len(rows) < 2:
+        return
+    qv = rows[:, 4] * rows[:, 5]
+    csum = np.concatenate(([0.0], np.cumsum(qv)))
+    lookback = engine.p.VOLUME_LOOKBACK
+    for i in range(len(rows) - 1, max(len(rows) - 1 - n, 0), -1):  # от свежей к старой
+        lo = max(0, i - lookback)
+        avg = (csum[i] - csum[lo]) / (i - lo)
+        if (math.inf if avg == 0 else qv[i] / avg) >= engine.p.SPIKE_MULT:
+            t = int(rows[i, 0])
+            if engine.counters.bars_since(symbol, "spike", t) > 0:  # отметка из состояния не новее
+                engine.counters.mark(symbol, "spike", t)
+                engine.trades.dirty = True
+            return
+
+
+def warm_symbol(engine, cache, symbol, open_now):
+    """История size закрытых свечей до open_now + свинги + HTF. True, если символ готов."""
+    ms = engine.store.interval_ms
+    rows = restored_rows(engine, cache, symbol, open_now)
+    if rows is None:
+        klines = cache.get(symbol, open_now - engine.store.size * ms, open_now - ms)
+        if not len(klines["open_time"]) or klines["open_time"][-1] != open_now - ms:
+            return False
+        rows = engine.store.load(symbol, klines)
+    engine.swings.update(symbol, rows, False)
+    if engine.volume_quantiles is not None:
+        engine.volume_quantiles.update(symbol, rows, False)
+    if engine.volume_windows is not None:
+        engine.volume_windows.update(symbol, rows, False)
+    mark_recent_spikes(engine, symbol, rows)
+    if engine.aggregator is not None:
+        prime_buckets(engine, symbol, int(engine.clock() * 1000))
+    if engine.uses_htf:
+        # ключ часа тот же, что у признака на ближайшем закрытии: (t + интервал) // 1ч
+        if engine.htf_emas(symbol, open_now // 3_600_000) is None:
+            return False
+    return True
+
+
+def warm_up(engine):
+    """Прогревает engine.symbols. Возвращает (готовых, всего, секунд)."""
+    start = time.perf_counter()
+    ms = engine.store.interval_ms
+    open_now = int(engine.clock() * 1000) // ms * ms  # свеча, которая сейчас формируется
+    cache = KlineCache(engine.client, engine.interval, engine.p.KLINE_CACHE,
+                       budget=engine.budget, clock=engine.clock)
+    symbols = list(engine.symbols)
+    kernels.compiled()  # компиляция numba — до первой свечи, а не на ней
+
+    def job(symbol):
+        try:
+            return warm_symbol(engine, cache, symbol, open_now)
+        except Exception as e:
+            print(f"Ошибка прогрева {symbol}: {e}")
+            return False
+
+    def btc():
+        try:
+            engine.btc.seed(cache.get("BTCUSDT", open_now - engine.btc.limit * ms, open_now - ms))
+        except Exception as e:
+            print(f"Ошибка прогрева BTC: {e}")
+
+    with ThreadPoolExecutor(max_workers=engine.p.WARMUP_WORKERS) as pool:
+        ready = sum(pool.map(job, symbols))
+    btc()  # после пула: BTCUSDT из вселенной уже в кэше, и файл кэша не пишут два потока
+
+    elapsed = time.perf_counter() - start
+    METRICS.set("warmup_s", round(elapsed, 2))
+    METRICS.set("warmup_ready", ready)
+    METRICS.set("warmup_symbols", len(symbols))
+    return ready, len(symbols), elapsed
@@ -0,0 +1,81 @@
+"""
+Среднее, std и z-score объёма по нескольким окнам сразу — префиксные суммы по символу.
+
+На каждую свечу в кольцо символа дописывается одна строка префиксных сумм
+[quote_volume, quote_volume², log1p(qv), log1p(qv)²] с начала истории.
+Сумма любого окна из w свечей — разность двух строк кольца, поэтому mean/std/z
+считаются за O(1) на окно, сколько бы окон (VOLUME_WINDOWS и окна из правил) ни было.
+
+Окно — w свечей перед последней закрытой (как у avg_vol), std — выборочный (ddof=1,
+как rolling().std()). Суммы растут с историей: раз в REBUILD_BARS свечей и при
+перезагрузке истории кольцо строится заново из CandleStore — без накопления ошибки.
+"""
+import math
+
+import numpy as np
+
+REBUILD_BARS = 1 << 16
+
+
+def window_columns(windows):
+    """[(заголовок Excel, ключ признака), ...] — z-score окон VOLUME_WINDOWS в строке сделки."""
+    return [(title.format(w), f"{key}_{w}") for w in windows
+            for title, key in (("z объёма {}", "vol_z"), ("z log объёма {}", "logvol_z"))]
+
+
+class VolumeWindows:
+    def __init__(self, windows):
+        self.windows = sorted(set(windows))
+        self.capacity = self.windows[-1] + 2  # префикс до начала самого длинного окна + текущая свеча
+        self.prefix = {}  # symbol -> float64 (capacity × 4), строка k % capacity — сумма первых k свечей
+        self.count = {}   # symbol -> k последней записанной строки (свечей с начала отсчёта)
+
+    def update(self, symbol, rows, appended):
+        """
+        rows — история символа из CandleStore (open_time, o, h, l, c, v).
+        appended=False — история перезагружена или свеча заменена: кольцо строится заново.
+        """
+        n = self.count.get(symbol)
+        if appended and n is not None and n < REBUILD_BARS:
+            prefix = self.prefix[symbol]
+            qv = float(rows[-1, 4] * rows[-1, 5])
+            lv = math.log1p(qv)
+            prefix[(n + 1) % self.capacity] = prefix[n % self.capacity] + (qv, qv * qv, lv, lv * lv)
+            self.count[symbol] = n + 1
+            return
+        tail = rows[-(self.capacity - 1):]
+        qv = tail[:, 4] * tail[:, 5]
+        lv = np.log1p(qv)
+        prefix = self.prefix.get(symbol)
+        if prefix is None:
+            prefix = self.prefix[symbol] = np.zeros((self.capacity, 4))
+        prefix[0] = 0.0
+        prefix[1:len(tail) + 1] = np.cumsum(np.column_stack([qv, qv * qv, lv, lv * lv]), axis=0)
+        self.count[symbol] = len(tail)
+
+    def stats(self, symbol, window):
+        """(mean, std, mean log, std log) quote_volume за window свечей перед последней; nan, если их < 2."""
+        n = self.count.get(symbol)
+        if n is None or window > self.capacity - 2:
+            return (math.nan,) * 4
+        w = min(window, n - 1)
+        if w < 2:
+            return (math.nan,) * 4
+        prefix = self.prefix[symbol]
+        s, s2, l, l2 = (prefix[(n - 1) % self.capacity] - prefix[(n - 1 - w) % self.capacity]).tolist()
+        return s / w, _std(s, s2, w), l / w, _std(l, l2, w)
+
+    def drop(self, symbol):
+        self.prefix.pop(symbol, None)
+        self.count.pop(symbol, None)
+
+
+def _std(s, s2, w):
+    return math.sqrt(max(s2 - s * s / w, 0.0) / (w - 1))
+
+
+def zscore(x, mean, std):
+    """Скаляры или столбцы признаков (engine/features.py)."""
+    # нулевой разброс окна: любое отличие от среднего — бесконечно далеко
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(std == 0, np.where(x == mean, 0.0, np.copysign(math.inf, x - mean)), (x - mean) / std)